@@ -1,17 +1,22 @@
-from .prospect_search import ProspectSearchAgent
-from .enrichment import DataEnrichmentAgent
-from .scoring import ScoringAgent
-from .outreach_content import OutreachContentAgent
-from .outreach_executor import OutreachExecutorAgent
-from .response_tracker import ResponseTrackerAgent
-from .feedback_trainer import FeedbackTrainerAgent
+from .registry import AgentRegistry, BUILTIN_AGENTS, load_spec
 
 __all__ = [
+    "AgentRegistry",
     "ProspectSearchAgent",
     "DataEnrichmentAgent",
     "ScoringAgent",
+    "AccountResearchAgent",
     "OutreachContentAgent",
     "OutreachExecutorAgent",
     "ResponseTrackerAgent",
     "FeedbackTrainerAgent"
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    # Import agent modules lazily so `import agents` stays cheap
+    if name in BUILTIN_AGENTS:
+        agent_class = load_spec(BUILTIN_AGENTS[name])
+        globals()[name] = agent_class
+        return agent_class
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
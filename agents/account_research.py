@@ -0,0 +1,196 @@
+from .base_agent import BaseAgent
+from typing import Dict, Any, List
+from collections import Counter
+from utils.accounts import account_key, company_domain, get_account_cache
+from utils.scheduler import run_prioritized
+from utils.cassette import llm_http_client
+from utils.budget import current_budget, token_usage
+import os
+
+# Research summaries are reused by every campaign touching the account for this long
+RESEARCH_TTL_HOURS = 168
+
+# Pain points inferred from buying signals when no LLM is used
+SIGNAL_PAIN_POINTS = {
+    "recent_funding": "Scaling the sales team after new funding without losing visibility into pipeline.",
+    "hiring_for_sales": "Ramping new sales hires while keeping forecasts reliable.",
+    "new_executive": "A new leader who needs a trustworthy baseline of revenue metrics.",
+    "product_launch": "Attributing pipeline to a new product launch.",
+    "website_traffic_spike": "Turning a spike in website traffic into qualified pipeline."
+}
+DEFAULT_PAIN_POINT = "Pulling pipeline and revenue numbers together by hand across tools."
+
+
+class AccountResearchAgent(BaseAgent):
+    """Researches each target company once and shares it with all its contacts
+
+    Leads are grouped by account (company domain, else normalized name); each
+    account gets one summary (pain point, tech context) that is cached for
+    `ttl_hours` and passed to OutreachContentAgent as shared context.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._llm = None
+        self._llm_initialized = False
+    
+    @property
+    def llm(self):
+        """LLM client, created on first use (None if OpenAI is unavailable)"""
+        if not self._llm_initialized:
+            self._llm_initialized = True
+            self._llm = self._create_llm()
+        return self._llm
+    
+    def _create_llm(self):
+        api_key = os.getenv("OPENAI_API_KEY")
+        try:
+            from langchain_openai import ChatOpenAI
+        except ImportError:
+            ChatOpenAI = None
+        
+        if ChatOpenAI is None or not api_key:
+            self.logger.info("OpenAI not available, using basic account research")
+            return None
+        
+        try:
+            return ChatOpenAI(
+                model="gpt-4o-mini",
+                temperature=0.3,
+                openai_api_key=api_key,
+                http_client=llm_http_client()
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not initialize OpenAI: {str(e)}")
+            return None
+    
+    def warm_up(self):
+        self.llm
+    
+    def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Build one research summary per account"""
+        self.logger.info("Researching target accounts...")
+        
+        ranked_leads = inputs.get("ranked_leads", [])
+        max_leads = inputs.get("max_leads")
+        if max_leads is not None:
+            # Only accounts of leads that will actually be contacted
+            ranked_leads = ranked_leads[:max_leads]
+        ttl_s = inputs.get("ttl_hours", RESEARCH_TTL_HOURS) * 3600
+        cache = get_account_cache(inputs.get("account_cache"))
+        # Expired summaries are never served again; drop them so the cache stays bounded
+        cache.purge(ttl_s, kind="research")
+        
+        accounts: Dict[str, List[Dict]] = {}
+        for lead in ranked_leads:
+            key = account_key(lead)
+            if key:
+                accounts.setdefault(key, []).append(lead)
+        
+        outcome = run_prioritized(
+            list(accounts),
+            lambda key: max(lead.get("score", 0) for lead in accounts[key]),
+            lambda key: self._account_research(key, accounts[key], cache, ttl_s),
+            inputs.get("scheduling"),
+            # An account whose research raised (e.g. cache I/O) still gets basic research
+            fallback_fn=lambda key, error: self._fallback_research(key, accounts[key], error)
+        )
+        results = outcome["results"]
+        hits = sum(result["cached"] for result in results)
+        self.logger.info(f"{len(results)} accounts for {len(ranked_leads)} leads ({hits} from cache)")
+        
+        output = {
+            "accounts": results,
+            "cache": {"leads": len(ranked_leads), "accounts": len(results), "hits": hits, "misses": len(results) - hits}
+        }
+        if inputs.get("scheduling"):
+            output["deferred_accounts"] = outcome["deferred"]
+        self.log_execution(inputs, output)
+        
+        return output
+    
+    def _account(self, key: str, leads: List[Dict]) -> Dict:
+        lead = leads[0]
+        return {
+            "account": key,
+            "company": lead.get("company", ""),
+            "domain": company_domain(lead),
+            "contacts": len(leads)
+        }
+    
+    def _account_research(self, key: str, leads: List[Dict], cache, ttl_s: float) -> Dict:
+        """Cached research for one account, computed from all of its contacts"""
+        account = self._account(key, leads)
+        
+        cached = cache.get("research", key, ttl_s)
+        if cached is not None:
+            return {**account, **cached, "cached": True}
+        
+        research = self._research(account, leads)
+        # Basic research is cheap to redo and should not outlive a budget shortfall
+        if research["source"] == "llm":
+            cache.put("research", key, research)
+        return {**account, **research, "cached": False}
+    
+    def _fallback_research(self, key: str, leads: List[Dict], error: Exception) -> Dict:
+        """Uncached basic research for an account whose research failed"""
+        return {**self._account(key, leads), **self._basic_research(leads), "cached": False, "error": str(error)}
+    
+    def _research(self, account: Dict, leads: List[Dict]) -> Dict:
+        """Pain point and tech context via the LLM, else from signals and stack"""
+        basic = self._basic_research(leads)
+        technologies, signals = basic["technologies"], basic["signals"]
+        
+        if not self.llm:
+            return basic
+        
+        budget = current_budget()
+        priority = max(lead.get("score", 0) for lead in leads)
+        if budget and not budget.acquire("openai", priority):
+            budget.degrade(self.agent_id, "basic account research", budget.reason("openai"))
+            return basic
+        
+        prompt = f"""
+Research this B2B account for outreach from Analytos.ai (B2B analytics platform).
+
+Company: {account['company']} ({account['domain'] or 'domain unknown'})
+Industry: {leads[0].get('industry', 'unknown')}
+Employees: {leads[0].get('employee_count', 'unknown')}
+Technologies: {', '.join(technologies) or 'unknown'}
+Buying signals: {', '.join(signals) or 'none'}
+
+Reply in exactly this format, one line each:
+PAIN_POINT: [their most relevant revenue analytics pain point, one sentence]
+TECH_CONTEXT: [how their stack relates to revenue analytics, one sentence]
+"""
+        
+        try:
+            response = self.llm.invoke(prompt)
+            if budget:
+                budget.charge("openai", calls=0, tokens=token_usage(response))
+            
+            fields = {}
+            for line in response.content.split("\n"):
+                label, _, value = line.partition(":")
+                if label.strip() in ("PAIN_POINT", "TECH_CONTEXT") and value.strip():
+                    fields[label.strip().lower()] = value.strip()
+            
+            if "pain_point" not in fields:
+                return basic
+            return {**basic, **fields, "source": "llm"}
+        
+        except Exception as e:
+            self.logger.error(f"Account research error for {account['company']}: {str(e)}")
+            return basic
+    
+    def _basic_research(self, leads: List[Dict]) -> Dict:
+        tech_counts = Counter(tech for lead in leads for tech in lead.get("technologies", []))
+        technologies = [tech for tech, _ in tech_counts.most_common(5)]
+        signals = sorted({lead["signal"] for lead in leads if lead.get("signal") in SIGNAL_PAIN_POINTS})
+        pain_point = SIGNAL_PAIN_POINTS[signals[0]] if signals else DEFAULT_PAIN_POINT
+        tech_context = (
+            f"Runs {', '.join(technologies)}; revenue data is spread across these tools."
+            if technologies else ""
+        )
+        return {"pain_point": pain_point, "tech_context": tech_context, "technologies": technologies,
+                "signals": signals, "source": "basic"}
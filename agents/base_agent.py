@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from typing import Dict, Any, List
 import logging
 from datetime import datetime
+from utils.logger import LazyPayload
 
 class BaseAgent(ABC):
     """Base class for all agents in the workflow"""
@@ -17,11 +18,21 @@ class BaseAgent(ABC):
         """Execute the agent's main logic"""
         pass
     
+    def warm_up(self):
+        """Create expensive clients ahead of the first execute (no-op by default)"""
+        pass
+    
     def log_execution(self, inputs: Dict, outputs: Dict):
         """Log agent execution details"""
-        self.logger.info(f"Agent {self.agent_id} executed at {datetime.now()}")
-        self.logger.debug(f"Inputs: {inputs}")
-        self.logger.debug(f"Outputs: {outputs}")
+        self.logger.info("Agent %s executed at %s", self.agent_id, datetime.now())
+        
+        # Payloads can hold thousands of leads: skip entirely unless debug is on,
+        # and even then only a capped sample is taken. The sample is built on
+        # this thread when the record is queued; only its JSON and console
+        # rendering happen on the listener thread
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Inputs", extra={"payload": LazyPayload(inputs)})
+            self.logger.debug("Outputs", extra={"payload": LazyPayload(outputs)})
         
     def validate_output(self, output: Dict, schema: Dict) -> bool:
         """Validate output against expected schema"""
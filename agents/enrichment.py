@@ -1,8 +1,16 @@
 from .base_agent import BaseAgent
 from typing import Dict, Any
-import requests
+from utils.api_clients import timed_request
+from utils.work_queue import map_tasks
+from utils.scheduler import run_prioritized
+from utils.budget import current_budget
+from utils.accounts import company_domain, get_account_cache
+from .scoring import preliminary_score
 import os
 
+# Company records change slowly; contacts at a known account reuse them this long
+COMPANY_TTL_DAYS = 30
+
 class DataEnrichmentAgent(BaseAgent):
     
     def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
@@ -10,19 +18,69 @@ class DataEnrichmentAgent(BaseAgent):
         self.logger.info("Starting data enrichment...")
         
         leads = inputs.get("leads", [])
-        enriched_leads = []
+        scheduling = inputs.get("scheduling")
+        criteria = inputs.get("scoring_criteria") or {}
+        lookup_options = {
+            "company_ttl_days": inputs.get("company_ttl_days", COMPANY_TTL_DAYS),
+            "account_cache": inputs.get("account_cache"),
+            "hedge": inputs.get("hedge", False)
+        }
+        if not os.getenv("CLEARBIT_KEY"):
+            self.logger.warning("Clearbit API key not found, passing leads through unenriched")
+        get_account_cache(lookup_options["account_cache"]).purge(
+            lookup_options["company_ttl_days"] * 86400, kind="clearbit_company"
+        )
+        
+        # Best-looking leads first (preliminary score), so a run cut short by
+        # a budget or deadline has spent its lookups on the leads that matter
+        leads = sorted(leads, key=lambda lead: preliminary_score(lead, criteria), reverse=True)
+        deferred = []
         
-        for lead in leads:
-            enriched_lead = self._enrich_lead(lead)
-            enriched_leads.append(enriched_lead)
+        if inputs.get("work_queue"):
+            # Per-lead tasks go to queue workers, published best-first
+            enriched_leads = map_tasks(
+                self.agent_id,
+                [{"lead": lead, "priority": preliminary_score(lead, criteria), **lookup_options} for lead in leads],
+                lambda task: self._enrich_lead(**task),
+                inputs["work_queue"],
+                # One Clearbit call per lead (combined or person lookup)
+                reserve=lambda task: ("clearbit", 1)
+            )
+        else:
+            outcome = run_prioritized(
+                leads,
+                lambda lead: preliminary_score(lead, criteria),
+                lambda lead: self._enrich_lead(lead, priority=preliminary_score(lead, criteria), **lookup_options),
+                scheduling,
+                # A lead whose lookup raised goes on unenriched rather than being dropped
+                fallback_fn=lambda lead, error: {
+                    **lead, "role": lead.get("title", "Unknown"), "technologies": lead.get("technologies", []),
+                    "enrichment_error": str(error)
+                }
+            )
+            enriched_leads, deferred = outcome["results"], outcome["deferred"]
         
-        output = {"enriched_leads": enriched_leads}
+        # Company cache hits of this step's lookups, used by the planner's estimates
+        looked_up = [lead["company_cached"] for lead in enriched_leads if "company_cached" in lead]
+        output = {
+            "enriched_leads": enriched_leads,
+            "company_cache": {"lookups": len(looked_up), "hits": sum(looked_up)}
+        }
+        if scheduling:
+            output["deferred_leads"] = deferred
         self.log_execution(inputs, output)
         
         return output
     
-    def _enrich_lead(self, lead: Dict) -> Dict:
-        """Enrich a single lead using Clearbit"""
+    def _enrich_lead(self, lead: Dict, priority: float = None, company_ttl_days: float = COMPANY_TTL_DAYS,
+                     account_cache: str = None, hedge: bool = False) -> Dict:
+        """Enrich a single lead using Clearbit
+        
+        With a run budget, lower-priority leads skip the lookup once the
+        Clearbit budget is nearly used up, and all leads do once it is spent.
+        Timeouts adapt to each endpoint's latency; with hedge=True a slow
+        lookup gets a second attempt (see utils.api_clients.timed_request).
+        """
         email = lead.get("email", "")
         
         if not email:
@@ -31,31 +89,88 @@ class DataEnrichmentAgent(BaseAgent):
         api_key = os.getenv("CLEARBIT_KEY")
         
         if not api_key:
-            self.logger.warning("Clearbit API key not found")
-            return {**lead, "role": lead.get("title", "Unknown"), "technologies": []}
+            # Warned about once per step in execute
+            return {**lead, "role": lead.get("title", "Unknown"), "technologies": lead.get("technologies", [])}
+        
+        budget = current_budget()
+        if budget and not budget.acquire("clearbit", priority):
+            budget.degrade(self.agent_id, "skipped Clearbit lookup", budget.reason("clearbit"))
+            return {**lead, "role": lead.get("title", "Unknown"), "technologies": lead.get("technologies", []),
+                    "enrichment_skipped": "budget"}
         
         try:
-            url = f"https://person-stream.clearbit.com/v2/combined/find?email={email}"
             headers = {"Authorization": f"Bearer {api_key}"}
+            domain = company_domain(lead)
+            person, company, cached = self._lookup(email, domain, headers, company_ttl_days, account_cache, hedge)
+            # Only lookups that went through the account cache (leads with a domain) say anything about it
+            cache_flag = {} if cached is None else {"company_cached": cached}
             
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                person = data.get("person", {})
-                company = data.get("company", {})
+            if person is not None:
+                name = person.get("name") or {}
                 
                 return {
                     "company": lead.get("company", company.get("name", "")),
-                    "contact": lead.get("contact_name", person.get("name", "")),
+                    "contact": lead.get("contact_name", name.get("fullName", "") if isinstance(name, dict) else name),
                     "email": email,
                     "role": person.get("employment", {}).get("title", "Unknown"),
                     "technologies": company.get("tech", [])[:5],  # Top 5 techs
-                    "linkedin": lead.get("linkedin", "")
+                    "linkedin": lead.get("linkedin", ""),
+                    "signal": lead.get("signal", ""),
+                    "timezone": lead.get("timezone") or person.get("timeZone", ""),
+                    "domain": domain,
+                    "industry": lead.get("industry", company.get("industry", "")),
+                    "employee_count": lead.get("employee_count", company.get("employees")),
+                    **cache_flag
                 }
             else:
-                return {**lead, "role": "Unknown", "technologies": []}
+                return {**lead, "role": "Unknown", "technologies": company.get("tech", [])[:5], **cache_flag}
                 
         except Exception as e:
             self.logger.error(f"Enrichment error for {email}: {str(e)}")
-            return {**lead, "role": "Unknown", "technologies": []}
\ No newline at end of file
+            return {**lead, "role": "Unknown", "technologies": []}
+    
+    def _lookup(self, email: str, domain: str, headers: Dict, ttl_days: float = COMPANY_TTL_DAYS,
+                cache_path: str = None, hedge: bool = False):
+        """(person or None if not found, company record or {}, served from cache) in one Clearbit call
+        
+        The first contact of an account not in the cache uses the combined
+        endpoint and seeds the account cache from its company block; other
+        contacts of a cached account only need the person lookup. Lookups
+        are idempotent GETs, so a slow one may be hedged. The cache flag is
+        None for leads without a domain, which skip the cache.
+        """
+        person = None
+        
+        def combined():
+            nonlocal person
+            url = f"https://person-stream.clearbit.com/v2/combined/find?email={email}"
+            response = timed_request("GET", url, "clearbit.combined", timeout=10, hedge=hedge, headers=headers)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            person = data.get("person") or {}
+            company = data.get("company") or {}
+            # Only the fields downstream steps use are cached
+            return {
+                "name": company.get("name", ""),
+                "tech": company.get("tech", []),
+                "industry": (company.get("category") or {}).get("industry", ""),
+                "employees": (company.get("metrics") or {}).get("employees"),
+                "description": company.get("description", "")
+            } if company else {}
+        
+        if not domain:
+            # combined() sets person, so it has to run before person is read
+            company = combined() or {}
+            return person, company, None
+        
+        # Contacts of one account wait here for the first one's combined call
+        company, cached = get_account_cache(cache_path).get_or_compute(
+            "clearbit_company", domain, ttl_days * 86400, combined
+        )
+        if cached:
+            url = f"https://person.clearbit.com/v2/people/find?email={email}"
+            response = timed_request("GET", url, "clearbit.person", timeout=10, hedge=hedge, headers=headers)
+            if response.status_code == 200:
+                person = response.json()
+        return person, company or {}, cached
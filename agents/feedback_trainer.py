@@ -1,38 +1,58 @@
 from .base_agent import BaseAgent
 from typing import Dict, Any
+from utils.metrics_store import get_metrics_store
+from utils.sheets_sink import SHEETS_AVAILABLE, get_sheets_exporter
+from utils.cassette import llm_http_client
+from utils.budget import current_budget, token_usage
+from datetime import datetime
 import os
 
-# Try to import OpenAI, but handle if not available or no credits
-try:
-    from langchain_openai import ChatOpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-
 class FeedbackTrainerAgent(BaseAgent):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        
-        # Only initialize LLM if OpenAI is available and has API key
+        self._llm = None
+        self._llm_initialized = False
+    
+    @property
+    def llm(self):
+        """LLM client, created on first use (None if OpenAI is unavailable)"""
+        if not self._llm_initialized:
+            self._llm_initialized = True
+            self._llm = self._create_llm()
+        return self._llm
+    
+    @property
+    def use_llm(self) -> bool:
+        return self.llm is not None
+    
+    def _create_llm(self):
+        """Initialize the LLM only if OpenAI is available and has API key"""
         api_key = os.getenv("OPENAI_API_KEY")
         
-        if OPENAI_AVAILABLE and api_key:
-            try:
-                self.llm = ChatOpenAI(
-                    model="gpt-4o-mini",
-                    temperature=0.3,
-                    openai_api_key=api_key
-                )
-                self.use_llm = True
-            except Exception as e:
-                self.logger.warning(f"Could not initialize OpenAI: {str(e)}")
-                self.llm = None
-                self.use_llm = False
-        else:
+        # Try to import OpenAI, but handle if not available or no credits
+        try:
+            from langchain_openai import ChatOpenAI
+        except ImportError:
+            ChatOpenAI = None
+        
+        if ChatOpenAI is None or not api_key:
             self.logger.info("OpenAI not available, using basic recommendations")
-            self.llm = None
-            self.use_llm = False
+            return None
+        
+        try:
+            return ChatOpenAI(
+                model="gpt-4o-mini",
+                temperature=0.3,
+                openai_api_key=api_key,
+                http_client=llm_http_client()
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not initialize OpenAI: {str(e)}")
+            return None
+    
+    def warm_up(self):
+        self.llm
     
     def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze performance and suggest improvements"""
@@ -40,32 +60,53 @@ class FeedbackTrainerAgent(BaseAgent):
         
         responses = inputs.get("responses", [])
         
-        # Calculate metrics
-        metrics = self._calculate_metrics(responses)
+        # Prefer the tracker's precomputed aggregates; rescan only as a fallback
+        metrics = self._select_metrics(inputs.get("metrics")) or self._calculate_metrics(responses)
+        
+        # Add this campaign to the cross-campaign history
+        history_store = self._update_history(responses, inputs.get("metrics_store"))
         
         # Generate recommendations
         recommendations = self._generate_recommendations(metrics, responses)
+        if history_store:
+            recommendations.extend(
+                self._generate_history_recommendations(history_store, metrics, len(recommendations))
+            )
         
-        # Log to Google Sheets (simulated)
-        self._log_to_sheets(recommendations)
+        # Queue for Google Sheets
+        campaign_id = responses[0].get("campaign_id") if responses else None
+        self._log_to_sheets(recommendations, campaign_id)
         
         output = {"recommendations": recommendations, "metrics": metrics}
         self.log_execution(inputs, output)
         
         return output
     
+    def _select_metrics(self, aggregates: Dict) -> Dict:
+        """Pick the rate fields out of precomputed campaign aggregates"""
+        if not aggregates or "open_rate" not in aggregates:
+            return {}
+        return {key: aggregates[key] for key in ("open_rate", "click_rate", "reply_rate", "meeting_rate")}
+    
     def _calculate_metrics(self, responses: list) -> Dict:
-        """Calculate campaign metrics"""
+        """Calculate campaign metrics in a single pass"""
         total = len(responses)
         
         if total == 0:
             return {"open_rate": 0, "click_rate": 0, "reply_rate": 0, "meeting_rate": 0}
         
+        opened = clicked = replied = meetings = 0
+        for r in responses:
+            opened += bool(r.get("opened"))
+            clicked += bool(r.get("clicked"))
+            replied += bool(r.get("replied"))
+            meetings += bool(r.get("meeting_booked"))
+        
         metrics = {
-            "open_rate": sum(1 for r in responses if r.get("opened")) / total,
-            "click_rate": sum(1 for r in responses if r.get("clicked")) / total,
-            "reply_rate": sum(1 for r in responses if r.get("replied")) / total,
-            "meeting_rate": sum(1 for r in responses if r.get("meeting_booked")) / total
+            "open_rate": opened / total,
+            "click_rate": clicked / total,
+            "reply_rate": replied / total,
+            "meeting_rate": meetings / total
         }
         
         return metrics
@@ -77,6 +118,11 @@ class FeedbackTrainerAgent(BaseAgent):
         if not self.use_llm or not self.llm:
             return self._generate_basic_recommendations(metrics)
         
+        budget = current_budget()
+        if budget and not budget.acquire("openai"):
+            budget.degrade(self.agent_id, "basic recommendations", budget.reason("openai"))
+            return self._generate_basic_recommendations(metrics)
+        
         # Try LLM-based recommendations, fallback to basic if error
         prompt = f"""
 Analyze this email campaign performance and suggest 3 specific improvements:
@@ -98,6 +144,8 @@ Categories can be: Subject Line, Email Content, ICP Targeting, Timing, Personali
         try:
             response = self.llm.invoke(prompt)
             content = response.content
+            if budget:
+                budget.charge("openai", calls=0, tokens=token_usage(response))
             
             # Parse recommendations
             lines = content.strip().split("\n")
@@ -123,6 +171,50 @@ Categories can be: Subject Line, Email Content, ICP Targeting, Timing, Personali
             # Fallback to basic recommendations
             return self._generate_basic_recommendations(metrics)
     
+    def _update_history(self, responses: list, store_path: str = None):
+        """Record per-segment metrics of this campaign in the time-series store"""
+        if not responses:
+            return None
+        
+        try:
+            store = get_metrics_store(store_path)
+            store.record_campaign(responses[0].get("campaign_id", ""), responses)
+            # Hourly points past the retention window only add rows; daily rollups keep the history
+            pruned = store.compact()
+            if pruned:
+                self.logger.info(f"Pruned {pruned} hourly metric points past retention")
+            return store
+        except Exception as e:
+            self.logger.warning(f"Could not update metrics history: {str(e)}")
+            return None
+    
+    def _generate_history_recommendations(self, store, metrics: Dict, numbered: int) -> list:
+        """Recommend segments that outperform across past campaigns (30-day window)"""
+        recommendations = []
+        labels = {
+            "tone": "Personalization",
+            "persona": "Personalization",
+            "subject_variant": "Subject Line",
+            "industry": "ICP Targeting",
+            "role": "ICP Targeting"
+        }
+        
+        for dimension, category in labels.items():
+            best = store.best_segment(dimension, days=30, min_sent=100)
+            if not best:
+                continue
+            numbered += 1
+            recommendations.append({
+                "recommendation": "{}. {}: {} '{}' leads on reply rate over the last 30 days ({:.1%} across {} sends in {} campaigns)".format(
+                    numbered, category, dimension, best["value"], best["reply_rate"], best["sent"], best["campaigns"]
+                ),
+                "status": "pending_approval",
+                "metrics": metrics,
+                "evidence": best
+            })
+        
+        return recommendations
+    
     def _generate_basic_recommendations(self, metrics: Dict) -> list:
         """Generate basic recommendations without LLM"""
         recommendations = []
@@ -177,52 +269,31 @@ Categories can be: Subject Line, Email Content, ICP Targeting, Timing, Personali
         
         return recommendations
     
-    def _log_to_sheets(self, recommendations: list):
-        """Log recommendations to Google Sheets"""
-        try:
-            from google.oauth2.service_account import Credentials
-            from googleapiclient.discovery import build
-            from datetime import datetime
-            
-            creds_path = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH")
-            sheet_id = os.getenv("GOOGLE_SHEET_ID")
-            
-            if not creds_path or not sheet_id or not os.path.exists(creds_path):
-                self.logger.info("Google Sheets not configured, logging to console only")
-                return
-            
-            # Authenticate
-            SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-            creds = Credentials.from_service_account_file(creds_path, scopes=SCOPES)
-            service = build('sheets', 'v4', credentials=creds)
-            
-            # Prepare data
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            rows = []
-            for rec in recommendations:
-                metrics = rec.get("metrics", {})
-                rows.append([
-                    timestamp,
-                    rec.get("campaign_id", "N/A"),
-                    f"{metrics.get('open_rate', 0):.1%}",
-                    f"{metrics.get('reply_rate', 0):.1%}",
-                    rec.get("recommendation", ""),
-                    rec.get("status", "pending")
-                ])
-            
-            # Append to sheet
-            body = {'values': rows}
-            service.spreadsheets().values().append(
-                spreadsheetId=sheet_id,
-                range='Sheet1!A:F',
-                valueInputOption='RAW',
-                body=body
-            ).execute()
-            
-            self.logger.info(f"✅ Logged {len(rows)} recommendations to Google Sheets")
-            
-        except ImportError:
+    def _log_to_sheets(self, recommendations: list, campaign_id: str = None):
+        """Queue recommendations for the batched Google Sheets export"""
+        if not SHEETS_AVAILABLE:
             self.logger.info("Google Sheets libraries not installed, skipping...")
-        except Exception as e:
-            self.logger.warning(f"Could not log to Google Sheets: {str(e)}")
\ No newline at end of file
+            return
+        
+        exporter = get_sheets_exporter()
+        if exporter is None:
+            self.logger.info("Google Sheets not configured, logging to console only")
+            return
+        
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        rows = []
+        for rec in recommendations:
+            metrics = rec.get("metrics", {})
+            rows.append([
+                timestamp,
+                rec.get("campaign_id") or campaign_id or "N/A",
+                f"{metrics.get('open_rate', 0):.1%}",
+                f"{metrics.get('reply_rate', 0):.1%}",
+                rec.get("recommendation", ""),
+                rec.get("status", "pending")
+            ])
+        
+        # Appended in the background; never blocks the workflow
+        exporter.enqueue(rows)
+        self.logger.info(f"Queued {len(rows)} recommendations for Google Sheets")
@@ -1,18 +1,60 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from typing import Dict, Any, List
+from utils.bandit import get_bandit
+from utils.work_queue import map_tasks
+from utils.scheduler import run_prioritized
+from utils.cassette import llm_http_client
+from utils.budget import current_budget, token_usage
+from utils.accounts import account_key
+from utils.llm_stream import MessageStreamParser, stream_message
 import os
 
+# Subject line variants the bandit can allocate between
+SUBJECT_STYLES = {
+    "question": "Phrase the subject line as a short question.",
+    "benefit": "Lead the subject line with one concrete benefit.",
+    "personalized": "Mention the company by name in the subject line."
+}
+
+# Slot-fill fallbacks used instead of the LLM when the OpenAI budget is short
+TEMPLATE_SUBJECTS = {
+    "question": "Quick question about {company}'s analytics?",
+    "benefit": "Faster revenue insights for {company}",
+    "personalized": "{company} + Analytos.ai"
+}
+TEMPLATE_OPENERS = {
+    "friendly": "Hi {first_name}, hope your week is going well!",
+    "professional": "Hello {first_name},",
+    "casual": "Hey {first_name},"
+}
+TEMPLATE_BODY = (
+    "{opener} As {role} at {company}, you likely spend more time than you'd like pulling numbers together"
+    "{stack}. Analytos.ai gives B2B teams one place to see pipeline and revenue analytics without the "
+    "manual reporting. Would you be open to a 15-minute call next week to see if it fits?"
+)
+
 class OutreachContentAgent(BaseAgent):
     
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.7,
-            openai_api_key=os.getenv("OPENAI_API_KEY")
-        )
+        self._llm = None
+    
+    @property
+    def llm(self):
+        """LLM client, created on first use so building the graph stays cheap"""
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+            self._llm = ChatOpenAI(
+                model="gpt-4o-mini",
+                temperature=0.7,
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                # Recorded/replayed when an HTTP cassette is active
+                http_client=llm_http_client()
+            )
+        return self._llm
+    
+    def warm_up(self):
+        self.llm
     
     def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """Generate personalized outreach messages"""
@@ -21,23 +63,113 @@ class OutreachContentAgent(BaseAgent):
         ranked_leads = inputs.get("ranked_leads", [])
         persona = inputs.get("persona", "SDR")
         tone = inputs.get("tone", "friendly")
+        # Variant lists turn fixed settings into per-lead bandit choices; the
+        # configured tone always stays one of the arms rather than being dropped
+        variants = dict(inputs.get("variants") or {})
+        if variants.get("tone") and tone not in variants["tone"]:
+            variants["tone"] = [tone] + list(variants["tone"])
+        bandit = get_bandit(inputs.get("bandit_store")) if variants else None
+        # Shared per-company research from AccountResearchAgent, if that step ran
+        research = {account["account"]: account for account in inputs.get("accounts") or []}
+        max_words = inputs.get("max_words", 100)
+        # {"enabled": true, "retries": 1}: parse while streaming, abort and retry bad output
+        streaming = inputs.get("streaming") if (inputs.get("streaming") or {}).get("enabled") else None
         
-        messages = []
+        tasks = []
+        segments = []
         
         # Take top 5 leads
         for lead in ranked_leads[:5]:
-            message = self._generate_message(lead, persona, tone)
-            messages.append(message)
+            lead_tone = bandit.choose("tone", variants["tone"]) if variants.get("tone") else tone
+            subject_variant = (
+                bandit.choose("subject_variant", variants["subject_variant"])
+                if variants.get("subject_variant") else ""
+            )
+            tasks.append({
+                "lead": lead,
+                "persona": persona,
+                "tone": lead_tone,
+                "subject_variant": subject_variant,
+                "priority": lead.get("score", 0),
+                "research": self._research_context(research.get(account_key(lead))),
+                "max_words": max_words,
+                "streaming": streaming
+            })
+            # Carried through sending and tracking for per-segment analytics
+            segments.append({
+                "industry": lead.get("industry", ""),
+                "role": lead.get("role", ""),
+                "persona": persona,
+                "tone": lead_tone,
+                "subject_variant": subject_variant
+            })
+        
+        scheduling = inputs.get("scheduling")
+        deferred = []
+        if inputs.get("work_queue"):
+            # Generation runs on queue workers, highest scores published first
+            messages = map_tasks(
+                self.agent_id,
+                tasks,
+                lambda task: self._generate_message(**task),
+                inputs["work_queue"],
+                # One call, plus the retries a streamed message may take
+                reserve=lambda task: ("openai", 1 + (task["streaming"].get("retries", 1) if task["streaming"] else 0))
+            )
+            for message, task, message_segments in zip(messages, tasks, segments):
+                message.update(segments=message_segments, score=task["lead"].get("score", 0),
+                               timezone=task["lead"].get("timezone", ""))
+        else:
+            def with_lead_fields(i, message):
+                return {
+                    **message,
+                    "segments": segments[i],
+                    # Travels with the message so sending goes best-first too
+                    "score": tasks[i]["lead"].get("score", 0),
+                    # Recipient's IANA zone, for business-hours send scheduling
+                    "timezone": tasks[i]["lead"].get("timezone", "")
+                }
+            
+            # Highest-scoring leads get their message first
+            outcome = run_prioritized(
+                list(range(len(tasks))),
+                lambda i: tasks[i]["lead"].get("score", 0),
+                lambda i: with_lead_fields(i, self._generate_message(**tasks[i])),
+                scheduling,
+                # A lead whose generation raised still gets the template message
+                fallback_fn=lambda i, error: with_lead_fields(i, {
+                    **self._template_message(tasks[i]["lead"], tasks[i]["tone"], tasks[i]["subject_variant"]),
+                    "error": str(error)
+                })
+            )
+            messages = outcome["results"]
+            deferred = [tasks[i]["lead"] for i in outcome["deferred"]]
         
         output = {"messages": messages}
+        if streaming:
+            output["stream_metrics"] = self._stream_summary(messages)
+        if scheduling:
+            output["deferred_leads"] = deferred
         self.log_execution(inputs, output)
         
         return output
     
-    def _generate_message(self, lead: Dict, persona: str, tone: str) -> Dict:
-        """Generate personalized email for a lead"""
+    def _generate_message(self, lead: Dict, persona: str, tone: str, subject_variant: str = "",
+                          priority: float = None, research: Dict = None, max_words: int = 100,
+                          streaming: Dict = None) -> Dict:
+        """Generate personalized email for a lead
         
-        prompt = ChatPromptTemplate.from_template("""
+        With account research the prompt reuses the company's pain point and
+        tech context instead of asking the model to work them out per contact.
+        With a run budget, lower-scoring leads get a template message once the
+        OpenAI budget is nearly used up, and all leads do once it is spent.
+        With streaming, output is checked as it arrives (see _stream_message).
+        """
+        budget = current_budget()
+        try:
+            from langchain.prompts import ChatPromptTemplate
+            
+            prompt = ChatPromptTemplate.from_template("""
 You are a {persona} writing a {tone} outreach email.
 
 Lead Information:
@@ -45,33 +177,47 @@ Lead Information:
 - Contact: {contact}
 - Role: {role}
 - Technologies: {technologies}
-
-Write a short, personalized email (max 100 words) that:
-1. Shows you've done research on their company
-2. Mentions a relevant pain point
+{research_block}
+Write a short, personalized email (max {max_words} words) that:
+{research_instructions}
 3. Offers value from Analytos.ai (B2B analytics platform)
 4. Has a clear CTA
 
-Also create a compelling subject line.
+Also create a compelling subject line. {subject_style}
 
 Return in this format:
 SUBJECT: [subject line]
 BODY: [email body]
-""")
-        
-        try:
-            response = self.llm.invoke(
-                prompt.format_messages(
-                    persona=persona,
-                    tone=tone,
-                    company=lead.get("company", ""),
-                    contact=lead.get("contact", ""),
-                    role=lead.get("role", ""),
-                    technologies=", ".join(lead.get("technologies", [])[:3])
-                )
-            )
+{retry_note}""")
+            prompt_args = {
+                "persona": persona,
+                "tone": tone,
+                "subject_style": SUBJECT_STYLES.get(subject_variant, ""),
+                "company": lead.get("company", ""),
+                "contact": lead.get("contact", ""),
+                "role": lead.get("role", ""),
+                "technologies": ", ".join(lead.get("technologies", [])[:3]),
+                "max_words": max_words,
+                **self._research_prompt(research)
+            }
+            # Prompt and client are set up before the call is reserved, so a
+            # failure here falls back without costing budget
+            messages = prompt.format_messages(retry_note="", **prompt_args)
+            self.llm
+            
+            if budget and not budget.acquire("openai", priority):
+                budget.degrade(self.agent_id, "template message", budget.reason("openai"))
+                return self._template_message(lead, tone, subject_variant)
+            
+            if streaming:
+                return self._stream_message(lead, prompt, prompt_args, tone, subject_variant, priority,
+                                            streaming.get("retries", 1))
+            
+            response = self.llm.invoke(messages)
             
             content = response.content
+            if budget:
+                budget.charge("openai", calls=0, tokens=token_usage(response))
             
             # Parse subject and body
             lines = content.split("\n")
@@ -100,4 +246,119 @@ BODY: [email body]
                 "email": lead.get("email", ""),
                 "subject": "Let's connect",
                 "email_body": f"Hi {lead.get('contact', 'there')}, I'd love to discuss how we can help."
-            }
\ No newline at end of file
+            }
+    
+    def _stream_message(self, lead: Dict, prompt, prompt_args: Dict, tone: str, subject_variant: str,
+                        priority: float = None, retries: int = 1) -> Dict:
+        """Streamed generation, stopped as soon as the output goes off-format or over length
+        
+        A rejected attempt is retried (with the reason added to the prompt) up
+        to `retries` times, then the lead gets the template message. Tokens of
+        aborted attempts are reported as wasted_tokens.
+        """
+        budget = current_budget()
+        attempts = []
+        retry_note = ""
+        
+        for attempt in range(retries + 1):
+            # The first attempt's call was reserved by the caller
+            if attempt and budget and not budget.acquire("openai", priority):
+                budget.degrade(self.agent_id, "template message", budget.reason("openai"))
+                break
+            
+            result = stream_message(
+                self.llm,
+                prompt.format_messages(retry_note=retry_note, **prompt_args),
+                MessageStreamParser(max_words=prompt_args["max_words"])
+            )
+            metrics = result["metrics"]
+            if budget:
+                budget.charge("openai", calls=0, tokens=metrics["total_tokens"])
+            attempts.append({**metrics, "violation": result.get("violation")})
+            
+            if "violation" not in result:
+                return {
+                    "lead": lead.get("contact", ""),
+                    "email": lead.get("email", ""),
+                    "subject": result["subject"],
+                    "email_body": result["body"],
+                    "stream": self._stream_stats(attempts)
+                }
+            
+            self.logger.warning(
+                f"Stopped off-format output for {lead.get('email', '')} after "
+                f"{metrics['completion_tokens']} tokens: {result['violation']}"
+            )
+            retry_note = (
+                f"\nYour previous reply was rejected ({result['violation']}). Reply with only the "
+                f"SUBJECT line and the BODY, max {prompt_args['max_words']} words.\n"
+            )
+        
+        return {**self._template_message(lead, tone, subject_variant), "stream": self._stream_stats(attempts)}
+    
+    def _stream_stats(self, attempts: List[Dict]) -> Dict:
+        """Metrics of a message's accepted attempt (or last one) plus retry cost"""
+        final = attempts[-1] if attempts else {}
+        return {
+            "ttft_ms": final.get("ttft_ms"),
+            "tokens_per_s": final.get("tokens_per_s"),
+            "tokens": final.get("total_tokens", 0),
+            "attempts": len(attempts),
+            "aborted": [attempt["violation"] for attempt in attempts if attempt["violation"]],
+            "wasted_tokens": sum(attempt["total_tokens"] for attempt in attempts if attempt["violation"])
+        }
+    
+    def _stream_summary(self, messages: List[Dict]) -> Dict:
+        """Step-level time to first token, throughput and tokens lost to aborted attempts"""
+        streamed = [message["stream"] for message in messages if message.get("stream")]
+        ttfts = sorted(stats["ttft_ms"] for stats in streamed if stats["ttft_ms"] is not None)
+        rates = [stats["tokens_per_s"] for stats in streamed if stats["tokens_per_s"]]
+        return {
+            "messages": len(streamed),
+            "ttft_ms_p50": ttfts[len(ttfts) // 2] if ttfts else None,
+            "ttft_ms_max": ttfts[-1] if ttfts else None,
+            "tokens_per_s": round(sum(rates) / len(rates), 1) if rates else None,
+            "aborted_attempts": sum(len(stats["aborted"]) for stats in streamed),
+            "wasted_tokens": sum(stats["wasted_tokens"] for stats in streamed),
+            "fallbacks": sum(1 for message in messages if message.get("stream") and message.get("generation") == "template")
+        }
+    
+    def _research_context(self, account: Dict = None) -> Dict:
+        """The parts of an account's research that go into each contact's prompt"""
+        if not account:
+            return None
+        return {"pain_point": account.get("pain_point", ""), "tech_context": account.get("tech_context", "")}
+    
+    def _research_prompt(self, research: Dict = None) -> Dict:
+        if not research:
+            return {
+                "research_block": "",
+                "research_instructions": "1. Shows you've done research on their company\n2. Mentions a relevant pain point"
+            }
+        lines = [f"- Pain point: {research['pain_point']}"]
+        if research.get("tech_context"):
+            lines.append(f"- Tech context: {research['tech_context']}")
+        return {
+            "research_block": "\nAccount research (shared by all contacts at this company):\n" + "\n".join(lines) + "\n",
+            "research_instructions": "1. Builds on the account research for this contact's role\n2. Names the pain point"
+        }
+    
+    def _template_message(self, lead: Dict, tone: str, subject_variant: str = "") -> Dict:
+        """Slot-filled message for when the LLM is over budget"""
+        company = lead.get("company") or "your team"
+        contact = lead.get("contact") or lead.get("contact_name") or ""
+        technologies = lead.get("technologies", [])[:2]
+        slots = {
+            "company": company,
+            "first_name": contact.split(" ")[0] if contact else "there",
+            "role": lead.get("role") if lead.get("role") not in (None, "", "Unknown") else "a leader",
+            "stack": f" across {' and '.join(technologies)}" if technologies else ""
+        }
+        slots["opener"] = TEMPLATE_OPENERS.get(tone, TEMPLATE_OPENERS["professional"]).format(**slots)
+        return {
+            "lead": contact,
+            "email": lead.get("email", ""),
+            "subject": TEMPLATE_SUBJECTS.get(subject_variant, "Partnering with {company}").format(**slots),
+            "email_body": TEMPLATE_BODY.format(**slots),
+            "generation": "template"
+        }
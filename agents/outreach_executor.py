@@ -1,9 +1,19 @@
 from .base_agent import BaseAgent
 from typing import Dict, Any
+from utils.scheduler import run_prioritized
+from utils.event_store import get_event_store
+from utils.send_schedule import (DEFAULT_TIMEZONE, SendDispatcher, business_slot, get_send_schedule, send_id,
+                                 spread_offset)
+from datetime import datetime, timezone
 import requests
 import os
+import time
 import uuid
 
+# Follow-up copy for sequence steps that don't define their own
+FOLLOW_UP_SUBJECT = "Re: {subject}"
+FOLLOW_UP_BODY = "Hi {first_name}, bumping this in case it got buried. Would a short call next week be useful?"
+
 class OutreachExecutorAgent(BaseAgent):
     
     def execute(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
@@ -11,27 +21,162 @@ class OutreachExecutorAgent(BaseAgent):
         self.logger.info("Sending outreach emails...")
         
         messages = inputs.get("messages", [])
-        sent_status = []
+        scheduling = inputs.get("scheduling")
         campaign_id = str(uuid.uuid4())
+        if not os.getenv("APOLLO_API_KEY"):
+            self.logger.warning("Apollo API key not found, simulating sends")
         
-        for message in messages:
-            status = self._send_email(message, campaign_id)
-            sent_status.append(status)
+        if (inputs.get("schedule") or {}).get("enabled"):
+            output = self._schedule_campaign(messages, campaign_id, inputs["schedule"])
+            self.log_execution(inputs, output)
+            return output
+        
+        # Highest-scoring leads are sent first; with a send budget or deadline
+        # the rest are deferred rather than an arbitrary subset going out
+        outcome = run_prioritized(
+            messages,
+            lambda message: message.get("score", 0),
+            lambda message: self._send_one(message, campaign_id),
+            scheduling,
+            # A send that raised is reported as failed instead of vanishing
+            fallback_fn=lambda message, error: {
+                "email": message.get("email", ""),
+                "status": "failed",
+                "error": str(error),
+                "campaign_id": campaign_id
+            }
+        )
         
         output = {
-            "sent_status": sent_status,
+            "sent_status": outcome["results"],
             "campaign_id": campaign_id
         }
+        if scheduling:
+            output["deferred_messages"] = outcome["deferred"]
         self.log_execution(inputs, output)
         
         return output
     
+    def _schedule_campaign(self, messages: list, campaign_id: str, options: Dict) -> Dict:
+        """Queue each message for the recipient's local business hours, plus follow-ups
+        
+        This campaign's sends that are already due (recipients currently in
+        business hours) go out right away; the rest is released later by a
+        dispatcher (see dispatcher.py). Replies and booked meetings cancel pending follow-ups.
+        """
+        schedule = get_send_schedule(options.get("store"))
+        event_store = get_event_store(options.get("event_store"))
+        schedule.attach(event_store)
+        
+        now = time.time()
+        hours = tuple(options.get("business_hours", (9, 17)))
+        weekdays = tuple(options.get("weekdays", (0, 1, 2, 3, 4)))
+        default_tz = options.get("default_timezone", DEFAULT_TIMEZONE)
+        spread_s = options.get("spread_minutes", 120) * 60
+        sequence = [{"delay_days": 0}] + list(options.get("follow_ups", []))
+        
+        entries = []
+        for message in messages:
+            email = message.get("email")
+            if not email:
+                continue
+            offset = spread_offset(email, spread_s)
+            first = business_slot(now, message.get("timezone"), hours, weekdays, offset, default_tz)
+            for step, follow_up in enumerate(sequence):
+                due_at = first if step == 0 else business_slot(
+                    first + follow_up.get("delay_days", 3) * 86400, message.get("timezone"),
+                    hours, weekdays, offset, default_tz
+                )
+                entries.append({
+                    "id": send_id(campaign_id, email, step),
+                    "due_at": due_at,
+                    "campaign_id": campaign_id,
+                    "email": email,
+                    "sequence_step": step,
+                    "payload": message if step == 0 else self._follow_up(message, follow_up)
+                })
+        scheduled = schedule.schedule(entries)
+        
+        dispatched = []
+        if options.get("dispatch_due", True):
+            # A dispatcher for this step only: the agent is shared by concurrent runs
+            dispatcher = SendDispatcher(
+                schedule,
+                lambda entry: self._send_scheduled(entry, event_store),
+                rate_per_min=options.get("rate_per_min", 60),
+                batch_size=options.get("batch_size", 20)
+            )
+            try:
+                # Only this campaign's sends that are due now; anything else
+                # due (other campaigns, retries) is the dispatcher process's job
+                due_by = time.time()
+                dispatched = dispatcher.dispatch([entry["id"] for entry in entries if entry["due_at"] <= due_by])
+            finally:
+                dispatcher.close()
+        
+        sent_now = {entry["id"]: result for entry, result in dispatched}
+        sent_status = []
+        for entry in entries:
+            if entry["sequence_step"]:
+                continue
+            sent_status.append(sent_now.get(entry["id"]) or {
+                "email": entry["email"],
+                "status": "scheduled",
+                "campaign_id": campaign_id,
+                "due_at": datetime.fromtimestamp(entry["due_at"], timezone.utc).isoformat(),
+                "segments": entry["payload"].get("segments", {})
+            })
+        
+        stats = schedule.stats()
+        return {
+            "sent_status": sent_status,
+            "campaign_id": campaign_id,
+            "schedule": {
+                "scheduled": scheduled,
+                "sent_now": len(sent_now),
+                "follow_ups": sum(1 for entry in entries if entry["sequence_step"]),
+                "pending": stats["counts"].get("pending", 0),
+                "next_due_at": (
+                    datetime.fromtimestamp(stats["next_due_at"], timezone.utc).isoformat()
+                    if stats["next_due_at"] else None
+                )
+            }
+        }
+    
+    def _follow_up(self, message: Dict, follow_up: Dict) -> Dict:
+        slots = {
+            "subject": message.get("subject", ""),
+            "first_name": (message.get("lead") or "there").split(" ")[0]
+        }
+        return {
+            **message,
+            "subject": follow_up.get("subject", FOLLOW_UP_SUBJECT).format(**slots),
+            "email_body": follow_up.get("body", FOLLOW_UP_BODY).format(**slots)
+        }
+    
+    def _send_scheduled(self, entry: Dict, event_store=None) -> Dict:
+        """Dispatcher callback: send one scheduled entry and register it with event_store for tracking"""
+        status = self._send_one(entry["payload"], entry["campaign_id"])
+        status["sequence_step"] = entry["sequence_step"]
+        if status["status"] != "failed":
+            (event_store or get_event_store()).record_send(
+                entry["campaign_id"], entry["email"], segments=entry["payload"].get("segments"),
+                simulated=status["status"] == "simulated"
+            )
+        return status
+    
+    def _send_one(self, message: Dict, campaign_id: str) -> Dict:
+        status = self._send_email(message, campaign_id)
+        if message.get("segments"):
+            status["segments"] = message["segments"]
+        return status
+    
     def _send_email(self, message: Dict, campaign_id: str) -> Dict:
         """Send a single email"""
         api_key = os.getenv("APOLLO_API_KEY")
         
         if not api_key:
-            self.logger.warning("Apollo API key not found, simulating send")
+            # Warned about once per step in execute (and once by dispatcher.py)
             return {
                 "email": message.get("email", ""),
                 "status": "simulated",
@@ -49,7 +194,7 @@ class OutreachExecutorAgent(BaseAgent):
                 "subject": message.get("subject", ""),
                 "status": "sent",
                 "campaign_id": campaign_id,
-                "sent_at": "2025-10-18T10:00:00Z"
+                "sent_at": datetime.now(timezone.utc).isoformat()
             }
             
         except Exception as e:
@@ -1,7 +1,13 @@
 from .base_agent import BaseAgent
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
+from utils.synthetic import generate_leads
+from utils.api_clients import timed_request
+from utils.search_state import get_search_state, icp_key
+from utils.budget import current_budget
+from datetime import datetime, timezone
 import requests
 import os
+import time
 
 class ProspectSearchAgent(BaseAgent):
     
@@ -11,11 +17,26 @@ class ProspectSearchAgent(BaseAgent):
         
         icp = inputs.get("icp", {})
         signals = inputs.get("signals", [])
+        mock_options = inputs.get("mock", {})
+        delta_options = inputs.get("delta") or {}
+        
+        # Delta mode: remember what this ICP already produced and only pass on
+        # new or changed prospects; a full refresh re-emits everything
+        state = key = None
+        full_refresh = False
+        since = None
+        if delta_options.get("enabled"):
+            state = get_search_state(delta_options.get("state_path"))
+            key = icp_key(icp, signals)
+            previous = state.get(key)
+            full_refresh = self._needs_full_refresh(previous, delta_options)
+            if previous and not full_refresh:
+                since = previous["last_search_at"]
         
         leads = []
         
         # Apollo API call
-        apollo_leads = self._search_apollo(icp)
+        apollo_leads, apollo_status = self._search_apollo(icp, mock_options, since, delta_options.get("since_param"))
         leads.extend(apollo_leads)
         
         # Clay API call (if available)
@@ -23,17 +44,54 @@ class ProspectSearchAgent(BaseAgent):
         leads.extend(clay_leads)
         
         output = {"leads": leads}
+        if state is not None and apollo_status in ("found", "empty"):
+            # Mock stand-ins for an empty result are passed on but never recorded as seen
+            mock_leads = apollo_leads if apollo_status == "empty" else []
+            provider_leads = leads[len(mock_leads):]
+            delta = state.delta(key, icp, provider_leads, full_refresh=full_refresh)
+            self.logger.info(
+                f"Delta search: {delta['new']} new, {delta['changed']} changed, "
+                f"{delta['unchanged']} unchanged (full_refresh={full_refresh})"
+            )
+            output = {
+                "leads": delta.pop("leads") + mock_leads,
+                "delta": {"icp_key": key, "full_refresh": full_refresh, "searched": len(provider_leads), **delta}
+            }
+        elif state is not None:
+            # No provider result to diff: the search window and seen set stay as they were
+            self.logger.warning(f"Delta search: Apollo search {apollo_status}, search state not updated")
+            output["delta"] = {"icp_key": key, "full_refresh": full_refresh, "searched": 0, "skipped": apollo_status}
         self.log_execution(inputs, output)
         
         return output
     
-    def _search_apollo(self, icp: Dict) -> list:
-        """Search Apollo API for prospects"""
+    def _needs_full_refresh(self, previous: Dict, delta_options: Dict) -> bool:
+        """Forced, first search for this ICP, or the periodic full refresh is due"""
+        if delta_options.get("full_refresh") or not previous:
+            return True
+        max_age_days = delta_options.get("full_refresh_days")
+        last_full = previous.get("last_full_at") or 0
+        return bool(max_age_days) and time.time() - last_full > max_age_days * 86400
+    
+    def _search_apollo(self, icp: Dict, mock_options: Dict = None, since: float = None,
+                       since_param: str = None) -> Tuple[list, str]:
+        """Search Apollo API for prospects
+        
+        Returns (leads, status): "found" for Apollo's own results, "empty"
+        when the search succeeded with no matches (mock leads returned),
+        "mocked" when there is no key or the call failed (mock leads) and
+        "skipped" when the run budget refused the call (no leads).
+        """
         api_key = os.getenv("APOLLO_API_KEY")
         
         if not api_key:
             self.logger.warning("Apollo API key not found")
-            return self._generate_mock_leads()
+            return self._generate_mock_leads(mock_options), "mocked"
+        
+        budget = current_budget()
+        if budget and not budget.acquire("apollo"):
+            budget.degrade(self.agent_id, "skipped Apollo search", budget.reason("apollo"))
+            return [], "skipped"
         
         url = "https://api.apollo.io/v1/mixed_people/search"
         
@@ -57,9 +115,16 @@ class ProspectSearchAgent(BaseAgent):
             max_emp = icp["employee_count"].get("max", 1000)
             payload["organization_num_employees_ranges"] = [f"{min_emp},{max_emp}"]
         
+        # Ask for recently added/updated records only if the endpoint supports a
+        # filter for it (configured by name); otherwise the delta is computed locally
+        if since and since_param:
+            payload[since_param] = datetime.fromtimestamp(since, tz=timezone.utc).isoformat()
+        
         try:
             self.logger.info(f"Calling Apollo API with payload: {payload}")
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
+            # A search only reads, so it may be retried like a GET
+            response = timed_request("POST", url, "apollo.search", timeout=10, idempotent=True,
+                                     json=payload, headers=headers)
             
             # Log the response for debugging
             self.logger.info(f"Apollo API response status: {response.status_code}")
@@ -67,7 +132,7 @@ class ProspectSearchAgent(BaseAgent):
             if response.status_code == 403:
                 self.logger.error("Apollo API returned 403 Forbidden - Check your API key")
                 self.logger.error("Get your API key from: https://app.apollo.io/#/settings/integrations/api")
-                return self._generate_mock_leads()
+                return self._generate_mock_leads(mock_options), "mocked"
             
             response.raise_for_status()
             
@@ -77,20 +142,24 @@ class ProspectSearchAgent(BaseAgent):
             leads = []
             for person in people:
                 lead = {
+                    "id": person.get("id", ""),
                     "company": person.get("organization", {}).get("name", ""),
                     "contact_name": person.get("name", ""),
                     "email": person.get("email", ""),
                     "linkedin": person.get("linkedin_url", ""),
+                    "timezone": person.get("time_zone", ""),
                     "signal": "apollo_match"
                 }
                 leads.append(lead)
             
             self.logger.info(f"Found {len(leads)} leads from Apollo")
-            return leads if leads else self._generate_mock_leads()
+            if not leads:
+                return self._generate_mock_leads(mock_options), "empty"
+            return leads, "found"
             
         except requests.exceptions.RequestException as e:
             self.logger.error(f"Apollo API error: {str(e)}")
-            return self._generate_mock_leads()
+            return self._generate_mock_leads(mock_options), "mocked"
     
     def _search_clay(self, icp: Dict, signals: list) -> list:
         """Search Clay API for prospects"""
@@ -98,46 +167,16 @@ class ProspectSearchAgent(BaseAgent):
         self.logger.info("Clay API search (placeholder - using mock data)")
         return []
     
-    def _generate_mock_leads(self) -> list:
-        """Generate mock leads for testing when API is unavailable"""
-        self.logger.info("Generating mock leads for demonstration")
-        
-        mock_leads = [
-            {
-                "company": "TechCorp Inc",
-                "contact_name": "John Smith",
-                "email": "john.smith@techcorp.com",
-                "linkedin": "linkedin.com/in/johnsmith",
-                "signal": "mock_data"
-            },
-            {
-                "company": "SaaS Solutions Ltd",
-                "contact_name": "Sarah Johnson",
-                "email": "sarah.j@saassolutions.com",
-                "linkedin": "linkedin.com/in/sarahjohnson",
-                "signal": "mock_data"
-            },
-            {
-                "company": "Data Analytics Pro",
-                "contact_name": "Michael Chen",
-                "email": "m.chen@dataanalytics.com",
-                "linkedin": "linkedin.com/in/michaelchen",
-                "signal": "mock_data"
-            },
-            {
-                "company": "Cloud Services Group",
-                "contact_name": "Emily Davis",
-                "email": "emily.davis@cloudservices.com",
-                "linkedin": "linkedin.com/in/emilydavis",
-                "signal": "mock_data"
-            },
-            {
-                "company": "AI Innovations Inc",
-                "contact_name": "Robert Martinez",
-                "email": "r.martinez@aiinnovations.com",
-                "linkedin": "linkedin.com/in/robertmartinez",
-                "signal": "mock_data"
-            }
-        ]
+    def _generate_mock_leads(self, mock_options: Dict = None) -> list:
+        """Generate seeded synthetic leads for testing when API is unavailable"""
+        mock_options = mock_options or {}
+        count = mock_options.get("count", 5)
+        seed = mock_options.get("seed", 42)
+        self.logger.info(f"Generating {count} mock leads for demonstration (seed={seed})")
         
-        return mock_leads
\ No newline at end of file
+        return list(generate_leads(
+            count,
+            seed=seed,
+            duplicate_rate=mock_options.get("duplicate_rate", 0.05),
+            missing_email_rate=mock_options.get("missing_email_rate", 0.1)
+        ))
\ No newline at end of file
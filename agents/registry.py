@@ -0,0 +1,86 @@
+import importlib
+import logging
+from typing import Dict, Optional, Type
+
+# Built-in agents as "module:Class" specs, imported only when first used
+BUILTIN_AGENTS = {
+    "ProspectSearchAgent": "agents.prospect_search:ProspectSearchAgent",
+    "DataEnrichmentAgent": "agents.enrichment:DataEnrichmentAgent",
+    "ScoringAgent": "agents.scoring:ScoringAgent",
+    "AccountResearchAgent": "agents.account_research:AccountResearchAgent",
+    "OutreachContentAgent": "agents.outreach_content:OutreachContentAgent",
+    "OutreachExecutorAgent": "agents.outreach_executor:OutreachExecutorAgent",
+    "ResponseTrackerAgent": "agents.response_tracker:ResponseTrackerAgent",
+    "FeedbackTrainerAgent": "agents.feedback_trainer:FeedbackTrainerAgent"
+}
+
+# Installed packages can expose agents under this entry point group
+ENTRY_POINT_GROUP = "langgraph_lead_gen.agents"
+
+logger = logging.getLogger("AgentRegistry")
+
+
+def load_spec(spec: str):
+    """Import the object referenced by a "module:attr" spec"""
+    module_name, _, attr = spec.partition(":")
+    if not module_name or not attr:
+        raise ValueError(f"Invalid agent spec '{spec}', expected 'module:Class'")
+    module = importlib.import_module(module_name)
+    return getattr(module, attr)
+
+
+class AgentRegistry:
+    """Lazy name -> agent class registry
+
+    Agents are registered as "module:Class" specs and only imported the first
+    time they are requested, so resolving a workflow's agent names does not
+    pull in LangChain or any other heavy dependency.
+    """
+
+    def __init__(self, specs: Dict[str, str] = None):
+        self._specs = dict(BUILTIN_AGENTS)
+        self._specs.update(specs or {})
+        self._loaded: Dict[str, Type] = {}
+        self._entry_points_scanned = False
+
+    def register(self, name: str, spec: str):
+        """Register (or override) an agent spec"""
+        self._specs[name] = spec
+        self._loaded.pop(name, None)
+
+    def __contains__(self, name: str) -> bool:
+        if name in self._specs:
+            return True
+        self._scan_entry_points()
+        return name in self._specs
+
+    def names(self) -> list:
+        """List registered agent names without importing them"""
+        self._scan_entry_points()
+        return sorted(self._specs)
+
+    def get(self, name: str) -> Optional[Type]:
+        """Return the agent class for name, importing it on first use"""
+        if name in self._loaded:
+            return self._loaded[name]
+
+        if name not in self:
+            return None
+
+        agent_class = load_spec(self._specs[name])
+        self._loaded[name] = agent_class
+        return agent_class
+
+    def _scan_entry_points(self):
+        """Pick up third-party agents from installed package entry points"""
+        if self._entry_points_scanned:
+            return
+        self._entry_points_scanned = True
+
+        try:
+            from importlib.metadata import entry_points
+            for ep in entry_points(group=ENTRY_POINT_GROUP):
+                # Explicit config registrations win over installed packages
+                self._specs.setdefault(ep.name, ep.value)
+        except Exception as e:
+            logger.warning(f"Could not scan agent entry points: {str(e)}")
\ No newline at end of file
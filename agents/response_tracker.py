@@ -1,6 +1,11 @@
 from .base_agent import BaseAgent
 from typing import Dict, Any
-import random
+from utils.event_store import get_event_store
+from utils.bandit import get_bandit
+from utils.polling import get_campaign_poller
+from utils.synthetic import generate_engagement_events, stable_seed
+import os
+import time
 
 class ResponseTrackerAgent(BaseAgent):
     
@@ -9,36 +14,66 @@ class ResponseTrackerAgent(BaseAgent):
         self.logger.info("Tracking email responses...")
         
         campaign_id = inputs.get("campaign_id", "")
+        sent_status = inputs.get("sent_status") or []
         
-        # In production, query Apollo API for actual metrics
-        # For demo, generate simulated response data
-        responses = self._get_campaign_metrics(campaign_id)
+        # Engagement arrives as events in the event store, pushed by the webhook
+        # ingester or pulled incrementally in "poll" mode; without a provider,
+        # simulate those events for the demo
+        simulate = inputs.get("simulate", not os.getenv("APOLLO_API_KEY"))
+        store = get_event_store(inputs.get("event_store"))
+        # Sends and engagement update the variant bandit as they land
+        get_bandit(inputs.get("bandit_store")).attach(store)
         
-        output = {"responses": responses}
+        self._register_sends(store, campaign_id, sent_status, simulate)
+        if simulate:
+            self._simulate_events(store, campaign_id, sent_status)
+        elif inputs.get("mode") == "poll" and inputs.get("poll_endpoint"):
+            self._poll_events(store, campaign_id, inputs["poll_endpoint"])
+        
+        responses = self._get_campaign_metrics(store, campaign_id)
+        
+        output = {"responses": responses, "metrics": store.get_metrics(campaign_id)}
         self.log_execution(inputs, output)
         
         return output
     
-    def _get_campaign_metrics(self, campaign_id: str) -> list:
-        """Get metrics for a campaign (simulated)"""
-        
-        # Simulate response data
-        responses = []
+    def _register_sends(self, store, campaign_id: str, sent_status: list, simulated: bool = False):
+        """Record delivered emails so rates have the right denominator
         
-        for i in range(5):
-            response = {
-                "email": f"lead{i}@example.com",
-                "campaign_id": campaign_id,
-                "opened": random.choice([True, False]),
-                "clicked": random.choice([True, False, False]),
-                "replied": random.choice([True, False, False, False]),
-                "meeting_booked": random.choice([True, False, False, False, False])
-            }
-            responses.append(response)
+        Sends are flagged simulated (ignored by the variant bandit) when they
+        were simulated or their engagement will be.
+        """
+        for status in sent_status:
+            if status.get("status") not in ("failed", "scheduled") and status.get("email"):
+                store.record_send(campaign_id, status["email"], segments=status.get("segments"),
+                                  simulated=simulated or status.get("status") == "simulated")
+    
+    def _simulate_events(self, store, campaign_id: str, sent_status: list):
+        """Feed seeded, webhook-shaped events (with redeliveries and reordering)"""
+        # Scheduled sends are registered by the dispatcher once they go out
+        delivered = [s for s in sent_status if s.get("email") and s.get("status") != "scheduled"]
+        events = generate_engagement_events(delivered, seed=stable_seed(campaign_id), start_ts=time.time())
+        accepted = store.ingest_many(dict(event, simulated=True) for event in events)
+        self.logger.info(f"Ingested {accepted} simulated engagement events")
+    
+    def _poll_events(self, store, campaign_id: str, endpoint: str):
+        """Fetch only events newer than the campaign's cursor (no-webhook providers)"""
+        # Shared per store and endpoint, not kept on the agent: concurrent runs share this instance
+        poller = get_campaign_poller(store, endpoint)
+        poller.register_send(campaign_id)
+        accepted = poller.poll(campaign_id)
+        self.logger.info(f"Polled {accepted} new engagement events")
+    
+    def _get_campaign_metrics(self, store, campaign_id: str) -> list:
+        """Get per-recipient engagement from the event store aggregates"""
+        metrics = store.get_metrics(campaign_id)
         
-        open_rate = sum(1 for r in responses if r["opened"]) / len(responses)
-        reply_rate = sum(1 for r in responses if r["replied"]) / len(responses)
+        if not metrics["sent"]:
+            self.logger.info("Campaign metrics - no delivered emails to track")
+            return []
         
-        self.logger.info(f"Campaign metrics - Open: {open_rate:.1%}, Reply: {reply_rate:.1%}")
+        self.logger.info(
+            f"Campaign metrics - Open: {metrics['open_rate']:.1%}, Reply: {metrics['reply_rate']:.1%}"
+        )
         
-        return responses
\ No newline at end of file
+        return store.get_responses(campaign_id)
\ No newline at end of file
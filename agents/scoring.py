@@ -27,26 +27,36 @@ class ScoringAgent(BaseAgent):
     
     def _calculate_score(self, lead: Dict, criteria: Dict) -> float:
         """Calculate ICP fit score for a lead"""
-        score = 0.0
-        
-        # Technology match score
-        tech_weight = criteria.get("technology_weight", 0.3)
-        technologies = lead.get("technologies", [])
-        if technologies:
-            score += tech_weight * min(len(technologies) / 5, 1.0)
-        
-        # Role relevance score
-        role = lead.get("role", "").lower()
-        relevant_roles = ["vp", "director", "head", "chief", "manager"]
-        if any(r in role for r in relevant_roles):
-            score += 0.3
-        
-        # Signal score
-        signal_weight = criteria.get("signal_weight", 0.2)
-        if lead.get("signal"):
-            score += signal_weight
-        
-        # Random baseline for demo
-        score += 0.2
-        
-        return round(min(score, 1.0), 2)
\ No newline at end of file
+        return icp_fit_score(lead, criteria)
+
+
+def icp_fit_score(lead: Dict, criteria: Dict) -> float:
+    """Calculate ICP fit score for a lead"""
+    score = 0.0
+    
+    # Technology match score
+    tech_weight = criteria.get("technology_weight", 0.3)
+    technologies = lead.get("technologies", [])
+    if technologies:
+        score += tech_weight * min(len(technologies) / 5, 1.0)
+    
+    # Role relevance score
+    role = lead.get("role", "").lower()
+    relevant_roles = ["vp", "director", "head", "chief", "manager"]
+    if any(r in role for r in relevant_roles):
+        score += 0.3
+    
+    # Signal score
+    signal_weight = criteria.get("signal_weight", 0.2)
+    if lead.get("signal"):
+        score += signal_weight
+    
+    # Random baseline for demo
+    score += 0.2
+    
+    return round(min(score, 1.0), 2)
+
+
+def preliminary_score(lead: Dict, criteria: Dict = None) -> float:
+    """ICP fit from search-time fields only, used to order work before enrichment"""
+    return icp_fit_score({**lead, "role": lead.get("role") or lead.get("title", "")}, criteria or {})
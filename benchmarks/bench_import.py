@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Measure CLI startup import time and fail when it exceeds the budget
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must never be imported just to load or validate a config
+HEAVY_MODULES = ["langchain", "langchain_openai", "langgraph", "openai"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(\s*)(\S+)")
+
+
+def measure(module: str) -> list:
+    """Import module in a fresh interpreter and return (cumulative_us, name, depth) rows"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative, indent, name = int(match.group(2)), match.group(3), match.group(4)
+            rows.append((cumulative, name, len(indent) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--module", default="langgraph_builder", help="Module to import")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Max cumulative import time")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    # The target is the last top-level row; everything it pulled in precedes it
+    total_ms = next(r[0] for r in reversed(rows) if r[1] == args.module) / 1000
+    children = [r for r in rows if r[1] != args.module and r[2] <= 1]
+
+    print(f"import {args.module}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    for cumulative, name, _ in sorted(children, reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failed = False
+    heavy = sorted({name for _, name, _ in rows if name.split(".")[0] in HEAVY_MODULES})
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy[:5])}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
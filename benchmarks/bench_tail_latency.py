@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Offline tail-latency benchmark for enrichment lookups with injected slow responses
+
+Runs the enrichment stage repeatedly against a fake Clearbit (no network)
+where a share of responses stall, comparing fixed timeouts, adaptive
+timeouts, and adaptive timeouts with hedged GETs.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.api_clients import get_session
+from utils.latency import get_latency_tracker
+from utils.synthetic import generate_leads
+from agents import DataEnrichmentAgent
+
+
+class SlowAdapter(HTTPAdapter):
+    """Answers every request locally after a sampled delay, honouring read timeouts"""
+
+    def __init__(self, median_ms: float, slow_rate: float, slow_ms: float, seed: int):
+        super().__init__()
+        self.median_ms = median_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def send(self, request, timeout=None, **kwargs):
+        with self._lock:
+            stalled = self._random.random() < self.slow_rate
+            delay = (self.slow_ms if stalled else self._random.lognormvariate(0, 0.4) * self.median_ms) / 1000
+        read_timeout = timeout[1] if isinstance(timeout, tuple) else timeout
+        if read_timeout is not None and delay > read_timeout:
+            time.sleep(read_timeout)
+            raise requests.ReadTimeout(f"Read timed out ({read_timeout:.2f}s)", request=request)
+        time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = 200
+        response.request = request
+        response.url = request.url
+        person = {"name": {"fullName": "Sam Lee"}, "employment": {"title": "VP of Sales"}}
+        company = {"name": "Acme", "tech": ["salesforce", "hubspot"], "category": {"industry": "SaaS"},
+                   "metrics": {"employees": 250}}
+        combined = "/combined/" in request.url
+        response._content = json.dumps({"person": person, "company": company} if combined else person).encode("utf-8")
+        return response
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_mode(label, adaptive, hedge, args, leads, tmp):
+    tracker = get_latency_tracker()
+    tracker.reset()
+    # Fixed mode: timeouts never adapt
+    tracker.min_samples = args.warmup if adaptive else 10 ** 9
+
+    agent = DataEnrichmentAgent("bench_enrichment", "", [])
+    stages = iter(range(10 ** 6))
+
+    def stage():
+        # A cold account cache per stage, like a run over new accounts
+        cache_path = os.path.join(tmp, f"{label.replace(' ', '_')}_{next(stages)}.db")
+        return agent.execute({"leads": leads, "scheduling": {"max_workers": args.workers}, "hedge": hedge,
+                              "account_cache": cache_path})["enriched_leads"]
+
+    # Warm-up stages let the tracker learn both endpoints before measuring
+    stage()
+    while min(entry["samples"] for entry in tracker.stats().values()) < args.warmup:
+        stage()
+
+    stage_ms, failed = [], 0
+    for _ in range(args.stages):
+        started = time.perf_counter()
+        enriched = stage()
+        stage_ms.append((time.perf_counter() - started) * 1000)
+        failed += sum(1 for lead in enriched if lead.get("email") and lead.get("role") == "Unknown")
+
+    stats = tracker.stats().values()
+    hedges, wins = sum(entry["hedges"] for entry in stats), sum(entry["hedge_wins"] for entry in stats)
+    print(f"{label:<18} stage p50 {percentile(stage_ms, 0.5):8.1f} ms  p99 {percentile(stage_ms, 0.99):8.1f} ms  "
+          f"failed lookups {failed:4d}  hedges {hedges:4d} (won {wins})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=40, help="Leads per stage")
+    parser.add_argument("--stages", type=int, default=30, help="Measured stages per mode")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent lookups")
+    parser.add_argument("--median-ms", type=float, default=20, help="Median injected latency")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Share of responses that stall")
+    parser.add_argument("--slow-ms", type=float, default=3000, help="Latency of a stalled response")
+    parser.add_argument("--warmup", type=int, default=100, help="Responses observed before timeouts adapt")
+    parser.add_argument("--seed", type=int, default=42, help="Generator seed")
+    args = parser.parse_args()
+
+    os.environ["CLEARBIT_KEY"] = "bench"
+    # Timed-out lookups are expected here; keep the output to the results table
+    logging.disable(logging.CRITICAL)
+    leads = list(generate_leads(args.leads, seed=args.seed))
+    print(f"{args.stages} stages x {args.leads} leads, {args.workers} workers, "
+          f"{args.slow_rate:.0%} of responses stall for {args.slow_ms:.0f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, adaptive, hedge in (("fixed timeout", False, False),
+                                       ("adaptive timeout", True, False),
+                                       ("adaptive + hedge", True, True)):
+            get_session().mount("https://", SlowAdapter(args.median_ms, args.slow_rate, args.slow_ms, args.seed))
+            run_mode(label, adaptive, hedge, args, leads, tmp)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
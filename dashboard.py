@@ -1,13 +1,89 @@
 import streamlit as st
 import json
+import os
+import time
 from datetime import datetime
 from dotenv import load_dotenv
-from langgraph_builder import LangGraphBuilder
+from utils.result_sink import list_runs, load_manifest, query_records
+from utils.metrics_store import DIMENSIONS, get_metrics_store
 
 load_dotenv()
 
+RESULTS_DIR = os.getenv("RESULTS_DIR", "runs")
+SERVICE_URL = os.getenv("WORKFLOW_SERVICE_URL", "http://127.0.0.1:8765")
+PAGE_SIZE = 25
+
 st.set_page_config(page_title="Lead Gen Dashboard", page_icon="🚀", layout="wide")
 
+
+@st.cache_resource
+def get_runner():
+    """Remote service if one is running, else an in-process warm service
+
+    Either way runs execute in the background and persist their results
+    under RESULTS_DIR, so the page never blocks on a workflow.
+    """
+    from service import ServiceClient, WorkflowService
+
+    client = ServiceClient(SERVICE_URL)
+    if client.health():
+        return client
+    return WorkflowService(config_path="config/workflow.json", results_dir=RESULTS_DIR, max_workers=2)
+
+
+@st.cache_resource
+def get_history_store():
+    return get_metrics_store()
+
+
+@st.cache_data
+def total_steps() -> int:
+    with open("config/workflow.json", "r") as f:
+        return len(json.load(f).get("steps", []))
+
+
+def run_dir(run_id: str) -> str:
+    return os.path.join(RESULTS_DIR, run_id)
+
+
+@st.cache_data(max_entries=256)
+def load_page(run_id: str, step_id: str, field: str, search: str, sort_by: str,
+              descending: bool, page: int, record_count: int):
+    """Server-side filter/sort/page, cached per run
+
+    A step's files never change once it appears in the manifest, so the
+    record count is enough to keep the cache key valid while a run is live.
+    """
+    return query_records(
+        run_dir(run_id), step_id, field,
+        search=search, sort_by=sort_by or None, descending=descending,
+        offset=page * PAGE_SIZE, limit=PAGE_SIZE
+    )
+
+
+def paginated_table(run_id: str, manifest: dict, step_id: str, field: str, sort_options: list, key: str):
+    """Render one record field as a filterable, sortable, paged table"""
+    info = manifest["steps"].get(step_id, {}).get("records", {}).get(field)
+    if not info or not info["count"]:
+        st.info("No records for this step yet.")
+        return
+
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        search = st.text_input("Filter", key=f"{key}_search", placeholder="Search any field...")
+    with col2:
+        sort_by = st.selectbox("Sort by", [""] + sort_options, key=f"{key}_sort")
+    with col3:
+        descending = st.checkbox("Descending", value=True, key=f"{key}_desc")
+
+    total, _ = load_page(run_id, step_id, field, search, sort_by, descending, 0, info["count"])
+    pages = max(1, -(-total // PAGE_SIZE))
+    page = st.number_input(f"Page (1-{pages}, {total} records)", 1, pages, 1, key=f"{key}_page") - 1
+
+    _, rows = load_page(run_id, step_id, field, search, sort_by, descending, page, info["count"])
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
 st.title("🚀 LangGraph Lead Generation Dashboard")
 st.markdown("---")
 
@@ -15,30 +91,39 @@ st.markdown("---")
 with st.sidebar:
     st.header("⚙️ Controls")
     if st.button("🔄 Run Workflow", type="primary"):
-        with st.spinner("Running workflow..."):
-            builder = LangGraphBuilder(config_path="config/workflow.json")
-            result = builder.execute()
-            st.session_state['result'] = result
-            st.success("✅ Workflow completed!")
-    
+        st.session_state['selected_run'] = get_runner().submit()
+
     st.markdown("---")
     st.markdown("### 📊 Workflow Status")
-    if 'result' in st.session_state:
-        st.success("✅ Data loaded")
+
+    runs = list_runs(RESULTS_DIR)
+    if runs:
+        default = runs.index(st.session_state['selected_run']) if st.session_state.get('selected_run') in runs else 0
+        st.session_state['selected_run'] = st.selectbox("Run", runs, index=default)
     else:
         st.info("👉 Click 'Run Workflow' to start")
 
+selected = st.session_state.get('selected_run')
+
 # Main content
-if 'result' in st.session_state:
-    result = st.session_state['result']
-    outputs = result.get('outputs', {})
-    
+if selected and os.path.exists(run_dir(selected)):
+    manifest = load_manifest(run_dir(selected))
+    steps = manifest.get("steps", {})
+    running = manifest.get("finished_at") is None
+
+    if running:
+        st.progress(min(len(steps) / max(total_steps(), 1), 1.0), text=f"Running... {len(steps)} steps done: {', '.join(steps)}")
+    else:
+        st.success(f"✅ Run {selected} completed")
+    for error in manifest.get("errors", []):
+        st.error(error)
+
     # Metrics
-    feedback = outputs.get('feedback_trainer', {})
-    metrics = feedback.get('metrics', {})
-    
+    feedback = steps.get('feedback_trainer', {})
+    metrics = feedback.get('values', {}).get('metrics', {})
+
     col1, col2, col3, col4 = st.columns(4)
-    
+
     with col1:
         st.metric("📊 Open Rate", f"{metrics.get('open_rate', 0):.1%}")
     with col2:
@@ -47,45 +132,49 @@ if 'result' in st.session_state:
         st.metric("💬 Reply Rate", f"{metrics.get('reply_rate', 0):.1%}")
     with col4:
         st.metric("📅 Meeting Rate", f"{metrics.get('meeting_rate', 0):.1%}")
-    
+
     st.markdown("---")
-    
+
     # Leads
-    st.header("👥 Top Ranked Leads")
-    ranked_leads = outputs.get('scoring', {}).get('ranked_leads', [])
-    
-    if ranked_leads:
-        for lead in ranked_leads[:5]:
-            with st.expander(f"🏢 {lead.get('company', 'Unknown')} - {lead.get('contact', 'Unknown')}"):
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Email:** {lead.get('email', 'N/A')}")
-                    st.write(f"**Role:** {lead.get('role', 'N/A')}")
-                with col2:
-                    st.write(f"**Score:** {lead.get('score', 0):.2f}")
-                    st.write(f"**Technologies:** {', '.join(lead.get('technologies', [])[:3])}")
-    else:
-        st.info("No leads found. Check API configuration.")
-    
+    st.header("👥 Ranked Leads")
+    paginated_table(selected, manifest, "scoring", "ranked_leads", ["score", "company", "role"], "leads")
+
     # Emails
     st.markdown("---")
     st.header("✉️ Generated Emails")
-    messages = outputs.get('outreach_content', {}).get('messages', [])
-    
-    if messages:
-        for msg in messages[:3]:
-            with st.container():
-                st.subheader(f"📨 {msg.get('subject', 'No Subject')}")
-                st.write(msg.get('email_body', 'No content'))
-                st.caption(f"To: {msg.get('email', 'N/A')}")
-                st.markdown("---")
-    
+    paginated_table(selected, manifest, "outreach_content", "messages", ["lead", "subject"], "messages")
+
     # Recommendations
+    st.markdown("---")
     st.header("💡 AI Recommendations")
-    recommendations = feedback.get('recommendations', [])
-    
-    for rec in recommendations:
-        st.info(rec.get('recommendation', ''))
+    recs_info = feedback.get('records', {}).get('recommendations')
+    if recs_info:
+        _, recommendations = load_page(selected, "feedback_trainer", "recommendations", "", "", False, 0, recs_info["count"])
+        for rec in recommendations:
+            st.info(rec.get('recommendation', ''))
+
+    # Cross-campaign history
+    st.markdown("---")
+    st.header("📈 Trends Across Campaigns")
+    store = get_history_store()
+    dimension = st.selectbox("Segment", ["campaign"] + DIMENSIONS, key="trend_dimension")
+    window = store.window(dimension, days=30)
+    if window:
+        st.dataframe(
+            [{k: row[k] for k in ("value", "campaigns", "sent", "open_rate", "reply_rate", "meeting_rate")} for row in window],
+            use_container_width=True, hide_index=True
+        )
+        top_value = window[0]["value"]
+        series = store.trend(dimension, top_value, resolution="day", days=90)
+        st.caption(f"Daily reply rate for {dimension} = {top_value}")
+        st.line_chart({datetime.fromtimestamp(p["bucket_ts"]).date(): p["reply_rate"] for p in series})
+    else:
+        st.info("No campaign history yet.")
+
+    # Poll progress of a running workflow without blocking the session
+    if running:
+        time.sleep(1)
+        st.rerun()
 
 else:
     st.info("👈 Click 'Run Workflow' in the sidebar to get started!")
\ No newline at end of file
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Send dispatcher: releases scheduled sends (see the send step's "schedule"
+input) as they come due in each recipient's business hours, in rate-limited
+batches. Safe to restart at any time; run one per schedule database:
+
+    python dispatcher.py
+    python dispatcher.py --rate 120 --stats
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from dotenv import load_dotenv
+from agents.registry import AgentRegistry
+from utils.logger import setup_logger
+from utils.event_store import get_event_store
+from utils.send_schedule import SendDispatcher, get_send_schedule
+
+logger = setup_logger("Dispatcher")
+
+
+def build_dispatcher(config_path: str, rate_per_min: float = None) -> SendDispatcher:
+    """Dispatcher sending through the workflow's OutreachExecutorAgent step"""
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    registry = AgentRegistry(config.get("agents", {}))
+    step = next((s for s in config.get("steps", []) if s["agent"] == "OutreachExecutorAgent"), None)
+    if step is None:
+        raise ValueError(f"No OutreachExecutorAgent step in {config_path}")
+
+    options = step.get("inputs", {}).get("schedule") or {}
+    agent = registry.get(step["agent"])(
+        agent_id=step["id"],
+        instructions=step.get("instructions", ""),
+        tools=step.get("tools", [])
+    )
+    if not os.getenv("APOLLO_API_KEY"):
+        logger.warning("Apollo API key not found, sends will be simulated")
+    event_store = get_event_store(options.get("event_store"))
+
+    schedule = get_send_schedule(options.get("store"))
+    # Replies and meetings arriving in this process stop follow-ups too
+    schedule.attach(event_store)
+    return SendDispatcher(
+        schedule,
+        lambda entry: agent._send_scheduled(entry, event_store),
+        rate_per_min=rate_per_min or options.get("rate_per_min", 60),
+        batch_size=options.get("batch_size", 20)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LangGraph Lead Generation send dispatcher")
+    parser.add_argument("--config", default="config/workflow.json", help="Path to workflow config")
+    parser.add_argument("--rate", type=float, help="Max sends per minute (default: the send step's rate_per_min)")
+    parser.add_argument("--stats", action="store_true", help="Print schedule counts and exit")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    dispatcher = build_dispatcher(args.config, args.rate)
+    if args.stats:
+        print(json.dumps(dispatcher.schedule.stats(), indent=2))
+        return 0
+
+    stop = threading.Event()
+    thread = threading.Thread(target=dispatcher.run_forever, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping dispatcher")
+        stop.set()
+        thread.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
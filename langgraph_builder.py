@@ -1,21 +1,18 @@
 import json
 import os
+import time
+from contextlib import nullcontext
 from typing import Dict, Any, List
 from dotenv import load_dotenv
-from langgraph.graph import StateGraph, END
 from typing_extensions import TypedDict
 from utils.logger import setup_logger
+from utils.run_context import RunContext, activate
+from utils.budget import RunBudget, EXHAUSTED
+from utils.profiler import SamplingProfiler, log_summary
 
-# Import all agents
-from agents import (
-    ProspectSearchAgent,
-    DataEnrichmentAgent,
-    ScoringAgent,
-    OutreachContentAgent,
-    OutreachExecutorAgent,
-    ResponseTrackerAgent,
-    FeedbackTrainerAgent
-)
+# Agents are resolved lazily through the registry; LangGraph itself is only
+# imported when a graph is built, so config-only commands start fast
+from agents.registry import AgentRegistry
 
 # Load environment variables
 load_dotenv()
@@ -37,6 +34,7 @@ class LangGraphBuilder:
         self.config_path = config_path
         self.config = self._load_config()
         self.agent_map = self._create_agent_map()
+        self.agents = {}
         self.graph = None
         
     def _load_config(self) -> Dict:
@@ -53,20 +51,64 @@ class LangGraphBuilder:
         
         return json.loads(config_str)
     
-    def _create_agent_map(self) -> Dict:
-        """Map agent names to classes"""
-        return {
-            "ProspectSearchAgent": ProspectSearchAgent,
-            "DataEnrichmentAgent": DataEnrichmentAgent,
-            "ScoringAgent": ScoringAgent,
-            "OutreachContentAgent": OutreachContentAgent,
-            "OutreachExecutorAgent": OutreachExecutorAgent,
-            "ResponseTrackerAgent": ResponseTrackerAgent,
-            "FeedbackTrainerAgent": FeedbackTrainerAgent
-        }
+    def _create_agent_map(self) -> AgentRegistry:
+        """Map agent names to lazily imported classes
+        
+        Third-party agents can be registered in the config as
+        "agents": {"MyAgent": "my_package.my_module:MyAgent"}
+        """
+        return AgentRegistry(self.config.get("agents", {}))
+    
+    def validate(self) -> List[str]:
+        """Check the config without importing agents or building the graph"""
+        issues = []
+        seen_steps = set()
+        
+        steps = self.config.get("steps", [])
+        if not steps:
+            issues.append("Workflow has no steps")
+        
+        for step in steps:
+            step_id = step.get("id")
+            if not step_id:
+                issues.append("Step without an id")
+                continue
+            if step_id in seen_steps:
+                issues.append(f"Duplicate step id: {step_id}")
+            
+            if step.get("agent") not in self.agent_map:
+                issues.append(f"{step_id}: unknown agent {step.get('agent')}")
+            
+            # References must point at config or an earlier step
+            for key, value in step.get("inputs", {}).items():
+                if isinstance(value, str) and value.startswith("{{") and value.endswith("}}"):
+                    ref_step = value[2:-2].strip().split(".")[0]
+                    if ref_step != "config" and ref_step not in seen_steps:
+                        issues.append(f"{step_id}.{key}: reference to unknown or later step '{ref_step}'")
+            
+            seen_steps.add(step_id)
+        
+        for provider, limits in (self.config.get("budgets") or {}).get("providers", {}).items():
+            for limit in limits:
+                if limit not in ("max_calls", "max_tokens"):
+                    issues.append(f"budgets.providers.{provider}: unknown limit '{limit}'")
+        
+        return issues
+    
+    def plan(self, results_dir: str = "runs") -> Dict[str, Any]:
+        """Estimate API calls, LLM tokens and wall time per step without running
+        
+        Uses throughput recorded in past run manifests under results_dir and
+        warns when a step would exceed a provider's rate limit.
+        """
+        from utils.planner import plan
+        
+        return plan(self.config, results_dir=results_dir)
     
-    def build_graph(self) -> StateGraph:
+    def build_graph(self):
         """Build LangGraph from config"""
+        from langgraph.graph import StateGraph, END
+        
         logger.info("Building LangGraph workflow...")
         
         # Create graph
@@ -89,11 +131,26 @@ class LangGraphBuilder:
                 instructions=step.get("instructions", ""),
                 tools=step.get("tools", [])
             )
+            self.agents[step_id] = agent
             
             # Create node function
             def create_node_fn(agent_instance, step_config):
-                def node_fn(state: WorkflowState) -> WorkflowState:
+                def node_fn(state: WorkflowState, config: Dict = None) -> WorkflowState:
                     logger.info(f"Executing node: {step_config['id']}")
+                    run_context = (config or {}).get("configurable", {}).get("run_context") or RunContext()
+                    result_sink = run_context.result_sink
+                    started = time.perf_counter()
+                    run_context.step = step_config["id"]
+                    
+                    # Past the run's wall-time budget, remaining steps are skipped
+                    budget = run_context.budget
+                    if budget and budget.tier() == EXHAUSTED:
+                        logger.warning(f"Skipping node {step_config['id']}: run wall time exhausted")
+                        budget.degrade(step_config["id"], "skipped step", "run wall time exhausted")
+                        run_context.emit("node_skipped", step=step_config["id"], reason="run wall time exhausted")
+                        return state
+                    
+                    run_context.emit("node_started", step=step_config["id"])
                     
                     try:
                         # Resolve inputs from previous outputs
@@ -103,15 +160,34 @@ class LangGraphBuilder:
                         )
                         
                         # Execute agent
-                        output = agent_instance.execute(inputs)
+                        with activate(run_context), (
+                            run_context.profiler.node(step_config["id"]) if run_context.profiler else nullcontext()
+                        ):
+                            output = agent_instance.execute(inputs)
+                        
+                        duration_ms = round((time.perf_counter() - started) * 1000, 1)
                         
                         # Update state
                         state["outputs"][step_config["id"]] = output
                         state["current_step"] = step_config["id"]
                         
+                        # Stream this step's records out as soon as it finishes
+                        if result_sink:
+                            result_sink.write_step(step_config["id"], output, duration_ms=duration_ms)
+                        
+                        run_context.emit(
+                            "node_finished",
+                            step=step_config["id"],
+                            duration_ms=duration_ms,
+                            records={k: len(v) for k, v in output.items() if isinstance(v, list)}
+                        )
+                        
                     except Exception as e:
                         logger.error(f"Error in node {step_config['id']}: {str(e)}")
                         state["errors"].append(f"{step_config['id']}: {str(e)}")
+                        if result_sink:
+                            result_sink.write_error(f"{step_config['id']}: {str(e)}")
+                        run_context.emit("node_failed", step=step_config["id"], error=str(e))
                     
                     return state
                 
@@ -133,6 +209,26 @@ class LangGraphBuilder:
         
         return self.graph
     
+    def warm_up(self):
+        """Build the graph and open clients/connection pools ahead of the first run
+        
+        Used by long-lived processes (see service.py) so requests don't pay
+        cold-start costs; one-shot CLI runs keep everything lazy.
+        """
+        from utils.api_clients import get_session
+        
+        if not self.graph:
+            self.build_graph()
+        
+        get_session()
+        for step_id, agent in self.agents.items():
+            try:
+                agent.warm_up()
+            except Exception as e:
+                logger.warning(f"Warm-up failed for {step_id}: {str(e)}")
+        
+        logger.info(f"Warmed up {len(self.agents)} agents")
+    
     def _resolve_inputs(self, input_config: Dict, outputs: Dict) -> Dict:
         """Resolve input references from previous step outputs"""
         resolved = {}
@@ -166,24 +262,68 @@ class LangGraphBuilder:
         
         return resolved
     
-    def execute(self) -> Dict[str, Any]:
-        """Execute the workflow"""
+    def execute(self, result_sink=None, on_event=None, run_id: str = None,
+                profile: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Execute the workflow
+        
+        If a result sink (see utils.result_sink) is given, each step's output
+        is written to it as soon as the step completes. on_event receives
+        per-node progress events. Safe to call concurrently once built.
+        
+        profile ({"dir": ..., "interval_ms": 5}) samples each node's stacks and
+        writes per-node flame graphs plus a top self-time summary to "dir"
+        (default: <run dir>/profile).
+        """
         if not self.graph:
             self.build_graph()
         
-        logger.info("Starting workflow execution...")
+        run_context = RunContext(
+            run_id=run_id,
+            result_sink=result_sink,
+            on_event=on_event,
+            # Fresh per run: limits come from the "budgets" section of the config
+            budget=RunBudget.from_config(self.config.get("budgets")),
+            profiler=SamplingProfiler(interval=profile.get("interval_ms", 5) / 1000) if profile is not None else None
+        )
+        logger.info(f"Starting workflow execution (run {run_context.run_id})...")
+        run_context.emit("run_started", steps=[step["id"] for step in self.config.get("steps", [])])
         
         # Initial state
         initial_state = WorkflowState(
             current_step="",
-            data={},
+            data={"run_id": run_context.run_id},
             outputs={},
             errors=[]
         )
         
         # Execute graph
-        final_state = self.graph.invoke(initial_state)
+        final_state = self.graph.invoke(
+            initial_state,
+            config={"configurable": {"run_context": run_context}}
+        )
+        
+        # Report what the budget cost and which steps took cheaper paths
+        if run_context.budget:
+            report = run_context.budget.report()
+            final_state["data"]["budget"] = report
+            if result_sink:
+                result_sink.write_summary("budget", report)
+            for entry in report["degradations"]:
+                logger.warning(f"Degraded {entry['step']}: {entry['action']} x{entry['count']} ({entry['reason']})")
+        
+        if run_context.profiler:
+            run_dir = getattr(result_sink, "run_dir", None) or os.path.join("runs", run_context.run_id)
+            summary = run_context.profiler.write(profile.get("dir") or os.path.join(run_dir, "profile"))
+            final_state["data"]["profile"] = summary
+            if result_sink:
+                result_sink.write_summary("profile", summary)
+            log_summary(summary, log=logger)
+        
+        if result_sink:
+            result_sink.close()
         
+        run_context.emit("run_finished", errors=len(final_state["errors"]),
+                         degradations=len(final_state["data"].get("budget", {}).get("degradations", [])))
         logger.info("Workflow execution completed")
         
         if final_state["errors"]:
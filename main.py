@@ -4,13 +4,111 @@ Main entry point for LangGraph Lead Generation Workflow
 """
 
 import sys
+import argparse
 from dotenv import load_dotenv
 from langgraph_builder import LangGraphBuilder
 from utils.logger import setup_logger
-import json
+from utils.result_sink import JsonlResultSink
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="LangGraph Lead Generation Workflow")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="run",
+        choices=["run", "validate", "plan"],
+        help="run the workflow (default), only validate the config, or estimate its cost"
+    )
+    parser.add_argument("--config", default="config/workflow.json", help="Path to workflow config")
+    parser.add_argument("--results-dir", default="runs", help="Directory for per-run result files")
+    parser.add_argument("--compress", action="store_true", help="Gzip the JSONL result files")
+    parser.add_argument("--parquet", action="store_true", help="Also write Parquet files (needs pyarrow)")
+    parser.add_argument("--service-url", help="Send the run to a running workflow service (see service.py)")
+    parser.add_argument("--record", metavar="CASSETTE", help="Record all HTTP/LLM exchanges to a cassette file")
+    parser.add_argument("--replay", metavar="CASSETTE", help="Serve HTTP/LLM responses from a cassette (offline)")
+    parser.add_argument(
+        "--replay-latency",
+        type=float,
+        default=0,
+        metavar="SCALE",
+        help="With --replay, sleep for the recorded latency times SCALE (e.g. 1.0)"
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        metavar="DIR",
+        help="Sample each step and write flame graphs plus a hot-function summary (default DIR: <run dir>/profile)"
+    )
+    parser.add_argument("--profile-interval", type=float, default=5, metavar="MS", help="Sampling interval for --profile")
+    return parser.parse_args(argv)
+
+def validate(config_path: str, logger) -> int:
+    """Validate the workflow config without loading any agent"""
+    builder = LangGraphBuilder(config_path=config_path)
+    issues = builder.validate()
+    
+    for issue in issues:
+        logger.error(f"  - {issue}")
+    
+    if issues:
+        logger.error(f"Config invalid: {len(issues)} issue(s)")
+        return 1
+    
+    logger.info(f"Config valid: {len(builder.config.get('steps', []))} steps")
+    return 0
+
+def show_plan(config_path: str, results_dir: str, logger) -> int:
+    """Print estimated calls, tokens and time per step without running anything"""
+    builder = LangGraphBuilder(config_path=config_path)
+    plan = builder.plan(results_dir=results_dir)
+    
+    logger.info(f"Execution plan ({plan['history_runs']} past runs used for timing)")
+    for step in plan["steps"]:
+        calls = ", ".join(f"{provider}={n:.0f}" for provider, n in step["calls"].items()) or "no API calls"
+        notes = f" - {'; '.join(step['notes'])}" if step["notes"] else ""
+        logger.info(
+            f"  [{step['step']}] {step['items']} items, {calls}, {step['tokens']} tokens, "
+            f"~{step['est_ms'] / 1000:.1f}s ({step['bound']}-bound, {step['source']}){notes}"
+        )
+    
+    totals = plan["totals"]
+    calls = ", ".join(f"{provider}={n:.0f}" for provider, n in totals["calls"].items())
+    calls = f"{calls} calls" if calls else "no API calls"
+    logger.info(f"Total: {calls}, {totals['tokens']} tokens, ~{totals['est_seconds']}s")
+    logger.info(f"Critical path: {' -> '.join(plan['critical_path'])} (bottleneck: {plan['bottleneck']})")
+    for warning in plan["warnings"]:
+        logger.warning(f"  ! {warning}")
+    
+    return 0
+
+def run_remote(service_url: str, logger) -> int:
+    """Submit the run to a warm workflow service and follow its progress"""
+    from service import ServiceClient
+    
+    client = ServiceClient(service_url)
+    run_id = client.submit()
+    logger.info(f"Submitted run {run_id} to {service_url}")
+    
+    for event in client.stream_events(run_id):
+        if event["type"] == "node_finished":
+            logger.info(f"[{event['step']}] done in {event['duration_ms']:.0f} ms {event.get('records', {})}")
+        elif event["type"] in ("node_failed", "run_failed"):
+            logger.error(f"[{event.get('step', run_id)}] {event.get('error', '')}")
+    
+    status = client.status(run_id)
+    for line in status["summary"]:
+        logger.info(line)
+    for error in status["errors"]:
+        logger.error(f"  - {error}")
+    logger.info(f"Run {run_id} {status['status']}, results in {status['run_dir']}")
+    
+    return 0 if status["status"] == "completed" else 1
+
+def main(argv=None):
     """Run the workflow"""
+    args = parse_args(argv)
     
     # Load environment variables
     load_dotenv()
@@ -18,25 +116,54 @@ def main():
     # Setup logger
     logger = setup_logger("Main")
     
+    if args.command == "validate":
+        return validate(args.config, logger)
+    
+    if args.command == "plan":
+        return show_plan(args.config, args.results_dir, logger)
+    
+    if args.service_url:
+        return run_remote(args.service_url, logger)
+    
+    # Record/replay must be active before the first HTTP session or LLM client exists
+    if args.record or args.replay:
+        from utils.cassette import activate_cassette
+        activate_cassette(
+            args.record or args.replay,
+            "record" if args.record else "replay",
+            simulate_latency=args.replay_latency > 0,
+            latency_scale=args.replay_latency or 1.0
+        )
+    
     logger.info("="*60)
     logger.info("LangGraph Autonomous Lead Generation Workflow")
     logger.info("="*60)
     
     try:
         # Create builder
-        builder = LangGraphBuilder(config_path="config/workflow.json")
+        builder = LangGraphBuilder(config_path=args.config)
+        
+        # Stream each step's records to disk instead of printing them
+        result_sink = JsonlResultSink(
+            root=args.results_dir,
+            compress=args.compress,
+            parquet=args.parquet
+        )
         
         # Build and execute workflow
-        result = builder.execute()
+        profile = None
+        if args.profile is not None:
+            profile = {"dir": args.profile or None, "interval_ms": args.profile_interval}
+        result = builder.execute(result_sink=result_sink, profile=profile)
         
-        # Print results
+        # Print a compact summary
         logger.info("\n" + "="*60)
         logger.info("WORKFLOW RESULTS")
         logger.info("="*60)
         
-        for step_id, output in result["outputs"].items():
-            logger.info(f"\n[{step_id}]")
-            logger.info(json.dumps(output, indent=2))
+        for line in result_sink.summary():
+            logger.info(line)
+        logger.info(f"Results written to {result_sink.run_dir}")
         
         if result["errors"]:
             logger.error("\n" + "="*60)
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Long-lived workflow service: keeps a warm compiled graph and runs workflows
+concurrently behind a small local HTTP API
+
+    POST /runs                 start a run          -> {"run_id": ...}
+    GET  /runs                 list known runs
+    GET  /runs/<id>            run status and per-step summary
+    GET  /runs/<id>/events     NDJSON stream of progress events until the run ends
+    GET  /health               liveness check
+    POST /webhooks/events      ingest open/click/reply/meeting events
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Iterator, List
+from dotenv import load_dotenv
+from langgraph_builder import LangGraphBuilder
+from utils.logger import setup_logger
+from utils.result_sink import JsonlResultSink
+from utils.event_store import get_event_store
+from utils.bandit import get_bandit
+from utils.send_schedule import get_send_schedule
+from utils.webhooks import WEBHOOK_PATH, handle_webhook
+from utils.polling import get_campaign_poller
+
+logger = setup_logger("WorkflowService")
+
+
+class RunRecord:
+    """Status and buffered progress events of one run"""
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.status = "queued"
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.events: List[Dict[str, Any]] = []
+        self.summary: List[str] = []
+        self.errors: List[str] = []
+        self.run_dir = None
+        self._changed = threading.Condition()
+
+    def add_event(self, event: Dict[str, Any]):
+        with self._changed:
+            event["seq"] = len(self.events)
+            self.events.append(event)
+            self._changed.notify_all()
+
+    def finish(self, status: str):
+        with self._changed:
+            self.status = status
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    def wait_events(self, since: int, timeout: float) -> List[Dict[str, Any]]:
+        """Block until there are events after `since` or the run ends"""
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > since or self.done, timeout=timeout)
+            return self.events[since:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "summary": self.summary,
+            "errors": self.errors,
+            "run_dir": self.run_dir,
+            "events": len(self.events)
+        }
+
+
+class WorkflowService:
+    """Owns one warm LangGraphBuilder and a worker pool of concurrent runs"""
+
+    def __init__(self, config_path: str = "config/workflow.json", results_dir: str = "runs",
+                 max_workers: int = 4):
+        self.builder = LangGraphBuilder(config_path=config_path)
+        self.builder.warm_up()
+        self.results_dir = results_dir
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="run")
+        self.runs: Dict[str, RunRecord] = {}
+        self._lock = threading.Lock()
+
+    def submit(self) -> str:
+        """Queue a run and return its id immediately"""
+        result_sink = JsonlResultSink(root=self.results_dir)
+        record = RunRecord(result_sink.run_id)
+        record.run_dir = result_sink.run_dir
+
+        with self._lock:
+            self.runs[record.run_id] = record
+
+        self.executor.submit(self._run, record, result_sink)
+        logger.info(f"Queued run {record.run_id}")
+        return record.run_id
+
+    def get(self, run_id: str) -> RunRecord:
+        with self._lock:
+            return self.runs.get(run_id)
+
+    def list_runs(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [record.to_dict() for record in self.runs.values()]
+
+    def _run(self, record: RunRecord, result_sink: JsonlResultSink):
+        record.status = "running"
+        try:
+            result = self.builder.execute(
+                result_sink=result_sink,
+                on_event=record.add_event,
+                run_id=record.run_id
+            )
+            record.summary = result_sink.summary()
+            record.errors = result["errors"]
+            record.finish("completed")
+        except Exception as e:
+            logger.error(f"Run {record.run_id} failed: {str(e)}", exc_info=True)
+            record.errors.append(str(e))
+            result_sink.write_error(str(e))
+            result_sink.close()
+            record.add_event({"type": "run_failed", "run_id": record.run_id, "ts": time.time(), "error": str(e)})
+            record.finish("failed")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Routes HTTP requests to the WorkflowService"""
+
+    service: WorkflowService = None
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_json(self, payload: Any, status: int = 200):
+        body = json.dumps(payload, default=str).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+        if parts == ["health"]:
+            return self._send_json({"status": "ok"})
+        if parts == ["runs"]:
+            return self._send_json(self.service.list_runs())
+
+        if len(parts) >= 2 and parts[0] == "runs":
+            record = self.service.get(parts[1])
+            if not record:
+                return self._send_json({"error": "unknown run"}, 404)
+            if len(parts) == 2:
+                return self._send_json(record.to_dict())
+            if parts[2:] == ["events"]:
+                return self._stream_events(record)
+
+        self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+
+        if parts == ["runs"]:
+            self._read_json()
+            run_id = self.service.submit()
+            return self._send_json({"run_id": run_id}, 202)
+
+        if "/" + "/".join(parts) == WEBHOOK_PATH:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                return self._send_json(handle_webhook(get_event_store(), self.rfile.read(length)))
+            except (ValueError, TypeError) as e:
+                return self._send_json({"error": str(e)}, 400)
+
+        self._send_json({"error": "not found"}, 404)
+
+    def _stream_events(self, record: RunRecord):
+        """Write events as NDJSON lines until the run is done"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+
+        sent = 0
+        try:
+            while True:
+                events = record.wait_events(sent, timeout=15)
+                for event in events:
+                    self.wfile.write((json.dumps(event, default=str) + "\n").encode("utf-8"))
+                sent += len(events)
+                self.wfile.flush()
+                if record.done and sent >= len(record.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            logger.debug(f"Event stream for {record.run_id} closed by client")
+
+
+class ServiceClient:
+    """Minimal stdlib client for the workflow service"""
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8765", timeout: float = 10):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, payload: Dict = None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(
+            f"{self.base_url}{path}",
+            data=data,
+            method=method,
+            headers={"Content-Type": "application/json"}
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def health(self) -> bool:
+        try:
+            with self._request("GET", "/health") as response:
+                return response.status == 200
+        except OSError:
+            return False
+
+    def submit(self) -> str:
+        with self._request("POST", "/runs", {}) as response:
+            return json.loads(response.read())["run_id"]
+
+    def status(self, run_id: str) -> Dict[str, Any]:
+        with self._request("GET", f"/runs/{run_id}") as response:
+            return json.loads(response.read())
+
+    def stream_events(self, run_id: str) -> Iterator[Dict[str, Any]]:
+        """Yield progress events as they arrive"""
+        request = urllib.request.Request(f"{self.base_url}/runs/{run_id}/events")
+        with urllib.request.urlopen(request, timeout=None) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def serve(config_path: str, host: str, port: int, workers: int, results_dir: str, poll_endpoint: str = None):
+    """Start the service and block until interrupted"""
+    _Handler.service = WorkflowService(config_path=config_path, results_dir=results_dir, max_workers=workers)
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    logger.info(f"Workflow service listening on http://{host}:{port} ({workers} workers)")
+
+    # Webhook and polled events update variant allocation as they arrive
+    get_bandit().attach(get_event_store())
+    # ...and replies/meetings cancel pending follow-ups of scheduled sequences
+    get_send_schedule().attach(get_event_store())
+
+    # Providers without webhooks: poll registered campaigns incrementally in the background
+    stop_polling = threading.Event()
+    if poll_endpoint:
+        poller = get_campaign_poller(get_event_store(), poll_endpoint)
+        threading.Thread(target=poller.run_forever, args=(stop_polling,), name="poller", daemon=True).start()
+        logger.info(f"Polling campaign events from {poll_endpoint}")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down workflow service")
+    finally:
+        stop_polling.set()
+        server.server_close()
+        _Handler.service.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LangGraph Lead Generation workflow service")
+    parser.add_argument("--config", default="config/workflow.json", help="Path to workflow config")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (local only by default)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent runs")
+    parser.add_argument("--results-dir", default="runs", help="Directory for per-run result files")
+    parser.add_argument("--poll-endpoint", help="Events endpoint to poll for campaigns (providers without webhooks)")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    serve(args.config, args.host, args.port, args.workers, args.results_dir, args.poll_endpoint)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,59 @@
+from utils.bandit import VariantBandit
+from utils.event_store import EventStore
+
+
+def bandit(tmp_path, seed=1):
+    return VariantBandit(str(tmp_path / "bandit.db"), seed=seed)
+
+
+def test_choice_shifts_towards_the_rewarded_arm(tmp_path):
+    arms = bandit(tmp_path)
+    for _ in range(50):
+        arms.record_trial("tone", "casual")
+        arms.record_trial("tone", "formal")
+        arms.record_reward("tone", "casual")
+    arms.record_reward("tone", "formal")
+
+    picks = [arms.choose("tone", ["casual", "formal"]) for _ in range(200)]
+
+    assert picks.count("casual") > 190
+    assert [row["arm"] for row in arms.stats("tone")] == ["casual", "formal"]
+
+
+def test_posteriors_survive_a_restart(tmp_path):
+    arms = bandit(tmp_path)
+    arms.record_trial("tone", "casual")
+    arms.record_reward("tone", "casual")
+    arms.record_trial("tone", "formal")
+
+    stats = {row["arm"]: row for row in bandit(tmp_path).stats("tone")}
+
+    assert (stats["casual"]["trials"], stats["casual"]["successes"]) == (1, 1)
+    assert (stats["formal"]["trials"], stats["formal"]["successes"]) == (1, 0)
+
+
+def test_reward_without_a_trial_keeps_beta_at_the_prior(tmp_path):
+    arms = bandit(tmp_path)
+    arms.record_reward("tone", "casual")
+
+    assert arms.stats("tone") == [{"arm": "casual", "trials": 1.0, "successes": 1.0, "mean": 2 / 3}]
+
+
+def test_events_update_each_experiment_on_its_own_reward_flag(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    arms = bandit(tmp_path)
+    arms.attach(store)
+    arms.attach(store)
+    segments = {"tone": "casual", "subject_variant": "question"}
+    store.record_send("c1", "a@example.com", segments=segments)
+    store.record_send("c1", "b@example.com", segments=segments, simulated=True)
+
+    store.ingest({"event_id": "o1", "campaign_id": "c1", "email": "a@example.com", "type": "open"})
+    store.ingest({"event_id": "r1", "campaign_id": "c1", "email": "b@example.com", "type": "reply",
+                  "simulated": True})
+
+    subject = arms.stats("subject_variant")[0]
+    tone = arms.stats("tone")[0]
+    # Attached twice but counted once; the simulated send and its reply are ignored
+    assert (subject["trials"], subject["successes"]) == (1, 1)
+    assert (tone["trials"], tone["successes"]) == (1, 0)
@@ -0,0 +1,85 @@
+from utils.budget import DEGRADED, EXHAUSTED, FULL, RunBudget, token_usage
+
+
+def test_tiers_gate_calls_by_priority():
+    budget = RunBudget({"openai": {"max_calls": 10}}, degrade_at=0.8, min_score=0.6)
+
+    assert all(budget.acquire("openai") for _ in range(8))
+    assert budget.tier("openai") == DEGRADED
+    # Over degrade_at only scored, high-priority work gets through
+    assert not budget.acquire("openai")
+    assert not budget.acquire("openai", priority=0.5)
+    assert budget.acquire("openai", priority=0.9)
+    assert budget.acquire("openai", priority=0.6)
+    assert budget.tier("openai") == EXHAUSTED
+    assert not budget.acquire("openai", priority=1.0)
+    assert budget.usage["openai"]["calls"] == 10
+
+
+def test_token_limit_and_zero_limits_count_as_usage():
+    budget = RunBudget({"openai": {"max_tokens": 1000}, "clearbit": {"max_calls": 0}})
+
+    budget.charge("openai", tokens=900)
+
+    assert budget.tier("openai") == DEGRADED
+    assert budget.tier("clearbit") == EXHAUSTED
+    assert budget.tier("hunter") == FULL
+    assert budget.reason("clearbit") == "clearbit budget exhausted"
+
+
+def test_wall_time_counts_against_every_provider():
+    budget = RunBudget({"openai": {"max_calls": 10}}, max_wall_seconds=100)
+    budget.started_at -= 90
+
+    assert budget.tier("openai") == DEGRADED
+    assert budget.tier("hunter") == DEGRADED
+    assert budget.reason("hunter") == "run wall time over 80%, priority below 0.6"
+
+
+def test_grant_runs_on_a_worker_and_settles_actual_usage():
+    budget = RunBudget({"clearbit": {"max_calls": 10}})
+    grant = budget.grant("clearbit", calls=4)
+    assert budget.usage["clearbit"]["calls"] == 4
+
+    worker = RunBudget.from_grant(grant)
+    assert [worker.acquire("clearbit", priority=0.0) for _ in range(5)] == [True] * 4 + [False]
+    worker.degrade("enrichment", "skipped clearbit", "clearbit budget exhausted")
+    budget.settle(grant, {"usage": {"clearbit": {"calls": 2}}, "degradations": worker.report()["degradations"]})
+
+    assert budget.usage["clearbit"]["calls"] == 2
+    assert budget.degradations == [{"step": "enrichment", "action": "skipped clearbit",
+                                    "reason": "clearbit budget exhausted", "count": 1}]
+    budget.settle(budget.grant("clearbit", calls=3))
+    assert budget.usage["clearbit"]["calls"] == 2
+
+
+def test_grant_is_refused_like_an_acquire():
+    budget = RunBudget({"clearbit": {"max_calls": 1}})
+
+    assert budget.grant("clearbit") is not None
+    assert budget.grant("clearbit", priority=1.0) is None
+
+
+def test_repeated_degradations_are_counted():
+    budget = RunBudget()
+    for _ in range(3):
+        budget.degrade("outreach_content", "template message", "openai budget exhausted")
+    budget.degrade("outreach_content", "template message", "run wall time exhausted")
+
+    assert [entry["count"] for entry in budget.report()["degradations"]] == [3, 1]
+
+
+def test_from_config_without_budgets_is_none():
+    assert RunBudget.from_config(None) is None
+    assert RunBudget.from_config({"providers": {"openai": {"max_calls": 5}}, "min_score": 0.7}).min_score == 0.7
+
+
+def test_token_usage_falls_back_to_an_estimate():
+    class Response:
+        content = "x" * 400
+        usage_metadata = None
+        response_metadata = {"token_usage": {}}
+
+    assert token_usage(Response()) == 100
+    Response.usage_metadata = {"total_tokens": 42}
+    assert token_usage(Response()) == 42
@@ -0,0 +1,81 @@
+import pytest
+import requests
+
+import utils.cassette as cassette_module
+from utils.cassette import Cassette, CassetteMiss, activate_cassette, cassette_adapter, llm_http_client
+
+SEARCH = "https://api.apollo.io/v1/mixed_people/search"
+
+
+def recorded(tmp_path, exchanges):
+    path = str(tmp_path / "http.jsonl.gz")
+    tape = Cassette(path, mode="record")
+    for method, url, body, content in exchanges:
+        tape.record(method, url, body, 200, "OK",
+                    {"Content-Type": "application/json", "Authorization": "Bearer secret"}, content, 120.0)
+    tape.save()
+    return path
+
+
+def session(path, **kwargs):
+    http = requests.Session()
+    http.mount("https://", cassette_adapter(Cassette(path, **kwargs)))
+    return http
+
+
+def test_replay_matches_by_body_first(tmp_path):
+    path = recorded(tmp_path, [("POST", SEARCH, b'{"page": 1}', b'{"people": [1]}'),
+                               ("POST", SEARCH, b'{"page": 2}', b'{"people": [2]}')])
+    http = session(path)
+
+    assert http.post(SEARCH, data=b'{"page": 2}').json() == {"people": [2]}
+    assert http.post(SEARCH, data=b'{"page": 1}').json() == {"people": [1]}
+
+
+def test_unmatched_bodies_replay_in_order_on_the_same_route(tmp_path):
+    path = recorded(tmp_path, [("POST", SEARCH, b'{"ts": 1}', b"first"),
+                               ("POST", SEARCH, b'{"ts": 2}', b"second")])
+    http = session(path)
+
+    assert http.post(SEARCH + "?run=9", data=b'{"ts": 8}').content == b"first"
+    assert http.post(SEARCH, data=b'{"ts": 9}').content == b"second"
+    with pytest.raises(CassetteMiss):
+        http.post(SEARCH, data=b'{"ts": 10}')
+
+
+def test_recorded_exchanges_keep_no_credentials(tmp_path):
+    path = recorded(tmp_path, [("GET", SEARCH, None, bytes(range(256)))])
+
+    entry = Cassette(path).entries[0]
+    response = session(path).get(SEARCH)
+
+    assert entry["headers"] == {"content-type": "application/json"}
+    assert response.content == bytes(range(256))
+    assert entry["elapsed_ms"] == 120.0
+
+
+def test_replay_can_simulate_the_recorded_latency(tmp_path, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(cassette_module.time, "sleep", sleeps.append)
+    path = recorded(tmp_path, [("GET", SEARCH, None, b"{}")])
+
+    session(path, simulate_latency=True, latency_scale=0.5).get(SEARCH)
+
+    assert sleeps == [0.06]
+
+
+def test_llm_client_replays_through_the_active_cassette(tmp_path, monkeypatch):
+    monkeypatch.setattr(cassette_module, "_cassette", None)
+    monkeypatch.delenv("HTTP_CASSETTE", raising=False)
+    assert llm_http_client() is None
+
+    url = "https://api.openai.com/v1/chat/completions"
+    path = recorded(tmp_path, [("POST", url, b'{"model": "gpt-4"}', b'{"choices": []}')])
+    activate_cassette(path, "replay")
+
+    assert llm_http_client().post(url, content=b'{"model": "gpt-4"}').json() == {"choices": []}
+
+
+def test_unknown_mode_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(str(tmp_path / "http.jsonl.gz"), mode="append")
@@ -0,0 +1,61 @@
+from utils.event_store import EventStore
+from utils.synthetic import generate_leads
+
+
+def store(tmp_path):
+    return EventStore(str(tmp_path / "events.db"))
+
+
+def emails(count=5):
+    return [lead["email"] for lead in generate_leads(count * 2, seed=8, duplicate_rate=0) if lead["email"]][:count]
+
+
+def test_a_send_is_counted_once_whatever_the_email_case(tmp_path):
+    events = store(tmp_path)
+    email = emails(1)[0]
+
+    assert events.record_send("c1", email.upper())
+    assert not events.record_send("c1", email.title())
+    assert events.get_metrics("c1")["sent"] == 1
+
+
+def test_later_flags_imply_earlier_ones_and_arrive_in_any_order(tmp_path):
+    events = store(tmp_path)
+    first, second = emails(2)
+    for email in (first, second):
+        events.record_send("c1", email)
+
+    # The meeting arrives before the open pixel that preceded it
+    events.ingest({"event_id": "m1", "campaign_id": "c1", "email": first, "type": "meeting", "occurred_at": 20})
+    events.ingest({"event_id": "o1", "campaign_id": "c1", "email": first, "type": "open", "occurred_at": 10})
+    events.ingest({"event_id": "c2", "campaign_id": "c1", "email": second, "type": "click", "occurred_at": 15})
+
+    metrics = events.get_metrics("c1")
+    assert (metrics["opened"], metrics["clicked"], metrics["replied"], metrics["meeting_booked"]) == (2, 1, 1, 1)
+    assert metrics["events"] == 3
+    assert metrics["last_event_at"] == 20
+
+
+def test_duplicate_and_unknown_events_are_rejected(tmp_path):
+    events = store(tmp_path)
+    email = emails(1)[0]
+    event = {"event_id": "e1", "campaign_id": "c1", "email": email, "type": "open"}
+
+    assert events.ingest(event)
+    assert not events.ingest(event)
+    assert not events.ingest({**event, "event_id": "e2", "type": "bounce"})
+    assert not events.ingest({**event, "event_id": "e3", "email": ""})
+    assert events.get_metrics("c1")["events"] == 1
+
+
+def test_listeners_see_each_new_flag_once_with_segments(tmp_path):
+    events = store(tmp_path)
+    seen = []
+    events.add_listener(lambda event, flag: seen.append((flag, event["email"], event["segments"].get("tone"))))
+    email = emails(1)[0]
+    events.record_send("c1", email, segments={"tone": "casual"}, simulated=True)
+
+    events.ingest({"event_id": "r1", "campaign_id": "c1", "email": email.upper(), "type": "reply"})
+    events.ingest({"event_id": "o1", "campaign_id": "c1", "email": email, "type": "open"})
+
+    assert seen == [("sent", email, "casual"), ("opened", email, "casual"), ("replied", email, "casual")]
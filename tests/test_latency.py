@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import utils.api_clients as api_clients
+from utils.api_clients import timed_request
+from utils.latency import LatencyTracker, get_latency_tracker
+
+
+@pytest.fixture
+def tracker():
+    tracker = get_latency_tracker()
+    tracker.reset()
+    yield tracker
+    tracker.reset()
+
+
+class FakeSession:
+    """Answers after each scripted delay; a delay past the request's timeout raises Timeout"""
+
+    def __init__(self, delays):
+        self.delays = list(delays)
+        self.timeouts = []
+        self._lock = threading.Lock()
+
+    def request(self, method, url, timeout=None, **kwargs):
+        with self._lock:
+            delay = self.delays.pop(0)
+            self.timeouts.append(timeout)
+        if delay > timeout:
+            raise requests.Timeout(f"{url} timed out")
+        time.sleep(delay)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = str(delay).encode()
+        return response
+
+
+def test_timeout_adapts_to_p95_within_bounds():
+    tracker = LatencyTracker(window=20, min_samples=20, multiplier=3.0, min_timeout=1.0)
+    for _ in range(19):
+        tracker.observe("clearbit.person", 0.5)
+    assert tracker.timeout("clearbit.person", 30) == 30
+
+    tracker.observe("clearbit.person", 0.5)
+    assert tracker.timeout("clearbit.person", 30) == 1.5
+    assert tracker.timeout("clearbit.person", 1.2) == 1.2
+    for _ in range(20):
+        tracker.observe("clearbit.person", 0.1)
+    assert tracker.timeout("clearbit.person", 30) == 1.0
+
+
+def test_timeouts_raise_the_adaptive_timeout_again():
+    tracker = LatencyTracker(window=20, min_samples=20)
+    for _ in range(20):
+        tracker.observe("clearbit.person", 0.5)
+    for _ in range(5):
+        tracker.observe("clearbit.person", 1.5, timed_out=True)
+
+    assert tracker.timeout("clearbit.person", 30) == 4.5
+    assert tracker.stats()["clearbit.person"]["timeouts"] == 5
+
+
+def test_hedge_delay_is_capped_by_the_median():
+    tracker = LatencyTracker(min_samples=20, multiplier=3.0)
+    for _ in range(19):
+        tracker.observe("clearbit.person", 0.2)
+    assert tracker.hedge_delay("clearbit.person") is None
+
+    # Stalls fill the top 5%: p95 is the stall, 3 x p50 is not
+    tracker.observe("clearbit.person", 10.0)
+    assert tracker.hedge_delay("clearbit.person") == pytest.approx(0.6)
+
+
+def test_hedges_stay_within_their_share_of_traffic():
+    tracker = LatencyTracker(hedge_ratio=0.1, hedge_burst=2)
+    admitted = 0
+    for _ in range(100):
+        tracker.count_request("clearbit.person")
+        admitted += tracker.admit_hedge("clearbit.person")
+
+    # One token per ten requests (float accumulation may land just short of the tenth)
+    assert 9 <= admitted <= 10
+    for _ in range(50):
+        tracker.count_request("hunter.email")
+    assert [tracker.admit_hedge("hunter.email") for _ in range(3)] == [True, True, False]
+
+
+def test_stalled_get_is_retried_within_the_total_timeout(tracker, monkeypatch):
+    for _ in range(20):
+        tracker.observe("clearbit.person", 0.01)
+    session = FakeSession([5.0, 0.01])
+    monkeypatch.setattr(api_clients, "get_session", lambda: session)
+
+    response = timed_request("GET", "https://person.clearbit.com/v2", "clearbit.person", timeout=30)
+
+    assert response.content == b"0.01"
+    assert session.timeouts == [1.0, 1.0]
+
+
+def test_post_keeps_the_full_timeout_and_is_not_retried(tracker, monkeypatch):
+    for _ in range(20):
+        tracker.observe("instantly.send", 0.01)
+    session = FakeSession([5.0, 0.01])
+    monkeypatch.setattr(api_clients, "get_session", lambda: session)
+
+    with pytest.raises(requests.Timeout):
+        timed_request("POST", "https://api.instantly.ai/send", "instantly.send", timeout=2)
+    assert session.timeouts == [2]
+
+
+def test_hedge_wins_over_a_slow_primary(tracker, monkeypatch):
+    for _ in range(20):
+        tracker.observe("clearbit.person", 0.01)
+    for _ in range(10):
+        tracker.count_request("clearbit.person")
+    session = FakeSession([0.5, 0.01])
+    monkeypatch.setattr(api_clients, "get_session", lambda: session)
+
+    response = timed_request("GET", "https://person.clearbit.com/v2", "clearbit.person", hedge=True)
+
+    assert response.content == b"0.01"
+    stats = tracker.stats()["clearbit.person"]
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
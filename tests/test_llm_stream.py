@@ -0,0 +1,107 @@
+import pytest
+
+from utils.llm_stream import FormatViolation, MessageStreamParser, stream_message
+
+MESSAGE = "SUBJECT: Quick question about Acme\nBODY: Hi Dana,\nSaw your hiring news.\nWorth a chat?"
+
+
+def chunks(text, size=3):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def test_message_parses_the_same_whole_or_streamed():
+    whole = MessageStreamParser()
+    whole.feed(MESSAGE)
+    streamed = MessageStreamParser()
+    for chunk in chunks(MESSAGE):
+        streamed.feed(chunk)
+
+    expected = {"subject": "Quick question about Acme", "body": "Hi Dana, Saw your hiring news. Worth a chat?"}
+    assert whole.finish() == streamed.finish() == expected
+
+
+def test_short_preamble_is_allowed():
+    parser = MessageStreamParser()
+    parser.feed("Sure, here it is:\n\n" + MESSAGE)
+
+    assert parser.finish()["subject"] == "Quick question about Acme"
+
+
+@pytest.mark.parametrize("text, reason", [
+    ("I'd be happy to help you write a cold email. " * 3, "no SUBJECT line at the start"),
+    ("SUBJECT: " + "x" * 151, "subject over 150 characters"),
+    ("SUBJECT: Hi\nDear Dana,", "expected BODY after the subject line"),
+    (MESSAGE + "\n\nSUBJECT: Another option", "more than one message in the reply"),
+])
+def test_violations_are_raised_before_the_line_ends(text, reason):
+    parser = MessageStreamParser()
+
+    with pytest.raises(FormatViolation, match=reason):
+        for chunk in chunks(text):
+            parser.feed(chunk)
+
+
+def test_body_is_cut_once_clearly_over_the_word_limit():
+    parser = MessageStreamParser(max_words=10)
+    parser.feed("SUBJECT: Hi\nBODY: " + "word " * 12)
+
+    with pytest.raises(FormatViolation, match="body over 10 words"):
+        parser.feed("word")
+
+
+def test_incomplete_output_fails_on_finish():
+    parser = MessageStreamParser()
+    parser.feed("SUBJECT: Hi\n")
+
+    with pytest.raises(FormatViolation, match="no BODY"):
+        parser.finish()
+
+
+class Chunk:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeStream:
+    def __init__(self, text):
+        self.chunks = [Chunk(chunk) for chunk in chunks(text)]
+        self.consumed = 0
+        self.closed = False
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            self.consumed += 1
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+
+class FakeLLM:
+    def __init__(self, text):
+        self.stream_ = FakeStream(text)
+
+    def stream(self, messages):
+        return self.stream_
+
+
+def test_stream_stops_at_the_first_violation_and_closes():
+    llm = FakeLLM("SUBJECT: Hi\nBODY: " + "word " * 200)
+
+    result = stream_message(llm, [Chunk("prompt " * 10)], MessageStreamParser(max_words=10))
+
+    assert result["violation"] == "body over 10 words"
+    assert llm.stream_.closed
+    assert llm.stream_.consumed < len(llm.stream_.chunks)
+    assert result["metrics"]["completion_tokens"] == llm.stream_.consumed
+    assert result["metrics"]["total_tokens"] == 70 // 4 + llm.stream_.consumed
+
+
+def test_stream_returns_the_message_with_timings():
+    llm = FakeLLM(MESSAGE)
+
+    result = stream_message(llm, [Chunk("prompt")], MessageStreamParser())
+
+    assert result["subject"] == "Quick question about Acme"
+    assert result["metrics"]["ttft_ms"] is not None
+    assert llm.stream_.closed
@@ -0,0 +1,69 @@
+from utils.metrics_store import MetricsStore, wilson_lower_bound
+
+DAY = 86400
+NOW = 100 * DAY
+
+
+def responses(count, replied, tone="casual", sent_at=None):
+    return [{"segments": {"tone": tone, "industry": "SaaS"}, "sent_at": sent_at,
+             "opened": i < replied * 2, "replied": i < replied}
+            for i in range(count)]
+
+
+def test_recording_a_campaign_again_replaces_its_rows(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    store.record_campaign("c1", responses(100, 5), sent_at=NOW - DAY)
+    store.record_campaign("c1", responses(100, 12), sent_at=NOW - DAY)
+
+    [row] = store.window("tone", days=30, now=NOW)
+
+    assert (row["campaigns"], row["sent"], row["replied"], row["opened"]) == (1, 100, 12, 24)
+    assert row["reply_rate"] == 0.12
+
+
+def test_a_campaign_keeps_the_bucket_of_its_first_send(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    first = responses(50, 5, sent_at=NOW - 3 * DAY)
+    store.record_campaign("c1", first)
+    # A follow-up step sent later must not move the campaign into a new bucket
+    store.record_campaign("c1", first + responses(50, 5, sent_at=NOW - DAY))
+
+    trend = store.trend("campaign", resolution="day", days=30, now=NOW)
+
+    assert [(point["bucket_ts"], point["sent"]) for point in trend] == [(NOW - 3 * DAY, 100)]
+
+
+def test_window_ranks_by_conservative_reply_rate(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    store.record_campaign("c1", responses(400, 40, tone="casual"), sent_at=NOW - DAY)
+    store.record_campaign("c2", responses(400, 12, tone="formal"), sent_at=NOW - DAY)
+    store.record_campaign("c3", responses(5, 1, tone="witty"), sent_at=NOW - DAY)
+    store.record_campaign("c4", responses(400, 80, tone="witty"), sent_at=NOW - 60 * DAY)
+
+    assert [row["value"] for row in store.window("tone", days=30, now=NOW)] == ["casual", "witty", "formal"]
+    assert [row["value"] for row in store.window("tone", days=30, now=NOW, min_sent=100)] == ["casual", "formal"]
+    assert store.best_segment("tone", days=30, now=NOW)["value"] == "casual"
+
+
+def test_no_best_segment_without_a_clear_winner(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    store.record_campaign("c1", responses(200, 20, tone="casual"), sent_at=NOW - DAY)
+    store.record_campaign("c2", responses(200, 18, tone="formal"), sent_at=NOW - DAY)
+
+    assert store.best_segment("tone", days=30, now=NOW) is None
+
+
+def test_compact_drops_only_old_hourly_points(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"), hourly_retention_days=14)
+    store.record_campaign("old", responses(10, 1), sent_at=NOW - 30 * DAY)
+    store.record_campaign("new", responses(10, 1), sent_at=NOW - DAY)
+
+    # One hourly row per (dimension, value): campaign/all, tone and industry
+    assert store.compact(now=NOW) == 3
+    assert [point["sent"] for point in store.trend("campaign", resolution="hour", days=60, now=NOW)] == [10]
+    assert [point["sent"] for point in store.trend("campaign", resolution="day", days=60, now=NOW)] == [10, 10]
+
+
+def test_wilson_lower_bound_penalises_small_samples():
+    assert wilson_lower_bound(0, 0) == 0.0
+    assert wilson_lower_bound(3, 5) < wilson_lower_bound(300, 1000) < 0.3
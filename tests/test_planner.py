@@ -0,0 +1,82 @@
+import pytest
+
+from utils.latency import LatencyTracker
+from utils.planner import load_history, plan
+from utils.result_sink import JsonlResultSink
+from utils.synthetic import generate_leads
+
+
+@pytest.fixture
+def no_keys(monkeypatch):
+    for name in ("APOLLO_API_KEY", "CLEARBIT_KEY", "OPENAI_API_KEY"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def config(max_workers=4):
+    return {"steps": [
+        {"id": "prospect_search", "agent": "ProspectSearchAgent", "inputs": {"mock": {"count": 40}}},
+        {"id": "enrichment", "agent": "DataEnrichmentAgent", "inputs": {"scheduling": {"max_workers": max_workers}}},
+        {"id": "account_research", "agent": "AccountResearchAgent", "inputs": {}}
+    ]}
+
+
+def write_run(root, leads, enrichment_ms):
+    sink = JsonlResultSink(str(root))
+    sink.write_step("prospect_search", {"leads": leads}, duration_ms=10)
+    sink.write_step("enrichment", {"enriched_leads": leads, "company_cache": {"lookups": 30, "hits": 27}},
+                    duration_ms=enrichment_ms)
+    sink.write_step("account_research", {
+        "accounts": [], "cache": {"leads": len(leads), "accounts": 16, "hits": 12, "misses": 4}
+    }, duration_ms=5)
+    sink.close()
+
+
+def test_history_step_time_is_not_divided_by_workers(tmp_path, no_keys):
+    leads = list(generate_leads(40, seed=3))
+    write_run(tmp_path, leads, enrichment_ms=400)
+
+    steps = {step["step"]: step for step in plan(config(max_workers=4), results_dir=str(tmp_path))["steps"]}
+
+    # 10 ms per lead observed with 4 workers already; 40 leads take ~400 ms again
+    assert steps["enrichment"]["source"] == "history"
+    assert steps["enrichment"]["est_ms"] == pytest.approx(400)
+
+
+def test_history_reads_missing_emails_and_both_caches(tmp_path):
+    leads = list(generate_leads(40, seed=3))
+    write_run(tmp_path, leads, enrichment_ms=400)
+
+    history = load_history(str(tmp_path))
+
+    assert history["runs"] == 1
+    assert history["missing_email_rate"] == sum(not lead["email"] for lead in leads) / 40
+    assert history["accounts_per_lead"] == 16 / 40
+    assert history["research_cache_hit_ratio"] == 12 / 16
+    assert history["company_cache_hit_ratio"] == 27 / 30
+
+
+def test_account_research_calls_only_for_uncached_accounts(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    history = {"runs": 1, "ms_per_item": {}, "accounts_per_lead": 0.5, "research_cache_hit_ratio": 0.75}
+
+    steps = {step["step"]: step for step in plan(config(), results_dir=str(tmp_path), history=history)["steps"]}
+
+    # 40 leads -> 20 accounts, three quarters of them cached
+    assert steps["account_research"]["calls"] == {"openai": 5}
+
+
+def test_default_latency_comes_from_the_tracker(tmp_path, monkeypatch):
+    monkeypatch.setenv("CLEARBIT_KEY", "test")
+    monkeypatch.delenv("APOLLO_API_KEY", raising=False)
+    history = {"runs": 0, "ms_per_item": {}, "missing_email_rate": 0.0}
+    tracker = LatencyTracker(min_samples=5)
+    for _ in range(5):
+        tracker.observe("clearbit.person", 0.1)
+
+    steps = {step["step"]: step for step in
+             plan(config(max_workers=1), results_dir=str(tmp_path), history=history, latency_tracker=tracker)["steps"]}
+
+    assert steps["enrichment"]["source"] == "defaults"
+    # 36 lookups (mock leads miss 10% of emails) at the observed 100 ms instead of the 350 ms default
+    assert steps["enrichment"]["calls"] == {"clearbit": 36}
+    assert steps["enrichment"]["est_ms"] == pytest.approx(36 * 100 + 40 * 0.05)
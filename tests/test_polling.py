@@ -0,0 +1,70 @@
+from utils.event_store import EventStore
+from utils.polling import CampaignPoller, PollResult
+from utils.synthetic import generate_engagement_events, generate_leads
+
+
+class FakeSource:
+    """Serves seeded events newer than the poller's cursor, like an incremental REST endpoint"""
+
+    def __init__(self, events):
+        self.events = sorted(events, key=lambda event: event["occurred_at"])
+        self.cursors = []
+
+    def fetch(self, campaign_id, cursor):
+        self.cursors.append(dict(cursor))
+        since = cursor.get("last_event_at") or float("-inf")
+        new = [event for event in self.events if event["occurred_at"] > since]
+        return PollResult(events=new, etag="v1") if new else PollResult(etag="v1", not_modified=True)
+
+
+def statuses(campaign_id):
+    return [{"email": lead["email"], "campaign_id": campaign_id, "status": "sent"}
+            for lead in generate_leads(20, seed=4, duplicate_rate=0) if lead["email"]]
+
+
+def test_polls_fetch_only_events_after_the_cursor(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    sent = statuses("c1")
+    for status in sent:
+        store.record_send("c1", status["email"])
+    events = list(generate_engagement_events(sent, seed=2, start_ts=1000))
+    source = FakeSource(events)
+    poller = CampaignPoller(store, source, min_interval=60, max_interval=3600)
+    poller.register_send("c1", sent_at=1000)
+
+    # Redelivered copies in the feed are ingested once
+    assert poller.poll("c1", now=2000) == len({event["event_id"] for event in events})
+    assert poller.poll("c1", now=3000) == 0
+
+    cursor = poller.get_cursor("c1")
+    assert source.cursors[1]["last_event_at"] == max(event["occurred_at"] for event in events)
+    assert cursor["etag"] == "v1"
+    assert store.get_metrics("c1")["sent"] == len(sent)
+
+
+def test_interval_tightens_on_activity_and_backs_off_when_quiet(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    source = FakeSource([])
+    poller = CampaignPoller(store, source, min_interval=60, max_interval=480, backoff=2.0)
+    poller.register_send("c1", sent_at=0)
+
+    intervals = []
+    for now in (60, 200, 500, 1000, 2000):
+        poller.poll("c1", now=now)
+        intervals.append(poller.get_cursor("c1")["interval"])
+    assert intervals == [120, 240, 480, 480, 480]
+
+    source.events = [{"event_id": "e1", "campaign_id": "c1", "email": "a@b.co", "type": "open",
+                      "occurred_at": 2500}]
+    poller.poll("c1", now=3000)
+    assert poller.get_cursor("c1")["interval"] == 240
+    assert poller.poll_due(now=3000 + 239) == {}
+    assert poller.poll_due(now=3000 + 240) == {"c1": 0}
+
+
+def test_cursor_connection_shares_the_store_settings(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    poller = CampaignPoller(store, FakeSource([]))
+
+    assert poller._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert poller._conn.execute("PRAGMA busy_timeout").fetchone()[0] > 0
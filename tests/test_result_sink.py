@@ -0,0 +1,45 @@
+import pytest
+
+from utils.result_sink import JsonlResultSink, iter_records, load_manifest, query_records
+from utils.synthetic import generate_leads
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "gzip"])
+def sink(request, tmp_path):
+    return JsonlResultSink(root=str(tmp_path), compress=request.param)
+
+
+def test_list_fields_stream_to_records_and_scalars_to_the_manifest(sink):
+    leads = list(generate_leads(25, seed=3))
+    sink.write_step("prospect_search", {"leads": leads, "campaign_id": "c1"}, duration_ms=12.5)
+
+    manifest = load_manifest(sink.run_dir)
+    entry = manifest["steps"]["prospect_search"]
+    assert entry["records"]["leads"]["count"] == 25
+    assert entry["values"] == {"campaign_id": "c1"}
+    assert entry["duration_ms"] == 12.5
+    assert list(iter_records(sink.run_dir, "prospect_search", "leads")) == leads
+
+
+def test_query_pages_sorted_matches_in_one_pass(sink):
+    leads = [{"company": f"Co {i}", "score": i % 7} for i in range(40)]
+    sink.write_step("scoring", {"ranked_leads": leads})
+
+    total, page = query_records(sink.run_dir, "scoring", "ranked_leads", search="co 1",
+                                sort_by="score", descending=True, offset=2, limit=3)
+
+    matching = sorted((lead for lead in leads if "co 1" in lead["company"].lower()),
+                      key=lambda lead: -lead["score"])
+    assert total == len(matching)
+    assert [lead["score"] for lead in page] == [lead["score"] for lead in matching[2:5]]
+
+
+def test_sorting_a_field_with_mixed_types_does_not_fail(sink):
+    sink.write_step("scoring", {"ranked_leads": [{"score": 1}, {"score": "high"}, {"score": None},
+                                                 {"score": 0.5}, {}]})
+
+    _, descending = query_records(sink.run_dir, "scoring", "ranked_leads", sort_by="score", descending=True)
+    _, ascending = query_records(sink.run_dir, "scoring", "ranked_leads", sort_by="score")
+
+    assert [lead.get("score") for lead in descending] == [1, 0.5, "high", None, None]
+    assert [lead.get("score") for lead in ascending] == [None, None, "high", 0.5, 1]
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from utils.budget import RunBudget
+from utils.run_context import RunContext, activate
+from utils.scheduler import PriorityScheduler, run_prioritized
+
+
+def test_items_run_best_first():
+    ran = []
+    scheduler = PriorityScheduler(lambda item: ran.append(item) or item, autostart=False)
+    for item, priority in (("b", 0.5), ("c", 0.1), ("a", 0.9)):
+        scheduler.submit(item, priority)
+    scheduler.start()
+
+    outcome = scheduler.join()
+
+    assert ran == ["a", "b", "c"]
+    assert outcome["results"] == ["a", "b", "c"]
+
+
+def test_late_high_priority_item_jumps_the_queue():
+    ran = []
+    gate = threading.Event()
+
+    def work(item):
+        if item == "first":
+            gate.wait(5)
+        ran.append(item)
+
+    scheduler = PriorityScheduler(work)
+    scheduler.submit("first", 0.1)
+    while not scheduler._started:
+        time.sleep(0.001)
+    scheduler.submit("low", 0.2)
+    scheduler.submit("high", 0.9)
+    gate.set()
+    scheduler.join()
+
+    assert ran == ["first", "high", "low"]
+
+
+def test_full_queue_preempts_its_lowest_item():
+    scheduler = PriorityScheduler(lambda item: item, max_queued=2, autostart=False)
+
+    assert scheduler.submit("mid", 0.5)
+    assert scheduler.submit("low", 0.1)
+    assert scheduler.submit("high", 0.9)
+    assert not scheduler.submit("lowest", 0.05)
+    scheduler.start()
+
+    outcome = scheduler.join()
+    assert outcome["results"] == ["high", "mid"]
+    assert outcome["preempted"] == ["low", "lowest"]
+
+
+def test_budget_defers_the_remaining_items():
+    scheduler = PriorityScheduler(lambda item: item, budget=2, autostart=False)
+    for priority in (0.1, 0.7, 0.4, 0.9):
+        scheduler.submit(priority, priority)
+    scheduler.start()
+
+    outcome = scheduler.join()
+
+    assert outcome["results"] == [0.9, 0.7]
+    assert outcome["deferred"] == [0.4, 0.1]
+
+
+def test_failed_items_get_their_fallback_result():
+    def work(item):
+        if item == "bad":
+            raise ValueError("provider down")
+        return item
+
+    outcome = run_prioritized(["good", "bad"], lambda item: 1.0 if item == "good" else 0.5, work,
+                              fallback_fn=lambda item, error: f"{item}: {error}")
+
+    assert outcome["results"] == ["good", "bad: provider down"]
+    assert outcome["errors"] == [("bad", "provider down")]
+
+
+def test_failed_items_without_a_fallback_are_only_reported():
+    def work(item):
+        raise ValueError("provider down")
+
+    outcome = run_prioritized(["bad"], lambda item: 1.0, work)
+
+    assert outcome["results"] == []
+    assert outcome["errors"] == [("bad", "provider down")]
+
+
+def test_spent_run_wall_time_defers_everything():
+    budget = RunBudget(max_wall_seconds=10)
+    budget.started_at -= 20
+
+    run = RunContext(budget=budget)
+    run.step = "enrichment"
+
+    with activate(run):
+        outcome = run_prioritized([1, 2], lambda item: item, lambda item: item)
+
+    assert outcome["results"] == []
+    assert outcome["deferred"] == [2, 1]
+    assert budget.degradations == [{"step": "enrichment", "action": "deferred 2 items",
+                                    "reason": "run wall time exhausted", "count": 1}]
@@ -0,0 +1,68 @@
+from agents.prospect_search import ProspectSearchAgent
+from utils.search_state import SearchState, icp_key
+from utils.synthetic import generate_leads
+
+ICP = {"industry": "SaaS", "employee_count": {"min": 50, "max": 500}}
+
+
+def leads(count=10):
+    return list(generate_leads(count, seed=5, duplicate_rate=0))
+
+
+def test_icp_key_ignores_key_and_signal_order():
+    reordered = {"employee_count": {"max": 500, "min": 50}, "industry": "SaaS"}
+
+    assert icp_key(ICP, ["funding", "hiring"]) == icp_key(reordered, ["hiring", "funding"])
+    assert icp_key(ICP, ["funding"]) != icp_key(ICP, ["hiring"])
+
+
+def test_delta_passes_on_only_new_and_changed_prospects(tmp_path):
+    state = SearchState(str(tmp_path / "search.db"))
+    key = icp_key(ICP)
+    first = leads()
+
+    assert state.delta(key, ICP, first, now=100)["new"] == 10
+
+    second = [dict(lead) for lead in first[:8]] + leads(12)[10:]
+    second[0]["title"] = "VP Sales"
+    delta = state.delta(key, ICP, second, now=200)
+
+    assert (delta["new"], delta["changed"], delta["unchanged"]) == (2, 1, 7)
+    assert [lead["id"] for lead in delta["leads"]] == [second[0]["id"]] + [lead["id"] for lead in second[8:]]
+    assert state.get(key) == {"last_search_at": 200, "last_full_at": None}
+
+
+def test_full_refresh_re_emits_everything(tmp_path):
+    state = SearchState(str(tmp_path / "search.db"))
+    key = icp_key(ICP)
+    state.delta(key, ICP, leads(), now=100)
+
+    delta = state.delta(key, ICP, leads(), full_refresh=True, now=200)
+
+    assert (len(delta["leads"]), delta["unchanged"]) == (10, 10)
+    assert state.get(key)["last_full_at"] == 200
+
+
+def test_reset_forgets_one_icp(tmp_path):
+    state = SearchState(str(tmp_path / "search.db"))
+    other = icp_key({"industry": "Fintech"})
+    state.delta(icp_key(ICP), ICP, leads(), now=100)
+    state.delta(other, {"industry": "Fintech"}, leads(), now=100)
+
+    state.reset(icp_key(ICP))
+
+    assert state.get(icp_key(ICP)) is None
+    assert state.delta(icp_key(ICP), ICP, leads(), now=200)["new"] == 10
+    assert state.delta(other, {"industry": "Fintech"}, leads(), now=200)["new"] == 0
+
+
+def test_mock_leads_are_not_recorded_as_seen(tmp_path, monkeypatch):
+    monkeypatch.delenv("APOLLO_API_KEY", raising=False)
+    agent = ProspectSearchAgent("prospect_search", "", [])
+    path = str(tmp_path / "search.db")
+
+    output = agent.execute({"icp": ICP, "mock": {"count": 3}, "delta": {"enabled": True, "state_path": path}})
+
+    assert len(output["leads"]) == 3
+    assert output["delta"]["skipped"] == "mocked"
+    assert SearchState(path).get(icp_key(ICP)) is None
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+
+from utils.event_store import EventStore
+from utils.send_schedule import SendDispatcher, SendSchedule, send_id
+from utils.synthetic import generate_leads
+
+
+@pytest.fixture
+def schedule(tmp_path):
+    return SendSchedule(str(tmp_path / "schedule.db"))
+
+
+def entries(campaign_id, due_at, count=4, steps=1):
+    emails = list(dict.fromkeys(lead["email"] for lead in generate_leads(count * 2, seed=11) if lead["email"]))
+    return [
+        {"id": send_id(campaign_id, email, step), "due_at": due_at + step * 86400,
+         "campaign_id": campaign_id, "email": email, "sequence_step": step,
+         "payload": {"email": email}}
+        for email in emails[:count] for step in range(steps)
+    ]
+
+
+def recorder(sent):
+    def send(entry):
+        sent.append(entry["id"])
+        return {"email": entry["email"], "status": "sent"}
+    return send
+
+
+def test_scheduling_is_idempotent(schedule):
+    batch = entries("c1", time.time() - 1)
+    assert schedule.schedule(batch) == len(batch)
+    assert schedule.schedule(batch) == 0
+
+
+def test_claims_of_a_crashed_dispatcher_are_recovered_and_sent_once(schedule):
+    schedule.schedule(entries("c1", time.time() - 1))
+    crashed = SendDispatcher(schedule, recorder([]))
+    claimed = schedule.claim([entry_id for _, entry_id in schedule.due(time.time())], crashed.token)
+    crashed.close()
+    assert len(claimed) == 4 and schedule.due(time.time()) == []
+
+    # A restart before the claim timeout leaves the claims alone...
+    sent = []
+    assert SendDispatcher(schedule, recorder(sent), claim_timeout_s=300).dispatch_due() == []
+
+    # ...after it, they are released and each send goes out exactly once
+    restarted = SendDispatcher(schedule, recorder(sent), claim_timeout_s=0)
+    restarted.dispatch_due()
+    restarted.dispatch_due()
+    assert sorted(sent) == sorted(entry["id"] for entry in claimed)
+    assert schedule.stats()["counts"] == {"sent": 4}
+
+
+def test_a_send_that_keeps_crashing_fails_after_max_attempts(schedule):
+    batch = entries("c1", time.time() - 1, count=1)
+    schedule.schedule(batch)
+
+    for attempt in range(1, schedule.max_attempts + 1):
+        assert schedule.claim([batch[0]["id"]], f"crashed-{attempt}")[0]["attempts"] == attempt
+        released = schedule.recover(claim_timeout_s=-1)
+        assert released == (1 if attempt < schedule.max_attempts else 0)
+
+    assert schedule.stats()["counts"] == {"failed": 1}
+    assert schedule.due(time.time()) == []
+
+
+def test_dispatch_sends_only_the_given_ids(schedule):
+    schedule.schedule(entries("old", time.time() - 60))
+    mine = entries("new", time.time() - 1, count=2)
+    schedule.schedule(mine)
+
+    sent = []
+    dispatcher = SendDispatcher(schedule, recorder(sent))
+    dispatcher.dispatch([entry["id"] for entry in mine])
+    dispatcher.close()
+
+    assert sorted(sent) == sorted(entry["id"] for entry in mine)
+    assert schedule.stats()["counts"] == {"pending": 4, "sent": 2}
+
+
+def test_closed_dispatcher_stops_listening(schedule):
+    dispatchers = [SendDispatcher(schedule, recorder([])) for _ in range(3)]
+    for dispatcher in dispatchers:
+        dispatcher.close()
+    assert schedule._listeners == []
+
+
+def test_reply_cancels_follow_ups_whatever_the_email_case(schedule, tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    schedule.attach(store)
+    batch = entries("c1", time.time() + 3600, count=2, steps=3)
+    schedule.schedule(batch)
+    email = batch[0]["email"]
+    store.record_send("c1", email.upper())
+
+    store.ingest({"event_id": "r1", "campaign_id": "c1", "email": email.title(), "type": "reply"})
+
+    counts = schedule.stats()["counts"]
+    assert counts == {"cancelled": 2, "pending": 4}
+    assert store.get_metrics("c1")["replied"] == 1
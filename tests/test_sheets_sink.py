@@ -0,0 +1,91 @@
+import os
+import time
+
+import utils.sheets_sink as sheets_sink
+from utils.sheets_sink import LocalSheet, SheetsExporter, get_sheets_exporter
+
+
+def exporter(tmp_path, sheet, **kwargs):
+    options = {"batch_size": 100, "flush_interval": 3600, "max_retries": 2, "backoff": 0}
+    options.update(kwargs)
+    return SheetsExporter(sheet, spill_path=str(tmp_path / "spill.jsonl"), **options)
+
+
+def rows(start, count):
+    return [[f"lead-{i}", i] for i in range(start, start + count)]
+
+
+def test_enqueue_only_buffers_until_a_flush(tmp_path):
+    sheet = LocalSheet()
+    export = exporter(tmp_path, sheet)
+    export.enqueue(rows(0, 3))
+
+    assert (sheet.calls, export.pending) == (0, 3)
+    assert export.flush() == 3
+    assert sheet.rows == rows(0, 3)
+    assert export.flush() == 0
+    export.close()
+
+
+def test_full_batch_is_flushed_in_the_background(tmp_path):
+    sheet = LocalSheet()
+    export = exporter(tmp_path, sheet, batch_size=5)
+    export.enqueue(rows(0, 5))
+
+    deadline = time.time() + 5
+    while len(sheet.rows) < 5 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert sheet.rows == rows(0, 5)
+    export.close()
+
+
+def test_failed_rows_are_spilled_and_resent_first(tmp_path):
+    sheet = LocalSheet(fail_times=3)
+    export = exporter(tmp_path, sheet)
+    export.enqueue(rows(0, 2))
+
+    assert export.flush() == 0
+    assert sheet.calls == 3
+    assert os.path.exists(export.spill_path)
+
+    export.enqueue(rows(2, 1))
+    assert export.flush() == 3
+    assert sheet.rows == rows(0, 3)
+    assert not os.path.exists(export.spill_path)
+    export.close()
+
+
+def test_only_undelivered_chunks_are_spilled(tmp_path):
+    delivered = []
+
+    def append(chunk):
+        if chunk[0][1] >= 4:
+            raise ConnectionError("quota exceeded")
+        delivered.extend(chunk)
+
+    export = exporter(tmp_path, append, batch_size=2, max_retries=0)
+    export.enqueue(rows(0, 6))
+
+    assert export.flush() == 0
+    assert delivered == rows(0, 4)
+    assert export._read_spill() == rows(4, 2)
+    export.close()
+
+
+def test_close_flushes_what_is_left(tmp_path):
+    sheet = LocalSheet()
+    export = exporter(tmp_path, sheet)
+    export.enqueue(rows(0, 4))
+
+    export.close()
+    export.close()
+
+    assert sheet.rows == rows(0, 4)
+
+
+def test_no_exporter_without_sheets_config(monkeypatch):
+    monkeypatch.setattr(sheets_sink, "_exporter", None)
+    monkeypatch.delenv("GOOGLE_SHEET_ID", raising=False)
+
+    assert get_sheets_exporter() is None
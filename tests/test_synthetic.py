@@ -0,0 +1,64 @@
+import itertools
+import types
+
+from utils.synthetic import generate_engagement, generate_engagement_events, generate_leads
+
+
+def test_same_seed_gives_the_same_stream():
+    assert list(generate_leads(200, seed=1)) == list(generate_leads(200, seed=1))
+    assert list(generate_leads(50, seed=1)) != list(generate_leads(50, seed=2))
+
+
+def test_leads_are_generated_lazily():
+    stream = generate_leads(10 ** 9, seed=1)
+
+    assert isinstance(stream, types.GeneratorType)
+    assert len(list(itertools.islice(stream, 5))) == 5
+
+
+def test_duplicate_and_missing_email_rates_are_respected():
+    leads = list(generate_leads(4000, seed=3, duplicate_rate=0.1, missing_email_rate=0.2))
+    ids = [lead["id"] for lead in leads]
+    duplicates = len(ids) - len(set(ids))
+    missing = sum(not lead["email"] for lead in leads)
+
+    assert 0.07 < duplicates / len(leads) < 0.13
+    assert 0.16 < missing / len(leads) < 0.24
+
+
+def test_contacts_cluster_into_companies():
+    leads = list(generate_leads(1000, seed=3, duplicate_rate=0, contacts_per_company=2.5))
+    companies = {lead["company"] for lead in leads}
+
+    assert 1000 / len(companies) > 1.8
+    for lead in leads:
+        if lead["email"]:
+            assert lead["email"].endswith("@" + lead["domain"])
+
+
+def test_engagement_follows_the_funnel_and_skips_failed_sends():
+    sent = [{"email": lead["email"], "campaign_id": "c1", "status": "failed" if i % 10 == 0 else "sent"}
+            for i, lead in enumerate(generate_leads(500, seed=4, duplicate_rate=0))]
+
+    records = list(generate_engagement(sent, seed=4))
+
+    assert len(records) == sum(status["status"] != "failed" for status in sent)
+    assert records == list(generate_engagement(sent, seed=4))
+    for record in records:
+        assert record["opened"] or not (record["clicked"] or record["replied"])
+        assert record["replied"] or not record["meeting_booked"]
+
+
+def test_events_match_the_engagement_records():
+    sent = [{"email": lead["email"], "campaign_id": "c1", "status": "sent"}
+            for lead in generate_leads(300, seed=6, duplicate_rate=0) if lead["email"]]
+
+    events = list(generate_engagement_events(sent, seed=6, start_ts=0, duplicate_rate=0.1))
+
+    flagged = {(record["email"], flag) for record in generate_engagement(sent, seed=6)
+               for flag in ("opened", "clicked", "replied", "meeting_booked") if record[flag]}
+    names = {"open": "opened", "click": "clicked", "reply": "replied", "meeting": "meeting_booked"}
+    assert {(event["email"], names[event["type"]]) for event in events} == flagged
+    assert len(events) > len({event["event_id"] for event in events})
+    times = [event["occurred_at"] for event in events]
+    assert times != sorted(times)
@@ -0,0 +1,45 @@
+import json
+
+from utils.event_store import EventStore
+from utils.synthetic import generate_engagement, generate_engagement_events, generate_leads
+from utils.webhooks import handle_webhook, normalize_event, parse_payload
+
+
+def sent_statuses(campaign_id, count=30):
+    return [{"email": lead["email"], "campaign_id": campaign_id, "status": "sent"}
+            for lead in generate_leads(count, seed=5, duplicate_rate=0) if lead["email"]]
+
+
+def test_provider_field_names_are_normalized():
+    event = normalize_event({"sg_event_id": "e1", "campaign": "c1", "recipient": "Sam@Acme.COM",
+                             "event": "open", "timestamp": "2026-01-05T10:00:00Z"})
+
+    assert event == {"event_id": "e1", "campaign_id": "c1", "email": "sam@acme.com", "type": "open",
+                     "occurred_at": 1767607200.0}
+
+
+def test_payload_shapes_parse_to_the_same_events():
+    raw = {"id": "e1", "campaign_id": "c1", "email": "a@b.co", "type": "click", "occurred_at": 5}
+
+    assert parse_payload(json.dumps(raw).encode()) == parse_payload(json.dumps([raw]).encode())
+    assert parse_payload(json.dumps({"events": [raw]}).encode()) == [normalize_event(raw)]
+
+
+def test_redelivered_and_reordered_webhooks_match_the_engagement(tmp_path):
+    statuses = sent_statuses("c1")
+    store = EventStore(str(tmp_path / "events.db"))
+    for status in statuses:
+        # Sends registered with the case the lead source used
+        store.record_send("c1", status["email"].title())
+    events = [{**event, "email": event["email"].upper()}
+              for event in generate_engagement_events(statuses, seed=9, start_ts=0)]
+
+    handle_webhook(store, json.dumps(events).encode())
+    handle_webhook(store, json.dumps(events).encode())
+
+    expected = list(generate_engagement(statuses, seed=9))
+    metrics = store.get_metrics("c1")
+    assert metrics["sent"] == len(statuses)
+    assert metrics["opened"] == sum(record["opened"] for record in expected)
+    assert metrics["replied"] == sum(record["replied"] for record in expected)
+    assert {response["email"] for response in store.get_responses("c1")} == {s["email"].lower() for s in statuses}
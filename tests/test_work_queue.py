@@ -0,0 +1,104 @@
+import pytest
+
+from utils.budget import RunBudget, current_budget
+from utils.run_context import RunContext, activate
+from utils.synthetic import generate_leads
+from utils.work_queue import LocalRedis, RedisWorkQueue, SQLiteWorkQueue, map_tasks, run_task
+import utils.work_queue as work_queue
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def queue(request, tmp_path, clock):
+    if request.param == "sqlite":
+        return SQLiteWorkQueue(str(tmp_path / "queue.db"), visibility_timeout=10, max_attempts=2, clock=clock)
+    return RedisWorkQueue(LocalRedis(), visibility_timeout=10, max_attempts=2, clock=clock)
+
+
+def payloads(count):
+    return [{"lead": lead} for lead in generate_leads(count, seed=7)]
+
+
+def test_expired_lease_is_handed_out_again(queue, clock):
+    batch_id = queue.publish("enrichment", payloads(1))
+    first = queue.lease("enrichment", "worker-a")
+    assert queue.lease("enrichment", "worker-b") == []
+    clock.advance(11)
+
+    second = queue.lease("enrichment", "worker-b")
+
+    assert [task.attempts for task in first + second] == [1, 2]
+    # The first worker lost its lease, so its late result is discarded
+    assert not queue.complete(first[0], "worker-a", {"ok": True})
+    assert queue.complete(second[0], "worker-b", {"ok": True})
+    assert queue.collect(batch_id) == {"results": {0: {"ok": True}}, "failed": {}, "open": 0}
+
+
+def test_extended_lease_is_not_handed_out(queue, clock):
+    queue.publish("enrichment", payloads(1))
+    task = queue.lease("enrichment", "worker-a")[0]
+    clock.advance(8)
+
+    assert queue.extend(task, "worker-a")
+    clock.advance(8)
+    assert queue.lease("enrichment", "worker-b") == []
+    assert not queue.extend(task, "worker-b")
+
+
+def test_lease_expiring_on_final_attempt_fails_the_task(queue, clock):
+    poison = queue.publish("enrichment", payloads(1))
+    for _ in range(2):
+        queue.lease("enrichment", "crashing-worker")
+        clock.advance(11)
+    healthy = queue.publish("enrichment", payloads(1))
+
+    assert [task.batch_id for task in queue.lease("enrichment", "worker", limit=2)] == [healthy]
+    assert queue.collect(poison) == {"results": {}, "failed": {0: "lease expired on final attempt"}, "open": 0}
+    assert queue.collect(healthy)["open"] == 1
+
+
+def test_collect_fails_exhausted_leases_without_another_lease(queue, clock):
+    batch_id = queue.publish("enrichment", payloads(1))
+    for _ in range(2):
+        queue.lease("enrichment", "crashing-worker")
+        clock.advance(11)
+
+    assert queue.collect(batch_id)["open"] == 0
+
+
+def test_map_tasks_settles_worker_usage_into_the_run_budget(queue, monkeypatch):
+    monkeypatch.setattr(work_queue, "get_work_queue", lambda url=None: queue)
+    tasks = [{"lead": lead, "priority": 0.9} for lead in generate_leads(3, seed=7)]
+    budget = RunBudget({"clearbit": {"max_calls": 10}})
+
+    def enrich(lead, priority):
+        current_budget().acquire("clearbit", priority)
+        return lead["id"]
+
+    def work(poll_interval):
+        # Stands in for worker.py between polls: lease, run under the grant, report back
+        for leased in queue.lease("enrichment", "worker", limit=10):
+            queue.complete(leased, "worker", run_task(enrich, leased))
+
+    with activate(RunContext(budget=budget)):
+        results = map_tasks("enrichment", tasks, lambda task: enrich(**task), {"poll_interval": 0},
+                            reserve=lambda task: ("clearbit", 2), sleep=work)
+
+    assert results == [task["lead"]["id"] for task in tasks]
+    # Two calls were reserved per task, one was used
+    assert budget.usage["clearbit"]["calls"] == 3
@@ -1,4 +1,21 @@
-from .logger import setup_logger
-from .api_clients import APIClient, ApolloClient
+import importlib
 
-__all__ = ["setup_logger", "APIClient", "ApolloClient"]
\ No newline at end of file
+# Exported names and the submodule that defines them; submodules are imported
+# on first attribute access so `import utils.logger` does not pull in requests
+_EXPORTS = {
+    "setup_logger": "logger",
+    "APIClient": "api_clients",
+    "ApolloClient": "api_clients",
+    "generate_leads": "synthetic",
+    "generate_engagement": "synthetic"
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,134 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Any, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS account_cache (
+    kind TEXT NOT NULL,
+    account TEXT NOT NULL,
+    value TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (kind, account)
+);
+"""
+
+# Mailbox providers: their domains say nothing about the contact's company
+FREE_EMAIL_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.com", "outlook.com", "hotmail.com", "live.com",
+    "icloud.com", "me.com", "aol.com", "proton.me", "protonmail.com", "gmx.com"
+}
+
+LEGAL_SUFFIXES = {"inc", "llc", "ltd", "corp", "corporation", "co", "company", "gmbh", "plc", "limited", "sa", "bv"}
+
+
+def company_domain(lead: Dict[str, Any]) -> str:
+    """Normalized company domain from the lead's domain/website or work email"""
+    for field in ("domain", "website"):
+        value = (lead.get(field) or "").strip().lower()
+        if value:
+            value = re.sub(r"^https?://", "", value).split("/")[0]
+            return value[4:] if value.startswith("www.") else value
+    email = (lead.get("email") or "").strip().lower()
+    if "@" in email:
+        domain = email.rsplit("@", 1)[1]
+        if domain not in FREE_EMAIL_DOMAINS:
+            return domain
+    return ""
+
+
+def normalize_company(name: str) -> str:
+    """Company name without case, punctuation or legal suffix ("Acme, Inc." -> "acme")"""
+    words = re.sub(r"[^a-z0-9 ]+", " ", (name or "").lower()).split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def account_key(lead: Dict[str, Any]) -> str:
+    """Groups contacts of one company: its domain, else its normalized name"""
+    domain = company_domain(lead)
+    if domain:
+        return domain
+    name = normalize_company(lead.get("company", ""))
+    return f"name:{name}" if name else ""
+
+
+class AccountCache:
+    """Account-level results (company lookups, research summaries) with a TTL
+
+    Values are JSON documents keyed by (kind, account). `get_or_compute`
+    lets only one thread compute a missing entry per key, so contacts of one
+    company processed concurrently still share a single lookup.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("ACCOUNT_CACHE_PATH", "data/accounts.db")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, kind: str, account: str, ttl_s: float = None) -> Optional[Dict[str, Any]]:
+        """Cached value, or None if missing or older than ttl_s"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, fetched_at FROM account_cache WHERE kind = ? AND account = ?", (kind, account)
+            ).fetchone()
+        if not row or (ttl_s is not None and time.time() - row[1] > ttl_s):
+            return None
+        return json.loads(row[0])
+
+    def put(self, kind: str, account: str, value: Dict[str, Any]):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO account_cache VALUES (?, ?, ?, ?)",
+                (kind, account, json.dumps(value, default=str), time.time())
+            )
+
+    def get_or_compute(self, kind: str, account: str, ttl_s: float,
+                       compute: Callable[[], Optional[Dict[str, Any]]]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(value, cached): the cached value, else compute() stored for next time
+
+        compute() returning None means "failed, try again next time" and is
+        not cached; an empty dict ("nothing found") is.
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault((kind, account), threading.Lock())
+        with key_lock:
+            value = self.get(kind, account, ttl_s)
+            if value is not None:
+                return value, True
+            value = compute()
+            if value is not None:
+                self.put(kind, account, value)
+            return value, False
+
+    def purge(self, older_than_s: float, kind: str = None) -> int:
+        """Drop entries (of one kind, if given) older than older_than_s; returns how many"""
+        cutoff = time.time() - older_than_s
+        with self._lock, self._conn:
+            if kind is None:
+                return self._conn.execute("DELETE FROM account_cache WHERE fetched_at < ?", (cutoff,)).rowcount
+            return self._conn.execute(
+                "DELETE FROM account_cache WHERE kind = ? AND fetched_at < ?", (kind, cutoff)
+            ).rowcount
+
+
+_caches: Dict[str, AccountCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_account_cache(path: str = None) -> AccountCache:
+    """Shared AccountCache per database path"""
+    path = path or os.getenv("ACCOUNT_CACHE_PATH", "data/accounts.db")
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = AccountCache(path)
+        return _caches[path]
@@ -1,20 +1,149 @@
+import contextvars
 import os
+import threading
+import time
 import requests
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any
+from .cassette import cassette_adapter, get_cassette
+from .latency import get_latency_tracker
+from .budget import current_budget
+
+_session = None
+_session_lock = threading.Lock()
+_hedge_pool = None
+
+# Methods safe to send more than once (RFC 9110): only these are hedged or retried
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+def get_session() -> requests.Session:
+    """Process-wide HTTP session so every agent reuses pooled connections"""
+    global _session
+    
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # A cassette (record/replay) wraps the same pooled adapter
+                cassette = get_cassette()
+                if cassette is not None:
+                    adapter = cassette_adapter(cassette, pool_connections=16, pool_maxsize=32)
+                else:
+                    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    
+    return _session
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    
+    if _hedge_pool is None:
+        with _session_lock:
+            if _hedge_pool is None:
+                _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    
+    return _hedge_pool
+
+def _attempt(endpoint: str, method: str, url: str, timeout: float, kwargs: Dict) -> requests.Response:
+    """One request, with its latency recorded for the endpoint"""
+    tracker = get_latency_tracker()
+    started = time.perf_counter()
+    try:
+        response = get_session().request(method, url, timeout=timeout, **kwargs)
+    except requests.Timeout:
+        tracker.observe(endpoint, timeout, timed_out=True)
+        raise
+    tracker.observe(endpoint, time.perf_counter() - started)
+    return response
+
+def _submit(pool: ThreadPoolExecutor, *args):
+    """Run _attempt on the pool in a copy of the caller's context, so the run context and budget go along"""
+    return pool.submit(contextvars.copy_context().run, _attempt, *args)
+
+def _hedged(endpoint: str, method: str, url: str, limit: float, delay: float, kwargs: Dict) -> requests.Response:
+    """First successful response of the request and, past `delay`, one backup attempt"""
+    tracker = get_latency_tracker()
+    pool = _get_hedge_pool()
+    primary = _submit(pool, endpoint, method, url, limit, kwargs)
+    if wait([primary], timeout=delay).done or not tracker.admit_hedge(endpoint):
+        return primary.result()
+    
+    # The hedge is a real provider call and counts against the run's budget
+    budget = current_budget()
+    if budget and not budget.acquire(endpoint.split(".")[0]):
+        return primary.result()
+    
+    backup = _submit(pool, endpoint, method, url, limit, kwargs)
+    pending = {primary, backup}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is backup:
+                    tracker.hedge_won(endpoint)
+                return future.result()
+    # Both attempts failed: surface the first one's error
+    return primary.result()
+
+def timed_request(method: str, url: str, endpoint: str, timeout: float = 30, hedge: bool = False,
+                  idempotent: bool = None, **kwargs) -> requests.Response:
+    """HTTP request with an adaptive timeout, optionally hedged
+    
+    `endpoint` ("<provider>.<name>", e.g. "clearbit.person") groups requests
+    for latency tracking; `timeout` is the ceiling used until the endpoint's
+    percentiles are known (see utils.latency). Only idempotent requests
+    (by method, unless `idempotent` says otherwise) get an adaptive deadline,
+    and one that fires is retried once at the same deadline, within what is
+    left of `timeout`, so one stalled response does not fail the lookup and
+    a request never takes longer than `timeout` in total. With hedge=True an
+    idempotent request still running at the endpoint's hedge delay gets a
+    second attempt and the first successful response wins, within the
+    endpoint's hedge budget.
+    Hedges and retries count against the run's provider budget. Hedging is
+    off under a cassette, so replays stay deterministic.
+    """
+    tracker = get_latency_tracker()
+    idempotent = method.upper() in IDEMPOTENT_METHODS if idempotent is None else idempotent
+    limit = tracker.timeout(endpoint, timeout) if idempotent else timeout
+    tracker.count_request(endpoint)
+    
+    delay = tracker.hedge_delay(endpoint) if hedge and idempotent and get_cassette() is None else None
+    started = time.perf_counter()
+    try:
+        if delay is None:
+            return _attempt(endpoint, method, url, limit, kwargs)
+        return _hedged(endpoint, method, url, limit, delay, kwargs)
+    except requests.Timeout:
+        retry_limit = min(limit, timeout - (time.perf_counter() - started))
+        if limit >= timeout or retry_limit <= 0:
+            raise
+        # The adaptive deadline cut the request short: one more try, still
+        # under that deadline, since a stall rarely repeats on a fresh attempt
+        budget = current_budget()
+        if budget and not budget.acquire(endpoint.split(".")[0]):
+            raise
+        return _attempt(endpoint, method, url, retry_limit, kwargs)
 
 class APIClient:
     """Base API client with common functionality"""
     
+    # Prefix of latency-tracking endpoint names; also the run budget's provider key
+    provider = "api"
+    
     def __init__(self, base_url: str, api_key: str):
         self.base_url = base_url
         self.api_key = api_key
     
-    def get(self, endpoint: str, params: Dict = None) -> Dict[str, Any]:
-        """Make GET request"""
+    def get(self, endpoint: str, params: Dict = None, hedge: bool = False) -> Dict[str, Any]:
+        """Make GET request (hedged if asked, GETs being idempotent)"""
         url = f"{self.base_url}/{endpoint}"
         headers = self._get_headers()
         
-        response = requests.get(url, headers=headers, params=params, timeout=30)
+        response = timed_request("GET", url, f"{self.provider}.{endpoint}", timeout=30, hedge=hedge,
+                                 headers=headers, params=params)
         response.raise_for_status()
         return response.json()
     
@@ -23,7 +152,7 @@ class APIClient:
         url = f"{self.base_url}/{endpoint}"
         headers = self._get_headers()
         
-        response = requests.post(url, headers=headers, json=data, timeout=30)
+        response = timed_request("POST", url, f"{self.provider}.{endpoint}", timeout=30, headers=headers, json=data)
         response.raise_for_status()
         return response.json()
     
@@ -37,6 +166,8 @@ class APIClient:
 class ApolloClient(APIClient):
     """Apollo API client"""
     
+    provider = "apollo"
+    
     def __init__(self):
         super().__init__(
             base_url="https://api.apollo.io/v1",
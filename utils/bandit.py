@@ -0,0 +1,126 @@
+import os
+import random
+import sqlite3
+import threading
+from typing import Dict, Any, List
+
+# Which engagement flag counts as a success for each experiment
+DEFAULT_REWARDS = {
+    "subject_variant": "opened",
+    "tone": "replied"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bandit_arms (
+    experiment TEXT NOT NULL,
+    arm TEXT NOT NULL,
+    alpha REAL NOT NULL,
+    beta REAL NOT NULL,
+    PRIMARY KEY (experiment, arm)
+);
+"""
+
+
+class VariantBandit:
+    """Thompson-sampling allocator for message variants (tone, subject style, ...)
+
+    Each (experiment, arm) keeps a Beta(alpha, beta) posterior: two numbers,
+    cached in memory and written through to SQLite. A send adds a pending
+    failure (beta + 1); the experiment's reward flag turns it into a success
+    (alpha + 1, beta - 1). Both are O(1) and driven by EventStore listeners,
+    so allocation shifts as engagement streams in rather than per review.
+    """
+
+    def __init__(self, path: str = None, rewards: Dict[str, str] = None, seed: int = None):
+        self.path = path or os.getenv("BANDIT_STORE_PATH", "data/bandit.db")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.rewards = dict(rewards or DEFAULT_REWARDS)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._attached = set()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._arms: Dict[tuple, List[float]] = {
+            (experiment, arm): [alpha, beta]
+            for experiment, arm, alpha, beta in self._conn.execute("SELECT * FROM bandit_arms")
+        }
+
+    def choose(self, experiment: str, arms: List[str]) -> str:
+        """Sample each arm's posterior and return the arm with the highest draw"""
+        with self._lock:
+            draws = []
+            for arm in arms:
+                alpha, beta = self._arms.get((experiment, str(arm)), (1.0, 1.0))
+                draws.append((self._rng.betavariate(alpha, beta), arm))
+        return max(draws, key=lambda draw: draw[0])[1]
+
+    def record_trial(self, experiment: str, arm: str):
+        self._update(experiment, str(arm), 0.0, 1.0)
+
+    def record_reward(self, experiment: str, arm: str):
+        self._update(experiment, str(arm), 1.0, -1.0)
+
+    def on_event(self, event: Dict[str, Any], flag: str):
+        """EventStore listener: sends are trials, reward flags are successes"""
+        if event.get("simulated"):
+            # Demo sends and engagement are random; they must not move real posteriors
+            return
+        segments = event.get("segments") or {}
+        for experiment, reward_flag in self.rewards.items():
+            arm = segments.get(experiment)
+            if arm in (None, ""):
+                continue
+            if flag == "sent":
+                self.record_trial(experiment, arm)
+            elif flag == reward_flag:
+                self.record_reward(experiment, arm)
+
+    def attach(self, store):
+        """Subscribe to an EventStore once"""
+        with self._lock:
+            if id(store) in self._attached:
+                return
+            self._attached.add(id(store))
+        store.add_listener(self.on_event)
+
+    def stats(self, experiment: str) -> List[Dict[str, Any]]:
+        """Posterior summary per arm, best mean first"""
+        with self._lock:
+            arms = [(arm, alpha, beta) for (exp, arm), (alpha, beta) in self._arms.items() if exp == experiment]
+        rows = [
+            {
+                "arm": arm,
+                "trials": alpha + beta - 2,
+                "successes": alpha - 1,
+                "mean": alpha / (alpha + beta)
+            }
+            for arm, alpha, beta in arms
+        ]
+        return sorted(rows, key=lambda row: row["mean"], reverse=True)
+
+    def _update(self, experiment: str, arm: str, d_alpha: float, d_beta: float):
+        with self._lock:
+            params = self._arms.setdefault((experiment, arm), [1.0, 1.0])
+            params[0] += d_alpha
+            # A reward without a counted send (e.g. late registration) must not push beta below the prior
+            params[1] = max(1.0, params[1] + d_beta)
+            with self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO bandit_arms VALUES (?, ?, ?, ?)",
+                    (experiment, arm, params[0], params[1])
+                )
+
+
+_bandits: Dict[str, VariantBandit] = {}
+_bandits_lock = threading.Lock()
+
+
+def get_bandit(path: str = None) -> VariantBandit:
+    """Shared VariantBandit per database path"""
+    path = path or os.getenv("BANDIT_STORE_PATH", "data/bandit.db")
+    with _bandits_lock:
+        if path not in _bandits:
+            _bandits[path] = VariantBandit(path)
+        return _bandits[path]
@@ -0,0 +1,193 @@
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from .run_context import current_run
+
+# Usage tiers: below degrade_at everything runs normally, between degrade_at
+# and the limit only high-priority work takes the expensive path, at the
+# limit the provider is not called at all
+FULL = "full"
+DEGRADED = "degraded"
+EXHAUSTED = "exhausted"
+
+
+class RunBudget:
+    """Per-run call/token/time limits, enforced centrally and shared by all steps
+
+    Declared under "budgets" in workflow.json:
+
+        "budgets": {
+          "max_wall_seconds": 900,
+          "degrade_at": 0.8,
+          "min_score": 0.6,
+          "providers": {"openai": {"max_calls": 200, "max_tokens": 150000},
+                        "clearbit": {"max_calls": 1000}}
+        }
+
+    Agents `acquire` a call before making it (passing the item's score as
+    priority), `charge` the tokens it used, and `degrade` to record every
+    cheaper path they took and why. Wall time counts against every provider,
+    so a run close to its deadline degrades everywhere.
+    """
+
+    def __init__(self, providers: Dict[str, Dict[str, float]] = None, max_wall_seconds: float = None,
+                 degrade_at: float = 0.8, min_score: float = 0.6):
+        self.providers = providers or {}
+        self.max_wall_seconds = max_wall_seconds
+        self.degrade_at = degrade_at
+        self.min_score = min_score
+        self.started_at = time.time()
+        self.usage: Dict[str, Dict[str, float]] = {}
+        self.degradations: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional["RunBudget"]:
+        if not config:
+            return None
+        return cls(
+            providers=config.get("providers"),
+            max_wall_seconds=config.get("max_wall_seconds"),
+            degrade_at=config.get("degrade_at", 0.8),
+            min_score=config.get("min_score", 0.6)
+        )
+
+    def remaining_seconds(self) -> Optional[float]:
+        if not self.max_wall_seconds:
+            return None
+        return max(0.0, self.max_wall_seconds - (time.time() - self.started_at))
+
+    def fraction_used(self, provider: str = None) -> float:
+        """Highest used share across the provider's limits and the run's wall time"""
+        with self._lock:
+            return self._fraction_used(provider)
+
+    def _fraction_used(self, provider: str = None) -> float:
+        fractions = []
+        if self.max_wall_seconds:
+            fractions.append((time.time() - self.started_at) / self.max_wall_seconds)
+        limits = self.providers.get(provider, {}) if provider else {}
+        used = self.usage.get(provider, {})
+        for metric, limit in (("calls", limits.get("max_calls")), ("tokens", limits.get("max_tokens"))):
+            if limit is not None:
+                # A zero limit switches the provider off for the run
+                fractions.append(used.get(metric, 0) / limit if limit else 1.0)
+        return max(fractions) if fractions else 0.0
+
+    def tier(self, provider: str = None) -> str:
+        return self._tier(self.fraction_used(provider))
+
+    def _tier(self, used: float) -> str:
+        if used >= 1:
+            return EXHAUSTED
+        return DEGRADED if used >= self.degrade_at else FULL
+
+    def acquire(self, provider: str, priority: float = None, calls: int = 1) -> bool:
+        """Reserve calls if the provider's tier allows them for this priority
+
+        Full tier: always. Degraded tier: only for items scoring at least
+        `min_score` (unscored work is refused). Exhausted: never. The check
+        and the charge are atomic, so concurrent workers cannot overshoot
+        a call limit.
+        """
+        with self._lock:
+            tier = self._tier(self._fraction_used(provider))
+            if tier == EXHAUSTED or (tier == DEGRADED and (priority is None or priority < self.min_score)):
+                return False
+            self._charge(provider, calls, 0)
+            return True
+
+    def grant(self, provider: str, priority: float = None, calls: int = 1) -> Optional[Dict[str, Any]]:
+        """Reserve calls for work another process will do, or None if refused
+
+        The grant travels with a queued task; the worker runs it under
+        `from_grant` and the coordinator `settle`s it with the worker's report.
+        """
+        if not self.acquire(provider, priority, calls):
+            return None
+        return {"provider": provider, "calls": calls, "max_wall_seconds": self.remaining_seconds()}
+
+    @classmethod
+    def from_grant(cls, grant: Dict[str, Any]) -> "RunBudget":
+        """Worker-side budget that allows exactly the granted calls
+
+        Priority and tiers were applied when the grant was made, so the
+        worker only stops at the granted limit or the run's remaining time.
+        """
+        return cls(
+            providers={grant["provider"]: {"max_calls": grant["calls"]}},
+            max_wall_seconds=grant["max_wall_seconds"],
+            degrade_at=1.0
+        )
+
+    def settle(self, grant: Dict[str, Any], report: Optional[Dict[str, Any]] = None):
+        """Replace a grant's reserved calls with a worker's actual usage (no report: refund it)"""
+        report = report or {}
+        with self._lock:
+            self._charge(grant["provider"], -grant["calls"], 0)
+            for provider, used in report.get("usage", {}).items():
+                self._charge(provider, used.get("calls", 0), used.get("tokens", 0))
+        for entry in report.get("degradations", []):
+            for _ in range(entry.get("count", 1)):
+                self.degrade(entry["step"], entry["action"], entry["reason"])
+
+    def charge(self, provider: str, calls: int = 1, tokens: int = 0):
+        """Count usage that was not reserved with `acquire` (e.g. tokens of a finished call)"""
+        with self._lock:
+            self._charge(provider, calls, tokens)
+
+    def _charge(self, provider: str, calls: int, tokens: int):
+        used = self.usage.setdefault(provider, {"calls": 0, "tokens": 0})
+        used["calls"] += calls
+        used["tokens"] += tokens
+
+    def degrade(self, step: str, action: str, reason: str):
+        """Record a degradation; repeats of the same (step, action, reason) are counted"""
+        with self._lock:
+            for entry in self.degradations:
+                if (entry["step"], entry["action"], entry["reason"]) == (step, action, reason):
+                    entry["count"] += 1
+                    return
+            self.degradations.append({"step": step, "action": action, "reason": reason, "count": 1})
+
+    def reason(self, provider: str = None) -> str:
+        """Why a provider was refused, stable enough to group repeated degradations"""
+        with self._lock:
+            tier = self._tier(self._fraction_used(provider))
+            wall_bound = bool(self.max_wall_seconds) and self._tier(
+                (time.time() - self.started_at) / self.max_wall_seconds) == tier
+        source = "run wall time" if wall_bound else f"{provider} budget"
+        if tier == EXHAUSTED:
+            return f"{source} exhausted"
+        if tier == DEGRADED:
+            return f"{source} over {self.degrade_at:.0%}, priority below {self.min_score}"
+        return f"{source} available"
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            usage = {provider: dict(used) for provider, used in self.usage.items()}
+            degradations = [dict(entry) for entry in self.degradations]
+        return {
+            "wall_seconds": round(time.time() - self.started_at, 1),
+            "max_wall_seconds": self.max_wall_seconds,
+            "usage": usage,
+            "limits": self.providers,
+            "degradations": degradations
+        }
+
+
+def current_budget() -> Optional[RunBudget]:
+    """The budget of the run executing in this thread, if it declares one"""
+    run = current_run()
+    return getattr(run, "budget", None) if run else None
+
+
+def token_usage(response) -> int:
+    """Total tokens of an LLM response (estimated from its length if not reported)"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    reported = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    if reported.get("total_tokens"):
+        return reported["total_tokens"]
+    return len(str(getattr(response, "content", ""))) // 4
@@ -0,0 +1,226 @@
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("Cassette")
+
+# Only these response headers are kept; request headers (API keys) never are.
+# Bodies are stored decoded, so Content-Encoding is deliberately dropped.
+KEPT_HEADERS = {"content-type", "etag", "retry-after", "x-request-id"}
+
+
+class CassetteMiss(LookupError):
+    """Replay found no recorded exchange for a request"""
+
+
+def _route(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}"
+
+
+def _exchange_key(method: str, url: str, body: Optional[bytes]) -> str:
+    digest = hashlib.sha1(f"{method.upper()} {url}".encode("utf-8"))
+    digest.update(body or b"")
+    return digest.hexdigest()
+
+
+def _encode_body(content: bytes) -> Dict[str, Any]:
+    try:
+        return {"body": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"body": base64.b64encode(content).decode("ascii"), "b64": True}
+
+
+def _decode_body(entry: Dict[str, Any]) -> bytes:
+    if entry.get("b64"):
+        return base64.b64decode(entry["body"])
+    return entry["body"].encode("utf-8")
+
+
+class Cassette:
+    """Recorded HTTP exchanges (requests and httpx/LLM traffic) with their timing
+
+    Stored as gzipped JSON lines, one exchange per line, in request order.
+    Replay matches a request by method, URL and body first; requests that
+    embed run-specific values (ids, timestamps) fall back to the next unused
+    exchange on the same method + path, so a recorded campaign replays in
+    order. With `simulate_latency`, replay sleeps for the recorded time
+    (times `latency_scale`).
+    """
+
+    def __init__(self, path: str, mode: str = "replay", simulate_latency: bool = False, latency_scale: float = 1.0):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self.latency_scale = latency_scale
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._used = set()
+        self._by_key: Dict[str, List[int]] = {}
+        self._by_route: Dict[str, List[int]] = {}
+        if mode == "replay":
+            self._load()
+
+    def record(self, method: str, url: str, body: Optional[bytes], status: int, reason: str,
+               headers: Dict[str, str], content: bytes, elapsed_ms: float):
+        entry = {
+            "key": _exchange_key(method, url, body),
+            "route": _route(method, url),
+            "method": method.upper(),
+            "url": url,
+            "status": status,
+            "reason": reason,
+            "headers": {k.lower(): v for k, v in headers.items() if k.lower() in KEPT_HEADERS},
+            "elapsed_ms": round(elapsed_ms, 1),
+            **_encode_body(content)
+        }
+        with self._lock:
+            self.entries.append(entry)
+
+    def lookup(self, method: str, url: str, body: Optional[bytes]) -> Dict[str, Any]:
+        """Next unused recorded exchange for a request (raises CassetteMiss)"""
+        with self._lock:
+            for index_map, key in ((self._by_key, _exchange_key(method, url, body)),
+                                   (self._by_route, _route(method, url))):
+                for index in index_map.get(key, []):
+                    if index not in self._used:
+                        self._used.add(index)
+                        entry = self.entries[index]
+                        break
+                else:
+                    continue
+                break
+            else:
+                raise CassetteMiss(f"No recorded response for {method.upper()} {url}")
+
+        if self.simulate_latency:
+            time.sleep(entry["elapsed_ms"] * self.latency_scale / 1000)
+        return entry
+
+    def save(self):
+        """Write recorded exchanges atomically"""
+        if self.mode != "record":
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            entries = list(self.entries)
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        logger.info(f"Recorded {len(entries)} HTTP exchanges to {self.path}")
+
+    def _load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            self.entries = [json.loads(line) for line in f if line.strip()]
+        for index, entry in enumerate(self.entries):
+            self._by_key.setdefault(entry["key"], []).append(index)
+            self._by_route.setdefault(entry["route"], []).append(index)
+        logger.info(f"Replaying {len(self.entries)} HTTP exchanges from {self.path}")
+
+
+_cassette: Optional[Cassette] = None
+
+
+def activate_cassette(path: str, mode: str, simulate_latency: bool = False, latency_scale: float = 1.0) -> Cassette:
+    """Route HTTP and LLM traffic through a cassette; call before the first request
+
+    Also configurable with HTTP_CASSETTE / HTTP_CASSETTE_MODE /
+    HTTP_CASSETTE_LATENCY (a latency scale; unset or 0 disables simulation).
+    """
+    global _cassette
+    _cassette = Cassette(path, mode, simulate_latency, latency_scale)
+    if mode == "record":
+        atexit.register(_cassette.save)
+    return _cassette
+
+
+def get_cassette() -> Optional[Cassette]:
+    global _cassette
+    if _cassette is None and os.getenv("HTTP_CASSETTE"):
+        scale = float(os.getenv("HTTP_CASSETTE_LATENCY", "0") or 0)
+        activate_cassette(os.environ["HTTP_CASSETTE"], os.getenv("HTTP_CASSETTE_MODE", "replay"),
+                          simulate_latency=scale > 0, latency_scale=scale or 1.0)
+    return _cassette
+
+
+def cassette_adapter(cassette: Cassette, **adapter_kwargs):
+    """requests transport adapter that records through to, or replays instead of, the network"""
+    from requests import Response
+    from requests.adapters import HTTPAdapter
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    class CassetteAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+
+            if cassette.mode == "replay":
+                entry = cassette.lookup(request.method, request.url, body)
+                response = Response()
+                response.status_code = entry["status"]
+                response.reason = entry.get("reason", "")
+                response.headers = CaseInsensitiveDict(entry["headers"])
+                response.encoding = get_encoding_from_headers(response.headers)
+                response._content = _decode_body(entry)
+                response.url = request.url
+                response.request = request
+                response.connection = self
+                return response
+
+            started = time.perf_counter()
+            response = super().send(request, **kwargs)
+            content = response.content
+            cassette.record(request.method, request.url, body, response.status_code, response.reason or "",
+                            dict(response.headers), content, (time.perf_counter() - started) * 1000)
+            return response
+
+    return CassetteAdapter(**adapter_kwargs)
+
+
+def llm_http_client():
+    """httpx client for ChatOpenAI(http_client=...) when a cassette is active, else None"""
+    cassette = get_cassette()
+    if cassette is None:
+        return None
+
+    import httpx
+
+    class CassetteTransport(httpx.BaseTransport):
+        def __init__(self):
+            self._inner = httpx.HTTPTransport() if cassette.mode == "record" else None
+
+        def handle_request(self, request):
+            body = request.read()
+            url = str(request.url)
+
+            if cassette.mode == "replay":
+                entry = cassette.lookup(request.method, url, body)
+                return httpx.Response(entry["status"], headers=entry["headers"], content=_decode_body(entry),
+                                      request=request)
+
+            started = time.perf_counter()
+            response = self._inner.handle_request(request)
+            content = response.read()
+            cassette.record(request.method, url, body, response.status_code, response.reason_phrase,
+                            dict(response.headers), content, (time.perf_counter() - started) * 1000)
+            # read() already undid Content-Encoding; don't let httpx decode twice
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() != "content-encoding"]
+            return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+        def close(self):
+            if self._inner is not None:
+                self._inner.close()
+
+    return httpx.Client(transport=CassetteTransport(), timeout=60)
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional
+
+# Provider event names -> per-recipient flag / campaign counter column
+EVENT_FLAGS = {
+    "open": "opened",
+    "opened": "opened",
+    "click": "clicked",
+    "clicked": "clicked",
+    "reply": "replied",
+    "replied": "replied",
+    "meeting": "meeting_booked",
+    "meeting_booked": "meeting_booked"
+}
+
+# A click or reply implies the email was opened, even if the open pixel never fired
+IMPLIED_FLAGS = {
+    "opened": ["opened"],
+    "clicked": ["opened", "clicked"],
+    "replied": ["opened", "replied"],
+    "meeting_booked": ["opened", "replied", "meeting_booked"]
+}
+
+# How long a write waits for another connection's write to finish
+BUSY_TIMEOUT_S = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    campaign_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    type TEXT NOT NULL,
+    occurred_at REAL NOT NULL,
+    received_at REAL NOT NULL,
+    payload TEXT
+);
+CREATE TABLE IF NOT EXISTS recipients (
+    campaign_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    sent_at REAL,
+    segments TEXT,
+    opened INTEGER NOT NULL DEFAULT 0,
+    clicked INTEGER NOT NULL DEFAULT 0,
+    replied INTEGER NOT NULL DEFAULT 0,
+    meeting_booked INTEGER NOT NULL DEFAULT 0,
+    last_event_at REAL,
+    PRIMARY KEY (campaign_id, email)
+);
+CREATE TABLE IF NOT EXISTS campaign_counters (
+    campaign_id TEXT PRIMARY KEY,
+    sent INTEGER NOT NULL DEFAULT 0,
+    opened INTEGER NOT NULL DEFAULT 0,
+    clicked INTEGER NOT NULL DEFAULT 0,
+    replied INTEGER NOT NULL DEFAULT 0,
+    meeting_booked INTEGER NOT NULL DEFAULT 0,
+    events INTEGER NOT NULL DEFAULT 0,
+    last_event_at REAL,
+    updated_at REAL
+);
+"""
+
+
+def event_id_for(event: Dict[str, Any]) -> str:
+    """Provider id if present, else a content hash so redeliveries collapse"""
+    if event.get("event_id") or event.get("id"):
+        return str(event.get("event_id") or event.get("id"))
+    key = "|".join(str(event.get(k, "")) for k in ("campaign_id", "email", "type", "occurred_at"))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """Autocommit connection with the event store's settings
+
+    WAL lets readers run alongside the writer, and the busy timeout makes a
+    second connection to the same file (e.g. a poller's cursor table) wait
+    for a write instead of failing with "database is locked".
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=BUSY_TIMEOUT_S)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {int(BUSY_TIMEOUT_S * 1000)}")
+    return conn
+
+
+class EventStore:
+    """Append-only engagement event log with incrementally maintained aggregates
+
+    Every accepted event updates the recipient's flags and, when a flag flips
+    for the first time, the campaign counters in the same transaction. Reading
+    campaign metrics is therefore one primary-key lookup, however many events
+    exist. Redelivered events are ignored by event id; late or out-of-order
+    events are fine because flags only ever go from 0 to 1.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("EVENT_STORE_PATH", "data/events.db")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = connect(self.path)
+        self._conn.executescript(SCHEMA)
+        self._migrate()
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Call listener(event, flag) for every flag newly set by an event
+
+        New sends are reported too, with flag "sent". The event passed on
+        carries the recipient's segment tags under "segments".
+        """
+        self._listeners.append(listener)
+
+    def record_send(self, campaign_id: str, email: str, sent_at: float = None,
+                    segments: Dict[str, Any] = None, simulated: bool = False) -> bool:
+        """Register a recipient and its segment tags; returns False if already registered
+
+        simulated=True marks the "sent" event passed to listeners, for sends
+        that never reached a provider. Emails are keyed lowercased, as
+        webhook events are (see utils.webhooks.normalize_event).
+        """
+        email = email.lower()
+        segments_json = json.dumps(segments) if segments else None
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO recipients (campaign_id, email, sent_at, segments) VALUES (?, ?, ?, ?)",
+                (campaign_id, email, sent_at or time.time(), segments_json)
+            )
+            if cursor.rowcount == 0:
+                # Known only from an earlier (late-registered) event: count the send once
+                cursor = self._conn.execute(
+                    "UPDATE recipients SET sent_at = ?, segments = ? "
+                    "WHERE campaign_id = ? AND email = ? AND sent_at IS NULL",
+                    (sent_at or time.time(), segments_json, campaign_id, email)
+                )
+                if cursor.rowcount == 0:
+                    return False
+            self._ensure_counters(campaign_id)
+            self._conn.execute(
+                "UPDATE campaign_counters SET sent = sent + 1, updated_at = ? WHERE campaign_id = ?",
+                (time.time(), campaign_id)
+            )
+
+        for listener in self._listeners:
+            event = {"campaign_id": campaign_id, "email": email, "segments": segments or {}}
+            if simulated:
+                event["simulated"] = True
+            listener(event, "sent")
+        return True
+
+    def ingest(self, event: Dict[str, Any]) -> bool:
+        """Append one event; returns False for duplicates and unknown types"""
+        flag = EVENT_FLAGS.get(str(event.get("type", "")).lower())
+        campaign_id = event.get("campaign_id")
+        email = str(event.get("email") or "").lower()
+        if not flag or not campaign_id or not email:
+            return False
+        event = dict(event, email=email)
+
+        occurred_at = float(event.get("occurred_at") or time.time())
+        new_flags = []
+
+        with self._lock, self._transaction():
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (event_id_for(event), campaign_id, email, flag, occurred_at, time.time(),
+                 json.dumps(event, default=str))
+            )
+            if cursor.rowcount == 0:
+                return False
+
+            self._ensure_counters(campaign_id)
+            # Events for recipients we never saw sent (e.g. sent elsewhere) still count
+            self._conn.execute(
+                "INSERT OR IGNORE INTO recipients (campaign_id, email) VALUES (?, ?)",
+                (campaign_id, email)
+            )
+
+            for name in IMPLIED_FLAGS[flag]:
+                cursor = self._conn.execute(
+                    f"UPDATE recipients SET {name} = 1 WHERE campaign_id = ? AND email = ? AND {name} = 0",
+                    (campaign_id, email)
+                )
+                if cursor.rowcount:
+                    new_flags.append(name)
+
+            self._conn.execute(
+                "UPDATE recipients SET last_event_at = MAX(COALESCE(last_event_at, 0), ?) "
+                "WHERE campaign_id = ? AND email = ?",
+                (occurred_at, campaign_id, email)
+            )
+            segments = None
+            if new_flags and self._listeners:
+                row = self._conn.execute(
+                    "SELECT segments FROM recipients WHERE campaign_id = ? AND email = ?",
+                    (campaign_id, email)
+                ).fetchone()
+                segments = json.loads(row[0]) if row and row[0] else {}
+
+            increments = ", ".join(f"{name} = {name} + 1" for name in new_flags)
+            self._conn.execute(
+                "UPDATE campaign_counters SET "
+                + (increments + ", " if increments else "")
+                + "events = events + 1, last_event_at = MAX(COALESCE(last_event_at, 0), ?), updated_at = ? "
+                "WHERE campaign_id = ?",
+                (occurred_at, time.time(), campaign_id)
+            )
+
+        if new_flags and self._listeners:
+            event = dict(event, segments=segments)
+            for name in new_flags:
+                for listener in self._listeners:
+                    listener(event, name)
+        return True
+
+    def ingest_many(self, events: Iterable[Dict[str, Any]]) -> int:
+        """Ingest a batch; returns the number of new events"""
+        return sum(1 for event in events if self.ingest(event))
+
+    def get_metrics(self, campaign_id: str) -> Dict[str, Any]:
+        """Precomputed counters and rates for a campaign (O(1))"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sent, opened, clicked, replied, meeting_booked, events, last_event_at "
+                "FROM campaign_counters WHERE campaign_id = ?",
+                (campaign_id,)
+            ).fetchone()
+
+        sent, opened, clicked, replied, meetings, events, last_event_at = row or (0, 0, 0, 0, 0, 0, None)
+        # Recipients seen only through events still belong in the denominator
+        total = max(sent, opened)
+        return {
+            "sent": sent,
+            "opened": opened,
+            "clicked": clicked,
+            "replied": replied,
+            "meeting_booked": meetings,
+            "events": events,
+            "last_event_at": last_event_at,
+            "open_rate": opened / total if total else 0,
+            "click_rate": clicked / total if total else 0,
+            "reply_rate": replied / total if total else 0,
+            "meeting_rate": meetings / total if total else 0
+        }
+
+    def get_responses(self, campaign_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Per-recipient engagement flags for a campaign"""
+        query = (
+            "SELECT email, opened, clicked, replied, meeting_booked, sent_at, segments FROM recipients "
+            "WHERE campaign_id = ? ORDER BY email"
+        )
+        params = (campaign_id,)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+
+        return [
+            {
+                "email": email,
+                "campaign_id": campaign_id,
+                "opened": bool(opened),
+                "clicked": bool(clicked),
+                "replied": bool(replied),
+                "meeting_booked": bool(meeting),
+                "sent_at": sent_at,
+                "segments": json.loads(segments) if segments else {}
+            }
+            for email, opened, clicked, replied, meeting, sent_at, segments in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _migrate(self):
+        """Add columns introduced after a database was created"""
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(recipients)")}
+        if "segments" not in columns:
+            self._conn.execute("ALTER TABLE recipients ADD COLUMN segments TEXT")
+
+    def _ensure_counters(self, campaign_id: str):
+        self._conn.execute(
+            "INSERT OR IGNORE INTO campaign_counters (campaign_id, updated_at) VALUES (?, ?)",
+            (campaign_id, time.time())
+        )
+
+    def _transaction(self):
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    """BEGIN/COMMIT (or ROLLBACK on error) around a block"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_stores: Dict[str, EventStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_event_store(path: str = None) -> EventStore:
+    """Shared EventStore per database path"""
+    path = path or os.getenv("EVENT_STORE_PATH", "data/events.db")
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = EventStore(path)
+        return _stores[path]
\ No newline at end of file
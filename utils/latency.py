@@ -0,0 +1,128 @@
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+
+def _percentile(ordered, q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LatencyTracker:
+    """Recent response times per endpoint and the timeouts and hedge delays they imply
+
+    An endpoint keeps its configured timeout until `min_samples` responses
+    have been seen. After that its timeout becomes `multiplier` x p95,
+    clamped between `min_timeout` and the configured value, so a stuck
+    provider response costs a bounded slice of stage time instead of the full
+    fixed timeout. Requests that time out are recorded at the timeout, so a
+    provider that slows down overall raises its own timeout again.
+
+    Hedged requests (see utils.api_clients.timed_request) send a second
+    attempt once the first passes p95 (see `hedge_delay`). Each request adds
+    `hedge_ratio` tokens (up to `hedge_burst`) and each hedge spends one, so
+    hedges stay below that share of an endpoint's traffic even when it
+    degrades.
+    """
+
+    def __init__(self, window: int = 200, min_samples: int = 20, multiplier: float = 3.0,
+                 min_timeout: float = 1.0, hedge_ratio: float = 0.1, hedge_burst: float = 5):
+        self.window = window
+        self.min_samples = min_samples
+        self.multiplier = multiplier
+        self.min_timeout = min_timeout
+        self.hedge_ratio = hedge_ratio
+        self.hedge_burst = hedge_burst
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, float]] = {}
+
+    def _endpoint(self, endpoint: str) -> Dict[str, float]:
+        counts = self._counts.get(endpoint)
+        if counts is None:
+            self._samples[endpoint] = deque(maxlen=self.window)
+            counts = self._counts[endpoint] = {"requests": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0,
+                                               "hedge_tokens": 0.0}
+        return counts
+
+    def observe(self, endpoint: str, seconds: float, timed_out: bool = False):
+        """Record one attempt's latency (or the timeout it hit)"""
+        with self._lock:
+            counts = self._endpoint(endpoint)
+            self._samples[endpoint].append(seconds)
+            if timed_out:
+                counts["timeouts"] += 1
+
+    def percentile(self, endpoint: str, q: float) -> Optional[float]:
+        """Latency quantile over the window, or None before min_samples"""
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            return _percentile(sorted(samples), q)
+
+    def timeout(self, endpoint: str, default: float) -> float:
+        """Adaptive timeout for the next request, never above `default`"""
+        p95 = self.percentile(endpoint, 0.95)
+        if p95 is None:
+            return default
+        return min(default, max(self.min_timeout, p95 * self.multiplier))
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """How long to wait before hedging, or None while still learning
+
+        p95, but at most `multiplier` x p50: when stalls make up ~5% of the
+        window, p95 lands on the stall itself and would hedge too late.
+        """
+        with self._lock:
+            samples = self._samples.get(endpoint)
+            if not samples or len(samples) < self.min_samples:
+                return None
+            ordered = sorted(samples)
+        return min(_percentile(ordered, 0.95), self.multiplier * _percentile(ordered, 0.5))
+
+    def count_request(self, endpoint: str):
+        with self._lock:
+            counts = self._endpoint(endpoint)
+            counts["requests"] += 1
+            counts["hedge_tokens"] = min(self.hedge_burst, counts["hedge_tokens"] + self.hedge_ratio)
+
+    def admit_hedge(self, endpoint: str) -> bool:
+        """Spend a hedge token if the endpoint has one"""
+        with self._lock:
+            counts = self._endpoint(endpoint)
+            if counts["hedge_tokens"] < 1:
+                return False
+            counts["hedge_tokens"] -= 1
+            counts["hedges"] += 1
+            return True
+
+    def hedge_won(self, endpoint: str):
+        with self._lock:
+            self._endpoint(endpoint)["hedge_wins"] += 1
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint percentiles, current timeout and hedge counts"""
+        with self._lock:
+            snapshot = {endpoint: (sorted(samples), dict(self._counts[endpoint]))
+                        for endpoint, samples in self._samples.items()}
+        stats = {}
+        for endpoint, (ordered, counts) in snapshot.items():
+            counts.pop("hedge_tokens")
+            entry = {"samples": len(ordered), **counts}
+            if ordered:
+                entry.update({f"p{int(q * 100)}_ms": round(_percentile(ordered, q) * 1000, 1) for q in (0.5, 0.95, 0.99)})
+            stats[endpoint] = entry
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+
+_tracker = LatencyTracker()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """Process-wide tracker, so timeouts keep learning across runs of a warm service"""
+    return _tracker
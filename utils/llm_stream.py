@@ -0,0 +1,141 @@
+import time
+from typing import Dict, Any, List, Optional
+
+# Models overshoot a stated word limit a little; only clearly long output is cut
+WORD_SLACK = 0.2
+
+
+class FormatViolation(ValueError):
+    """Streamed output that can no longer become a valid SUBJECT/BODY message"""
+
+
+class MessageStreamParser:
+    """Incremental parser for "SUBJECT: ...\\nBODY: ..." completions
+
+    Fed chunks as they arrive, it raises FormatViolation as soon as the
+    output is off-format (text before SUBJECT beyond `max_preamble` chars,
+    anything but BODY after the subject line, a second SUBJECT) or too long
+    (subject over `max_subject_chars`, body over `max_words` plus
+    WORD_SLACK), so the caller can stop paying for the rest of it.
+    Whole responses parse the same way: feed() then finish().
+    """
+
+    def __init__(self, max_words: int = 100, max_subject_chars: int = 150, max_preamble: int = 80):
+        self.max_words = max_words
+        self.word_limit = int(max_words * (1 + WORD_SLACK))
+        self.max_subject_chars = max_subject_chars
+        self.max_preamble = max_preamble
+        self.subject: Optional[str] = None
+        self.body_lines: List[str] = []
+        self._state = "preamble"
+        self._preamble = 0
+        self._pending = ""
+        self._body_words = 0
+
+    def feed(self, text: str):
+        self._pending += text
+        while "\n" in self._pending:
+            line, self._pending = self._pending.split("\n", 1)
+            self._line(line, complete=True)
+        self._line(self._pending, complete=False)
+
+    def finish(self) -> Dict[str, str]:
+        """{"subject", "body"} of the whole output, or FormatViolation if incomplete"""
+        if self._pending:
+            self._line(self._pending, complete=True)
+            self._pending = ""
+        body = " ".join(line for line in self.body_lines if line).strip()
+        if not self.subject:
+            raise FormatViolation("no SUBJECT line")
+        if not body:
+            raise FormatViolation("no BODY")
+        return {"subject": self.subject, "body": body}
+
+    def _line(self, line: str, complete: bool):
+        """Check one line; partial (still streaming) lines are only checked for limits"""
+        stripped = line.strip()
+        if self._state == "preamble":
+            if stripped.startswith("SUBJECT:"):
+                subject = stripped[len("SUBJECT:"):].strip()
+                if len(subject) > self.max_subject_chars:
+                    raise FormatViolation(f"subject over {self.max_subject_chars} characters")
+                if complete:
+                    self.subject = subject
+                    self._state = "subject"
+            elif complete or not "SUBJECT:".startswith(stripped):
+                # Anything that cannot become the SUBJECT line is preamble
+                if self._preamble + len(stripped) > self.max_preamble:
+                    raise FormatViolation("no SUBJECT line at the start")
+                if complete:
+                    self._preamble += len(stripped)
+        elif self._state == "subject":
+            if stripped.startswith("BODY:"):
+                if complete:
+                    self._add_body(stripped[len("BODY:"):])
+                    self._state = "body"
+                else:
+                    self._check_words(stripped[len("BODY:"):])
+            elif stripped and (complete or not "BODY:".startswith(stripped)):
+                raise FormatViolation("expected BODY after the subject line")
+        else:
+            if stripped.startswith("SUBJECT:"):
+                raise FormatViolation("more than one message in the reply")
+            if complete:
+                self._add_body(stripped)
+            else:
+                self._check_words(stripped)
+
+    def _add_body(self, text: str):
+        text = text.strip()
+        self.body_lines.append(text)
+        self._body_words += len(text.split())
+        self._check_words("")
+
+    def _check_words(self, partial: str):
+        words = self._body_words + len(partial.split())
+        if words > self.word_limit:
+            raise FormatViolation(f"body over {self.max_words} words")
+
+
+def stream_message(llm, messages, parser: MessageStreamParser) -> Dict[str, Any]:
+    """Stream a completion through parser, stopping at the first violation
+
+    Returns the parsed subject/body (or the violation) with time to first
+    token, tokens/s and token counts. langchain-openai 0.1.x does not
+    report usage for streams, so a chunk counts as one completion token and
+    the prompt as one token per four characters.
+    """
+    prompt_tokens = sum(len(str(message.content)) for message in messages) // 4
+    started = time.perf_counter()
+    first = last = None
+    chunks = 0
+    result: Dict[str, Any] = {}
+
+    stream = llm.stream(messages)
+    try:
+        for chunk in stream:
+            text = chunk.content if isinstance(chunk.content, str) else ""
+            if not text:
+                continue
+            last = time.perf_counter()
+            if first is None:
+                first = last
+            chunks += 1
+            parser.feed(text)
+        result.update(parser.finish())
+    except FormatViolation as e:
+        result["violation"] = str(e)
+    finally:
+        # Closing the stream drops the connection, which ends the completion
+        close = getattr(stream, "close", None)
+        if close:
+            close()
+
+    generation_s = (last - first) if first is not None and last is not None else 0.0
+    result["metrics"] = {
+        "ttft_ms": round((first - started) * 1000, 1) if first is not None else None,
+        "tokens_per_s": round((chunks - 1) / generation_s, 1) if generation_s > 0 and chunks > 1 else None,
+        "completion_tokens": chunks,
+        "total_tokens": prompt_tokens + chunks
+    }
+    return result
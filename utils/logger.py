@@ -1,30 +1,177 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+import threading
 from datetime import datetime
+from typing import Any
+
+# One handler set per process, fed through a queue so callers never block on I/O
+_listener = None
+_lock = threading.Lock()
+
+NOISY_LOGGERS = ["httpx", "httpcore", "urllib3", "openai"]
+
+
+def summarize(value: Any, max_items: int = 5, max_str: int = 200, depth: int = 0) -> Any:
+    """Return a JSON-friendly, size-capped view of value
+
+    Large collections are replaced by their length plus a small sample so
+    logging a step with 10k leads costs the same as logging one with five.
+    """
+    if depth > 3 and isinstance(value, (dict, list, tuple, set)):
+        return f"<{type(value).__name__} of {len(value)}>"
+    if isinstance(value, dict):
+        items = list(value.items())
+        result = {str(k): summarize(v, max_items, max_str, depth + 1) for k, v in items[:max_items * 4]}
+        if len(items) > max_items * 4:
+            result["..."] = f"{len(items) - max_items * 4} more keys"
+        return result
+    if isinstance(value, (list, tuple, set)):
+        items = list(value) if not isinstance(value, list) else value
+        if len(items) <= max_items:
+            return [summarize(v, max_items, max_str, depth + 1) for v in items]
+        return {
+            "count": len(items),
+            "sample": [summarize(v, max_items, max_str, depth + 1) for v in items[:max_items]]
+        }
+    if isinstance(value, str) and len(value) > max_str:
+        return value[:max_str] + f"... ({len(value)} chars)"
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)[:max_str]
+
+
+_UNSET = object()
+
+
+class LazyPayload:
+    """Defers summarizing a payload until a record passes level filtering
+
+    The capped summary is taken in the logging thread when the record is
+    queued (see `snapshot`), so a payload mutated after the log call is
+    logged as it was and never read concurrently by the listener thread.
+    """
+
+    def __init__(self, payload: Any, max_items: int = 5, max_chars: int = 4000):
+        self.payload = payload
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self._summary = _UNSET
+
+    def summary(self) -> Any:
+        if self._summary is _UNSET:
+            return summarize(self.payload, self.max_items)
+        return self._summary
+
+    def snapshot(self) -> "LazyPayload":
+        """Copy holding only the summary as of now (bounded work: summaries are capped)"""
+        frozen = LazyPayload(None, self.max_items, self.max_chars)
+        frozen._summary = self.summary()
+        return frozen
+
+    def __str__(self) -> str:
+        text = json.dumps(self.summary(), default=str)
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + "..."
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            entry["payload"] = payload.summary() if isinstance(payload, LazyPayload) else summarize(payload)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Human-readable format with an optional capped payload suffix"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            text += f" | {payload if isinstance(payload, LazyPayload) else LazyPayload(payload)}"
+        return text
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves the expensive formatting to the listener thread
+
+    The stock handler fully formats the record in the caller's thread. Here
+    the caller only merges the message args and snapshots the capped payload
+    summary, so nothing the caller mutates afterwards is read later; the
+    JSON and console rendering happen on the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        payload = getattr(record, "payload", None)
+        if payload is not None:
+            record.payload = (payload if isinstance(payload, LazyPayload) else LazyPayload(payload)).snapshot()
+        return record
+
+
+def _configure(level) -> None:
+    """Install the queue handler and start the listener once per process"""
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            return
+
+        # Console handler
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setLevel(level)
+        console_handler.setFormatter(ConsoleFormatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        ))
+
+        # File handler (structured JSON lines)
+        log_filename = f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+        file_handler = logging.FileHandler(log_filename)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(JsonFormatter())
+
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            log_queue, console_handler, file_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(_listener.stop)
+
+        root = logging.getLogger()
+        root.addHandler(_DeferredQueueHandler(log_queue))
+        root.setLevel(level)
+        for name in NOISY_LOGGERS:
+            logging.getLogger(name).setLevel(logging.WARNING)
+
 
 def setup_logger(name: str = "LangGraphWorkflow", level=logging.INFO):
-    """Setup logging configuration"""
-    
+    """Setup logging configuration
+
+    Safe to call repeatedly: handlers are attached to the root logger only on
+    the first call, and every named logger propagates to them.
+    """
+    _configure(level)
+
     logger = logging.getLogger(name)
     logger.setLevel(level)
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    
-    # File handler
-    log_filename = f"workflow_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-    file_handler = logging.FileHandler(log_filename)
-    file_handler.setLevel(logging.DEBUG)
-    
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_handler.setFormatter(formatter)
-    file_handler.setFormatter(formatter)
-    
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-    
+
     return logger
\ No newline at end of file
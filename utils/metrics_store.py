@@ -0,0 +1,186 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, Iterable, List, Optional
+
+# Segment dimensions tracked per campaign
+DIMENSIONS = ["industry", "role", "persona", "tone", "subject_variant"]
+
+# Rollup resolutions in seconds; hourly points are pruned after a retention window
+RESOLUTIONS = {"hour": 3600, "day": 86400}
+
+COUNTERS = ["sent", "opened", "clicked", "replied", "meeting_booked"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS segment_metrics (
+    resolution TEXT NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    bucket_ts INTEGER NOT NULL,
+    campaign_id TEXT NOT NULL,
+    sent INTEGER NOT NULL,
+    opened INTEGER NOT NULL,
+    clicked INTEGER NOT NULL,
+    replied INTEGER NOT NULL,
+    meeting_booked INTEGER NOT NULL,
+    PRIMARY KEY (resolution, dimension, value, bucket_ts, campaign_id)
+);
+CREATE INDEX IF NOT EXISTS idx_segment_metrics_window
+    ON segment_metrics (resolution, dimension, bucket_ts);
+CREATE TABLE IF NOT EXISTS campaigns (
+    campaign_id TEXT PRIMARY KEY,
+    sent_at REAL NOT NULL
+);
+"""
+
+
+def wilson_lower_bound(successes: int, trials: int, z: float = 1.96) -> float:
+    """Conservative rate estimate, so small samples don't win on luck"""
+    if trials == 0:
+        return 0.0
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    centre = p + z * z / (2 * trials)
+    margin = z * math.sqrt((p * (1 - p) + z * z / (4 * trials)) / trials)
+    return (centre - margin) / denominator
+
+
+def _with_rates(row: Dict[str, Any]) -> Dict[str, Any]:
+    sent = row["sent"] or 0
+    for counter, rate in (("opened", "open_rate"), ("clicked", "click_rate"),
+                          ("replied", "reply_rate"), ("meeting_booked", "meeting_rate")):
+        row[rate] = row[counter] / sent if sent else 0
+    row["reply_rate_lower"] = wilson_lower_bound(row["replied"], sent)
+    return row
+
+
+class MetricsStore:
+    """Cross-campaign, per-segment engagement time series
+
+    Each campaign contributes one row per (segment value, resolution) in the
+    bucket of its first send. That time is stored on the first recording and
+    reused, and rows are replaced, not incremented, so recording a campaign
+    again as its engagement grows (or later sends arrive) is idempotent.
+    Hourly and daily rollups are written together; window and trend queries
+    read only the pre-aggregated buckets through an index, never the raw
+    events.
+    """
+
+    def __init__(self, path: str = None, hourly_retention_days: int = 14):
+        self.path = path or os.getenv("METRICS_STORE_PATH", "data/metrics.db")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.hourly_retention_days = hourly_retention_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def record_campaign(self, campaign_id: str, responses: Iterable[Dict[str, Any]],
+                        sent_at: float = None) -> int:
+        """Aggregate a campaign's per-recipient responses by segment and store them"""
+        totals: Dict[tuple, List[int]] = {}
+        first_sent = sent_at
+
+        for response in responses:
+            segments = response.get("segments") or {}
+            flags = [1, int(bool(response.get("opened"))), int(bool(response.get("clicked"))),
+                     int(bool(response.get("replied"))), int(bool(response.get("meeting_booked")))]
+            if sent_at is None and response.get("sent_at") and (first_sent is None or response["sent_at"] < first_sent):
+                first_sent = response["sent_at"]
+            # "campaign" = "all" gives every campaign an overall series too
+            for dimension, value in [("campaign", "all")] + [(d, segments.get(d)) for d in DIMENSIONS]:
+                if value in (None, ""):
+                    continue
+                counts = totals.setdefault((dimension, str(value)), [0] * len(COUNTERS))
+                for i, flag in enumerate(flags):
+                    counts[i] += flag
+
+        with self._lock, self._conn:
+            # The first recording fixes the campaign's bucket for good
+            self._conn.execute(
+                "INSERT OR IGNORE INTO campaigns VALUES (?, ?)", (campaign_id, first_sent or time.time())
+            )
+            timestamp = self._conn.execute(
+                "SELECT sent_at FROM campaigns WHERE campaign_id = ?", (campaign_id,)
+            ).fetchone()[0]
+            rows = [
+                (resolution, dimension, value, int(timestamp // size * size), campaign_id, *counts)
+                for (dimension, value), counts in totals.items()
+                for resolution, size in RESOLUTIONS.items()
+            ]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO segment_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+        return len(rows)
+
+    def window(self, dimension: str, days: float = 30, now: float = None, min_sent: int = 0) -> List[Dict[str, Any]]:
+        """Totals and rates per segment value over a rolling window"""
+        now = time.time() if now is None else now
+        since = now - days * 86400
+        resolution = "hour" if days <= 2 else "day"
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT value, COUNT(DISTINCT campaign_id), SUM(sent), SUM(opened), SUM(clicked), "
+                "SUM(replied), SUM(meeting_booked) FROM segment_metrics "
+                "WHERE resolution = ? AND dimension = ? AND bucket_ts >= ? AND bucket_ts <= ? "
+                "GROUP BY value HAVING SUM(sent) >= ?",
+                (resolution, dimension, int(since // RESOLUTIONS[resolution] * RESOLUTIONS[resolution]),
+                 now, min_sent)
+            ).fetchall()
+
+        results = [
+            _with_rates(dict(zip(["value", "campaigns"] + COUNTERS, row)))
+            for row in rows
+        ]
+        return sorted(results, key=lambda r: r["reply_rate_lower"], reverse=True)
+
+    def trend(self, dimension: str, value: str = "all", resolution: str = "day",
+              days: float = 90, now: float = None) -> List[Dict[str, Any]]:
+        """Time series of one segment value"""
+        if dimension == "campaign":
+            value = "all"
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT bucket_ts, SUM(sent), SUM(opened), SUM(clicked), SUM(replied), SUM(meeting_booked) "
+                "FROM segment_metrics WHERE resolution = ? AND dimension = ? AND value = ? AND bucket_ts >= ? "
+                "GROUP BY bucket_ts ORDER BY bucket_ts",
+                (resolution, dimension, value, now - days * 86400)
+            ).fetchall()
+        return [_with_rates(dict(zip(["bucket_ts"] + COUNTERS, row))) for row in rows]
+
+    def best_segment(self, dimension: str, days: float = 30, min_sent: int = 100,
+                     now: float = None) -> Optional[Dict[str, Any]]:
+        """Segment value whose conservative reply rate beats the runner-up's point estimate"""
+        candidates = self.window(dimension, days=days, now=now, min_sent=min_sent)
+        if len(candidates) > 1 and candidates[0]["reply_rate_lower"] > candidates[1]["reply_rate"]:
+            return candidates[0]
+        return None
+
+    def compact(self, now: float = None) -> int:
+        """Drop hourly points older than the retention window (daily rollups stay)"""
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM segment_metrics WHERE resolution = 'hour' AND bucket_ts < ?",
+                (now - self.hourly_retention_days * 86400,)
+            )
+        return cursor.rowcount
+
+
+_stores: Dict[str, MetricsStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_metrics_store(path: str = None) -> MetricsStore:
+    """Shared MetricsStore per database path"""
+    path = path or os.getenv("METRICS_STORE_PATH", "data/metrics.db")
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = MetricsStore(path)
+        return _stores[path]
\ No newline at end of file
@@ -0,0 +1,301 @@
+import math
+import os
+import statistics
+from typing import Dict, Any, List, Optional
+from .latency import get_latency_tracker
+from .result_sink import iter_records, list_runs, load_manifest
+from .search_state import get_search_state, icp_key
+
+# Per-call defaults used until past runs say otherwise; override per provider
+# with "config": {"providers": {"apollo": {"rate_per_min": 100}}} in workflow.json
+PROVIDERS = {
+    "apollo": {"env": "APOLLO_API_KEY", "latency_ms": 900, "rate_per_min": 50},
+    "clearbit": {"env": "CLEARBIT_KEY", "latency_ms": 350, "rate_per_min": 600},
+    "openai": {"env": "OPENAI_API_KEY", "latency_ms": 2500, "rate_per_min": 500, "tokens_per_min": 200000},
+    "email": {"env": "APOLLO_API_KEY", "latency_ms": 300, "rate_per_min": 100}
+}
+
+# Rough prompt + completion sizes of the built-in LLM calls
+TOKENS_PER_CALL = {
+    "AccountResearchAgent": 120 + 60,
+    "OutreachContentAgent": 260 + 160,
+    "FeedbackTrainerAgent": 250 + 200
+}
+
+# Local work per record when there is no history (parsing, scoring, SQLite)
+LOCAL_MS_PER_ITEM = 0.05
+
+MAX_OUTREACH_LEADS = 5
+
+
+def _step_estimate(step: Dict[str, Any], items_in: int, live: Dict[str, bool],
+                   history: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
+    """Items out, provider calls and tokens for one built-in step
+
+    `context` carries facts from earlier steps (e.g. the share of leads
+    without an email) to the steps they affect.
+    """
+    agent = step.get("agent")
+    inputs = step.get("inputs", {})
+    calls: Dict[str, float] = {}
+    notes: List[str] = []
+    tokens = 0
+
+    if agent == "ProspectSearchAgent":
+        if live["apollo"]:
+            items, calls["apollo"] = 10, 1  # one search page of 10
+        else:
+            mock = inputs.get("mock") or {}
+            items = mock.get("count", 5)
+            context["missing_email_rate"] = mock.get("missing_email_rate", 0.1)
+            notes.append("mock leads (no APOLLO_API_KEY)")
+        delta = inputs.get("delta") or {}
+        if delta.get("enabled") and not delta.get("full_refresh"):
+            state = get_search_state(delta.get("state_path")).get(icp_key(inputs.get("icp", {}), inputs.get("signals", [])))
+            if state:
+                ratio = history.get("delta_ratio", 1.0)
+                notes.append(f"delta search, {ratio:.0%} of results new/changed last time")
+                items = math.ceil(items * ratio)
+    elif agent == "DataEnrichmentAgent":
+        items = items_in
+        missing = context.get("missing_email_rate", history.get("missing_email_rate", 0.0))
+        if live["clearbit"]:
+            # One call per contact: combined (person + company) for accounts not
+            # cached yet, a person lookup for contacts of cached accounts
+            contacts = round(items_in * (1 - missing))
+            hit_ratio = history.get("company_cache_hit_ratio", 0.0)
+            combined = min(contacts, round(contacts * history.get("accounts_per_lead", 1.0) * (1 - hit_ratio)))
+            calls["clearbit"] = contacts
+            notes.append(f"{combined} combined lookups for uncached accounts "
+                         f"({hit_ratio:.0%} company cache hits last run)")
+            if inputs.get("hedge"):
+                notes.append("slow lookups hedged (up to 10% extra calls)")
+        else:
+            notes.append("no CLEARBIT_KEY, local pass-through")
+        if missing:
+            notes.append(f"{missing:.0%} of leads without email skip lookup")
+    elif agent == "ScoringAgent":
+        items = items_in
+    elif agent == "AccountResearchAgent":
+        # Passes leads through; at most one call per account, fewer when contacts share one
+        items = items_in
+        leads = min(items_in, inputs.get("max_leads") or items_in)
+        hit_ratio = history.get("research_cache_hit_ratio", 0.0)
+        accounts = round(leads * history.get("accounts_per_lead", 1.0) * (1 - hit_ratio))
+        if live["openai"]:
+            calls["openai"] = accounts
+            tokens = accounts * TOKENS_PER_CALL[agent]
+            notes.append(f"one call per uncached account, cached {inputs.get('ttl_hours', 168)}h "
+                         f"({hit_ratio:.0%} hits last run)")
+        else:
+            notes.append("no OPENAI_API_KEY, basic research")
+    elif agent == "OutreachContentAgent":
+        items = min(items_in, MAX_OUTREACH_LEADS)
+        if live["openai"]:
+            calls["openai"] = items
+            tokens = items * TOKENS_PER_CALL[agent]
+            streaming = inputs.get("streaming") or {}
+            if streaming.get("enabled"):
+                notes.append(f"streamed, off-format output cut early (up to {streaming.get('retries', 1)} retries per lead)")
+        else:
+            notes.append("no OPENAI_API_KEY, fallback copy")
+    elif agent == "OutreachExecutorAgent":
+        items = items_in
+        if live["email"]:
+            calls["email"] = items
+        else:
+            notes.append("sends simulated")
+        schedule = inputs.get("schedule") or {}
+        if schedule.get("enabled"):
+            notes.append(f"sent in recipients' business hours, {len(schedule.get('follow_ups', []))} follow-ups later")
+    elif agent == "ResponseTrackerAgent":
+        items = items_in
+        if inputs.get("mode") == "poll" and inputs.get("poll_endpoint"):
+            calls["apollo"] = 1
+    elif agent == "FeedbackTrainerAgent":
+        items = 3
+        if live["openai"]:
+            calls["openai"] = 1
+            tokens = TOKENS_PER_CALL[agent]
+        notes.append("Sheets export runs in the background")
+    else:
+        items = items_in
+        notes.append("custom agent, no cost model")
+
+    return {"items": items, "calls": calls, "tokens": tokens, "notes": notes}
+
+
+def load_history(results_dir: str = "runs", max_runs: int = 10) -> Dict[str, Any]:
+    """Per-step throughput and pass-through ratios observed in recent runs"""
+    ms_per_item: Dict[str, List[float]] = {}
+    delta_ratios = []
+    account_cache = company_cache = None
+    runs = list_runs(results_dir)[:max_runs]
+
+    for run_id in runs:
+        try:
+            manifest = load_manifest(os.path.join(results_dir, run_id))
+        except (OSError, ValueError):
+            continue
+        for step_id, entry in manifest.get("steps", {}).items():
+            counts = [info.get("count", 0) for info in entry.get("records", {}).values()]
+            if entry.get("duration_ms") is not None:
+                ms_per_item.setdefault(step_id, []).append(entry["duration_ms"] / max(1, max(counts or [0])))
+            delta = entry.get("values", {}).get("delta")
+            if isinstance(delta, dict) and delta.get("searched"):
+                delta_ratios.append((delta.get("new", 0) + delta.get("changed", 0)) / delta["searched"])
+            # AccountResearchAgent's cache counts, from the latest run that has them
+            cache = entry.get("values", {}).get("cache")
+            if account_cache is None and isinstance(cache, dict) and cache.get("leads") and cache.get("accounts"):
+                account_cache = cache
+            # DataEnrichmentAgent's Clearbit company cache counts, likewise
+            lookups = entry.get("values", {}).get("company_cache")
+            if company_cache is None and isinstance(lookups, dict) and lookups.get("lookups"):
+                company_cache = lookups
+
+    # Share of leads without an email in the latest run (they skip lookups)
+    missing_email_rate = 0.0
+    if runs:
+        total = missing = 0
+        for lead in iter_records(os.path.join(results_dir, runs[0]), "prospect_search", "leads"):
+            total += 1
+            missing += not lead.get("email")
+        missing_email_rate = missing / total if total else 0.0
+
+    history = {
+        "runs": len(runs),
+        "ms_per_item": {step: statistics.median(values) for step, values in ms_per_item.items()},
+        "delta_ratio": statistics.median(delta_ratios) if delta_ratios else 1.0,
+        "missing_email_rate": missing_email_rate
+    }
+    if account_cache:
+        # Contacts share accounts, and accounts researched recently are served from the cache
+        history["accounts_per_lead"] = account_cache["accounts"] / account_cache["leads"]
+        history["research_cache_hit_ratio"] = account_cache.get("hits", 0) / account_cache["accounts"]
+    if company_cache:
+        # Enrichment's company records have their own TTL, so their hit rate is tracked separately
+        history["company_cache_hit_ratio"] = company_cache.get("hits", 0) / company_cache["lookups"]
+    return history
+
+
+def observed_latency_ms(tracker=None) -> Dict[str, float]:
+    """Median call latency per provider from a LatencyTracker's endpoints ("clearbit.person" -> "clearbit")
+
+    Only endpoints with enough samples for adaptive timeouts count; a
+    provider with several endpoints gets the mean of their medians.
+    """
+    tracker = tracker or get_latency_tracker()
+    medians: Dict[str, List[float]] = {}
+    for endpoint, entry in tracker.stats().items():
+        if entry["samples"] >= tracker.min_samples and "p50_ms" in entry:
+            medians.setdefault(endpoint.split(".")[0], []).append(entry["p50_ms"])
+    return {provider: statistics.mean(values) for provider, values in medians.items()}
+
+
+def plan(config: Dict[str, Any], results_dir: str = "runs", history: Optional[Dict[str, Any]] = None,
+         latency_tracker=None) -> Dict[str, Any]:
+    """Estimate calls, tokens and wall time per step without running anything
+
+    Steps run one after another, so every step is on the critical path and
+    the run takes the sum of step times. A step's time is the larger of its
+    latency-bound time (observed ms per record from past runs, else provider
+    latency per call) and its rate-limit-bound time. Provider latencies come
+    from the process's LatencyTracker (or `latency_tracker`) once it has
+    seen enough calls, e.g. in a warm service, else from PROVIDERS.
+    """
+    history = history if history is not None else load_history(results_dir)
+    providers = {name: dict(profile) for name, profile in PROVIDERS.items()}
+    for name, latency_ms in observed_latency_ms(latency_tracker).items():
+        providers.setdefault(name, {})["latency_ms"] = latency_ms
+    for name, overrides in config.get("config", {}).get("providers", {}).items():
+        providers.setdefault(name, {}).update(overrides)
+    live = {name: bool(os.getenv(profile.get("env", ""), "")) for name, profile in providers.items()}
+
+    steps, warnings = [], []
+    totals_calls: Dict[str, float] = {}
+    total_tokens = 0
+    total_ms = 0.0
+    items = 0
+    context: Dict[str, Any] = {}
+
+    for step in config.get("steps", []):
+        estimate = _step_estimate(step, items, live, history, context)
+        items = estimate["items"]
+        scheduling = step.get("inputs", {}).get("scheduling") or {}
+        if scheduling.get("budget") is not None and items > scheduling["budget"]:
+            scale = scheduling["budget"] / items
+            estimate["calls"] = {p: n * scale for p, n in estimate["calls"].items()}
+            estimate["tokens"] = round(estimate["tokens"] * scale)
+            estimate["notes"].append(f"budget defers {items - scheduling['budget']} lowest-priority items")
+            items = scheduling["budget"]
+
+        latency_ms = sum(providers[p]["latency_ms"] * n for p, n in estimate["calls"].items()) + items * LOCAL_MS_PER_ITEM
+        source = "defaults"
+        observed = history.get("ms_per_item", {}).get(step["id"])
+        if observed is not None:
+            # Observed step time per record already reflects the workers it ran with
+            latency_ms, source = observed * max(1, items), "history"
+        else:
+            # Queue workers ("work_queue": {"workers": n} as a sizing hint) or scheduler threads split per-lead work
+            workers = (step.get("inputs", {}).get("work_queue") or {}).get("workers") or scheduling.get("max_workers", 1)
+            latency_ms /= max(1, workers)
+
+        rate_ms = 0.0
+        for provider, n in estimate["calls"].items():
+            limit = providers[provider].get("rate_per_min")
+            if not limit or not n:
+                continue
+            rate_ms = max(rate_ms, n / limit * 60000)
+            if n > limit and latency_ms < n / limit * 60000:
+                warnings.append(
+                    f"{step['id']}: {n:.0f} {provider} calls exceed {limit}/min; "
+                    f"throttling stretches this step to at least {n / limit:.1f} min"
+                )
+        tpm = providers.get("openai", {}).get("tokens_per_min")
+        if estimate["tokens"] and tpm and estimate["tokens"] > tpm:
+            warnings.append(f"{step['id']}: ~{estimate['tokens']} tokens exceed the {tpm} tokens/min limit")
+
+        step_ms = max(latency_ms, rate_ms)
+        total_ms += step_ms
+        total_tokens += estimate["tokens"]
+        for provider, n in estimate["calls"].items():
+            totals_calls[provider] = totals_calls.get(provider, 0) + n
+
+        steps.append({
+            "step": step["id"],
+            "agent": step.get("agent"),
+            "items": items,
+            "calls": estimate["calls"],
+            "tokens": estimate["tokens"],
+            "est_ms": round(step_ms, 1),
+            "bound": "rate limit" if rate_ms > latency_ms else "latency",
+            "source": source,
+            "notes": estimate["notes"]
+        })
+
+    # Declared run budgets (see utils.budget) that this plan would run into
+    budgets = config.get("budgets") or {}
+    for provider, limits in budgets.get("providers", {}).items():
+        tokens = total_tokens if provider == "openai" else 0
+        for metric, estimate in (("calls", totals_calls.get(provider, 0)), ("tokens", tokens)):
+            limit = limits.get(f"max_{metric}")
+            if limit and estimate >= limit * budgets.get("degrade_at", 0.8):
+                warnings.append(
+                    f"budget: ~{estimate:.0f} {provider} {metric} against a limit of {limit}; "
+                    "later items will take degraded paths"
+                )
+    if budgets.get("max_wall_seconds") and total_ms / 1000 > budgets["max_wall_seconds"]:
+        warnings.append(
+            f"budget: ~{total_ms / 1000:.0f}s exceeds max_wall_seconds={budgets['max_wall_seconds']}; "
+            "late steps will be cut short"
+        )
+
+    bottleneck = max(steps, key=lambda s: s["est_ms"])["step"] if steps else None
+    return {
+        "steps": steps,
+        "critical_path": [s["step"] for s in steps],
+        "bottleneck": bottleneck,
+        "totals": {"calls": totals_calls, "tokens": total_tokens, "est_seconds": round(total_ms / 1000, 1)},
+        "history_runs": history.get("runs", 0),
+        "warnings": warnings
+    }
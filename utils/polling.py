@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional
+from .event_store import EventStore, connect
+from .webhooks import normalize_event
+
+logger = logging.getLogger("CampaignPoller")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS poll_cursors (
+    campaign_id TEXT PRIMARY KEY,
+    last_event_id TEXT,
+    last_event_at REAL,
+    etag TEXT,
+    interval REAL NOT NULL,
+    next_poll_at REAL NOT NULL,
+    last_send_at REAL,
+    last_polled_at REAL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_poll_cursors_due ON poll_cursors (active, next_poll_at);
+"""
+
+
+class PollResult:
+    """Events fetched since a cursor plus the provider's new cursor"""
+
+    def __init__(self, events: List[Dict[str, Any]] = None, etag: str = None, not_modified: bool = False):
+        self.events = events or []
+        self.etag = etag
+        self.not_modified = not_modified
+
+
+class HttpEventSource:
+    """Fetches campaign events newer than a cursor from a REST endpoint
+
+    Sends `since`/`after_id` query parameters and `If-None-Match`, treats 304
+    as "nothing new" and follows `next_cursor` pagination, so each poll costs
+    only as much as the new activity.
+    """
+
+    def __init__(self, endpoint: str, api_key: str = None, timeout: float = 10, max_pages: int = 20):
+        self.endpoint = endpoint
+        self.api_key = api_key or os.getenv("APOLLO_API_KEY", "")
+        self.timeout = timeout
+        self.max_pages = max_pages
+
+    def fetch(self, campaign_id: str, cursor: Dict[str, Any]) -> PollResult:
+        from .api_clients import get_session
+
+        headers = {"X-Api-Key": self.api_key, "Cache-Control": "no-cache"}
+        if cursor.get("etag"):
+            headers["If-None-Match"] = cursor["etag"]
+        params = {"campaign_id": campaign_id}
+        if cursor.get("last_event_at"):
+            params["since"] = cursor["last_event_at"]
+        if cursor.get("last_event_id"):
+            params["after_id"] = cursor["last_event_id"]
+
+        events, etag = [], cursor.get("etag")
+        for _ in range(self.max_pages):
+            response = get_session().get(self.endpoint, headers=headers, params=params, timeout=self.timeout)
+            if response.status_code == 304:
+                return PollResult(etag=etag, not_modified=True)
+            response.raise_for_status()
+
+            etag = response.headers.get("ETag", etag)
+            data = response.json()
+            events.extend(data.get("events", []))
+            if not data.get("next_cursor"):
+                break
+            params["cursor"] = data["next_cursor"]
+            headers.pop("If-None-Match", None)
+
+        return PollResult(events=events, etag=etag)
+
+
+class CampaignPoller:
+    """Incremental, adaptive polling of campaign engagement for providers without webhooks
+
+    Each campaign keeps a cursor (last event id/timestamp + ETag). The poll
+    interval starts at `min_interval` after a send, shrinks again whenever a
+    poll finds new events and backs off by `backoff` on empty polls, up to
+    `max_interval`. New events go through EventStore.ingest, so aggregates
+    stay incremental and idempotent.
+    """
+
+    def __init__(self, store: EventStore, source, min_interval: float = 60, max_interval: float = 6 * 3600,
+                 backoff: float = 2.0, path: str = None):
+        self.store = store
+        self.source = source
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        # Cursors live next to the events by default: same file, same connection settings
+        self._conn = connect(path or store.path)
+        self._conn.executescript(SCHEMA)
+
+    def register_send(self, campaign_id: str, sent_at: float = None):
+        """Start (or tighten) polling right after a send"""
+        sent_at = time.time() if sent_at is None else sent_at
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO poll_cursors (campaign_id, interval, next_poll_at, last_send_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(campaign_id) DO UPDATE SET interval = excluded.interval, "
+                "next_poll_at = MIN(next_poll_at, excluded.next_poll_at), "
+                "last_send_at = excluded.last_send_at, active = 1",
+                (campaign_id, self.min_interval, sent_at + self.min_interval, sent_at)
+            )
+
+    def get_cursor(self, campaign_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT campaign_id, last_event_id, last_event_at, etag, interval, next_poll_at, "
+                "last_send_at, last_polled_at, active FROM poll_cursors WHERE campaign_id = ?",
+                (campaign_id,)
+            ).fetchone()
+        if not row:
+            return None
+        keys = ["campaign_id", "last_event_id", "last_event_at", "etag", "interval", "next_poll_at",
+                "last_send_at", "last_polled_at", "active"]
+        return dict(zip(keys, row))
+
+    def poll(self, campaign_id: str, now: float = None) -> int:
+        """Fetch and ingest new events for one campaign; returns new event count"""
+        now = time.time() if now is None else now
+        cursor = self.get_cursor(campaign_id)
+        if cursor is None:
+            self.register_send(campaign_id, now)
+            cursor = self.get_cursor(campaign_id)
+
+        try:
+            result = self.source.fetch(campaign_id, cursor)
+        except Exception as e:
+            logger.warning(f"Poll failed for campaign {campaign_id}: {str(e)}")
+            self._reschedule(cursor, now, found=0, etag=cursor["etag"])
+            return 0
+
+        accepted = 0
+        last_event_id, last_event_at = cursor["last_event_id"], cursor["last_event_at"]
+        for raw in result.events:
+            event = normalize_event(raw)
+            event["campaign_id"] = event["campaign_id"] or campaign_id
+            if self.store.ingest(event):
+                accepted += 1
+            if event["occurred_at"] and event["occurred_at"] >= (last_event_at or 0):
+                last_event_at = event["occurred_at"]
+                last_event_id = str(event["event_id"] or last_event_id)
+
+        self._reschedule(cursor, now, found=accepted, etag=result.etag,
+                         last_event_id=last_event_id, last_event_at=last_event_at)
+        return accepted
+
+    def poll_due(self, now: float = None) -> Dict[str, int]:
+        """Poll every campaign whose next poll time has passed"""
+        now = time.time() if now is None else now
+        with self._lock:
+            due = [row[0] for row in self._conn.execute(
+                "SELECT campaign_id FROM poll_cursors WHERE active = 1 AND next_poll_at <= ? ORDER BY next_poll_at",
+                (now,)
+            )]
+        return {campaign_id: self.poll(campaign_id, now) for campaign_id in due}
+
+    def next_due_in(self, now: float = None) -> Optional[float]:
+        """Seconds until the next scheduled poll, or None if nothing is active"""
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_poll_at) FROM poll_cursors WHERE active = 1").fetchone()
+        return None if row[0] is None else max(0.0, row[0] - now)
+
+    def run_forever(self, stop_event: threading.Event, idle_sleep: float = 30):
+        """Poll due campaigns until stop_event is set"""
+        while not stop_event.is_set():
+            self.poll_due()
+            wait = self.next_due_in()
+            stop_event.wait(idle_sleep if wait is None else min(wait, idle_sleep))
+
+    def _reschedule(self, cursor: Dict[str, Any], now: float, found: int, etag: str,
+                    last_event_id: str = None, last_event_at: float = None):
+        """Tighten the interval on activity, back off when quiet"""
+        if found:
+            interval = max(self.min_interval, cursor["interval"] / self.backoff)
+        else:
+            interval = min(self.max_interval, cursor["interval"] * self.backoff)
+        # Campaigns quiet at the max interval for a week stop being polled
+        quiet_since = cursor["last_event_at"] or cursor["last_send_at"] or now
+        active = 0 if not found and interval >= self.max_interval and now - quiet_since > 7 * 86400 else 1
+
+        with self._lock:
+            self._conn.execute(
+                "UPDATE poll_cursors SET last_event_id = ?, last_event_at = ?, etag = ?, interval = ?, "
+                "next_poll_at = ?, last_polled_at = ?, active = ? WHERE campaign_id = ?",
+                (last_event_id or cursor["last_event_id"], last_event_at or cursor["last_event_at"],
+                 etag, interval, now + interval, now, active, cursor["campaign_id"])
+            )
+
+
+_pollers: Dict[tuple, CampaignPoller] = {}
+_pollers_lock = threading.Lock()
+
+
+def get_campaign_poller(store: EventStore, endpoint: str) -> CampaignPoller:
+    """Shared CampaignPoller per event store and provider endpoint"""
+    key = (store.path, endpoint)
+    with _pollers_lock:
+        if key not in _pollers:
+            _pollers[key] = CampaignPoller(store, HttpEventSource(endpoint))
+        return _pollers[key]
@@ -0,0 +1,219 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from html import escape
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger("Profiler")
+
+# Leaf frames that mean "blocked waiting on another thread", not work
+IDLE_FRAMES = {("threading.py", "wait"), ("threading.py", "join"), ("threading.py", "_wait_for_tstate_lock"),
+               ("threading.py", "acquire")}
+
+
+class SamplingProfiler:
+    """Low-overhead wall-clock sampler, scoped to one workflow node at a time
+
+    While a node runs, a background thread snapshots the stacks of the node's
+    thread and of every thread started during the node (scheduler workers)
+    every `interval` seconds. Nothing is traced, so the profiled code runs
+    at full speed; the cost is one stack walk per sampled thread per tick.
+    Samples whose leaf is a thread wait (a join on worker threads, a
+    condition wait) are counted as idle and left out of the stacks. Time in
+    a long C call (e.g. sum() over a big range) lands on the Python frame
+    that made it, since the sampler only runs between bytecodes.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Dict[str, Counter] = {}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self._labels: Dict[Any, Tuple[str, bool]] = {}
+
+    def node(self, name: str) -> "_NodeScope":
+        """Context manager sampling the enclosed block as node `name`"""
+        return _NodeScope(self, name)
+
+    def _label(self, code) -> Tuple[str, bool]:
+        label = self._labels.get(code)
+        if label is None:
+            filename = os.path.basename(code.co_filename)
+            label = (f"{code.co_name} ({filename}:{code.co_firstlineno})", filename == "threading.py")
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame, stop_frame=None) -> Tuple[List[str], bool]:
+        """Root-first labels of a thread's stack, and whether it is idle"""
+        leaf = frame.f_code
+        idle = (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_FRAMES
+        labels = []
+        while frame is not None and frame is not stop_frame and len(labels) < self.max_depth:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.reverse()
+        # Worker threads start in threading's bootstrap frames; drop them
+        start = 0
+        while start < len(labels) - 1 and labels[start][1]:
+            start += 1
+        return [label for label, _ in labels[start:]], idle
+
+    def _sample(self, scope: "_NodeScope"):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = self.stacks.setdefault(scope.name, Counter())
+        stats = self.nodes[scope.name]
+        while not scope.stop.wait(self.interval):
+            started = time.perf_counter()
+            for ident, frame in sys._current_frames().items():
+                if ident == own or (ident != scope.thread_id and ident in scope.existing):
+                    continue
+                if ident == scope.thread_id:
+                    labels, idle = self._stack(frame, scope.caller)
+                    root = f"[{scope.name}]"
+                else:
+                    labels, idle = self._stack(frame)
+                    if ident not in names:
+                        names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    root = "[" + re.sub(r"[-_]?\d+$", "", names.get(ident, "thread")) + "]"
+                if idle:
+                    stats["idle_samples"] += 1
+                    continue
+                stacks[";".join([root] + labels)] += 1
+                stats["samples"] += 1
+            stats["ticks"] += 1
+            stats["sampling_s"] += time.perf_counter() - started
+
+    def summary(self, top: int = 15) -> Dict[str, Any]:
+        """Top self-time functions per node and overall"""
+        overall = Counter()
+        nodes = {}
+        total_s = sampling_s = 0.0
+        for name, stats in self.nodes.items():
+            self_counts = Counter()
+            for stack, count in self.stacks.get(name, {}).items():
+                self_counts[stack.rsplit(";", 1)[-1]] += count
+            overall.update(self_counts)
+            ms_per_sample = stats["duration_s"] * 1000 / max(1, stats["ticks"])
+            nodes[name] = {
+                "duration_ms": round(stats["duration_s"] * 1000, 1),
+                "samples": stats["samples"],
+                "idle_samples": stats["idle_samples"],
+                "top_self": [
+                    {"function": function, "samples": count, "pct": round(100 * count / max(1, stats["samples"]), 1),
+                     "est_ms": round(count * ms_per_sample, 1)}
+                    for function, count in self_counts.most_common(top)
+                ]
+            }
+            total_s += stats["duration_s"]
+            sampling_s += stats["sampling_s"]
+        total_samples = sum(overall.values())
+        return {
+            "interval_ms": self.interval * 1000,
+            # Time the sampler held the GIL, relative to profiled wall time
+            "overhead_pct": round(100 * sampling_s / total_s, 2) if total_s else 0.0,
+            "nodes": nodes,
+            "top_self": [
+                {"function": function, "samples": count, "pct": round(100 * count / max(1, total_samples), 1)}
+                for function, count in overall.most_common(top)
+            ]
+        }
+
+    def write(self, out_dir: str, top: int = 15) -> Dict[str, Any]:
+        """Write <node>.collapsed, <node>.svg and summary.json; returns the summary"""
+        os.makedirs(out_dir, exist_ok=True)
+        summary = self.summary(top)
+        for name, stacks in self.stacks.items():
+            base = os.path.join(out_dir, re.sub(r"[^\w.-]+", "_", name))
+            with open(base + ".collapsed", "w", encoding="utf-8") as f:
+                for stack, count in sorted(stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            write_flamegraph(stacks, base + ".svg", title=f"{name} ({sum(stacks.values())} samples)")
+            summary["nodes"][name]["files"] = {"collapsed": base + ".collapsed", "flamegraph": base + ".svg"}
+        with open(os.path.join(out_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+class _NodeScope:
+    def __init__(self, profiler: SamplingProfiler, name: str):
+        self.profiler = profiler
+        self.name = name
+        self.stop = threading.Event()
+
+    def __enter__(self):
+        # Stacks of the node's thread are cut at the caller, so they start at the node
+        self.caller = sys._getframe(1).f_back
+        self.thread_id = threading.get_ident()
+        self.existing = set(sys._current_frames())
+        self.profiler.nodes.setdefault(
+            self.name, {"samples": 0, "idle_samples": 0, "ticks": 0, "duration_s": 0.0, "sampling_s": 0.0}
+        )
+        self.started = time.perf_counter()
+        self.sampler = threading.Thread(target=self.profiler._sample, args=(self,), name="profiler", daemon=True)
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.sampler.join()
+        self.profiler.nodes[self.name]["duration_s"] += time.perf_counter() - self.started
+        return False
+
+
+def write_flamegraph(stacks: Dict[str, int], path: str, title: str = "", width: int = 1200, row: int = 16):
+    """Self-contained SVG flame graph from collapsed stacks (root at the bottom)"""
+    tree = {"children": {}, "value": 0}
+    depth = 0
+    for stack, count in stacks.items():
+        node = tree
+        node["value"] += count
+        frames = stack.split(";")
+        depth = max(depth, len(frames))
+        for frame in frames:
+            node = node["children"].setdefault(frame, {"children": {}, "value": 0})
+            node["value"] += count
+
+    total = max(1, tree["value"])
+    height = (depth + 2) * row
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+        f'<text x="4" y="12">{escape(title)}</text>'
+    ]
+
+    def draw(node: Dict[str, Any], x: float, level: int):
+        for name, child in sorted(node["children"].items()):
+            w = child["value"] / total * width
+            if w >= 0.5:
+                y = height - (level + 1) * row
+                hue = zlib.crc32(name.encode("utf-8")) % 60
+                chars = int(w / 7)
+                label = escape(name if len(name) <= chars else name[:max(0, chars - 2)] + "..") if chars > 2 else ""
+                parts.append(
+                    f'<g><title>{escape(name)} ({child["value"]} samples, {100 * child["value"] / total:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},80%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{y + row - 4}">{label}</text></g>'
+                )
+                draw(child, x, level + 1)
+            x += w
+
+    draw(tree, 0.0, 0)
+    parts.append("</svg>")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def log_summary(summary: Dict[str, Any], top: int = 5, log: Optional[logging.Logger] = None):
+    """Log each node's top self-time functions"""
+    log = log or logger
+    log.info(f"Profile: {summary['interval_ms']:.0f} ms interval, {summary['overhead_pct']}% sampler overhead")
+    for name, node in summary["nodes"].items():
+        log.info(f"[{name}] {node['duration_ms']} ms, {node['samples']} samples ({node['idle_samples']} idle)")
+        for entry in node["top_self"][:top]:
+            log.info(f"    {entry['pct']:5.1f}%  ~{entry['est_ms']} ms  {entry['function']}")
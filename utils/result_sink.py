@@ -0,0 +1,240 @@
+import gzip
+import heapq
+import importlib.util
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from .run_context import new_run_id
+
+# Parquet output is optional; pyarrow is only imported when actually used
+PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+MANIFEST_NAME = "manifest.json"
+
+logger = logging.getLogger("ResultSink")
+
+
+def _open_text(path: str, mode: str):
+    """Open a plain or gzip-compressed text file"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class JsonlResultSink:
+    """Streams each step's output to per-run files as the workflow progresses
+
+    List-valued output fields (leads, messages, responses, ...) are written one
+    JSON record per line to `<root>/<run_id>/<step>.<field>.jsonl[.gz]`; scalar
+    fields and record counts go to `manifest.json`, which is rewritten after
+    every step so readers can follow a run while it is still going.
+    """
+
+    def __init__(self, root: str = "runs", run_id: str = None, compress: bool = False,
+                 parquet: bool = False, batch_size: int = 1000):
+        self.run_id = run_id or new_run_id()
+        self.run_dir = os.path.join(root, self.run_id)
+        self.compress = compress
+        self.batch_size = batch_size
+        self.parquet = parquet and PARQUET_AVAILABLE
+        if parquet and not PARQUET_AVAILABLE:
+            logger.warning("pyarrow not installed, writing JSONL only")
+
+        os.makedirs(self.run_dir, exist_ok=True)
+        self.manifest = {
+            "run_id": self.run_id,
+            "started_at": datetime.now().isoformat(),
+            "finished_at": None,
+            "steps": {},
+            "errors": []
+        }
+        self._write_manifest()
+
+    def write_step(self, step_id: str, output: Dict[str, Any], duration_ms: float = None):
+        """Persist one step's output (and how long the step took, for planning)"""
+        step_entry = {"records": {}, "values": {}, "duration_ms": duration_ms}
+
+        for field, value in (output or {}).items():
+            if isinstance(value, list):
+                step_entry["records"][field] = self._write_records(step_id, field, value)
+            else:
+                step_entry["values"][field] = value
+
+        self.manifest["steps"][step_id] = step_entry
+        self._write_manifest()
+
+    def write_error(self, error: str):
+        """Record a step error in the manifest"""
+        self.manifest["errors"].append(error)
+        self._write_manifest()
+
+    def write_summary(self, key: str, value: Dict[str, Any]):
+        """Attach a run-level summary (e.g. budget usage) to the manifest"""
+        self.manifest[key] = value
+        self._write_manifest()
+
+    def close(self) -> Dict[str, Any]:
+        """Finalize the manifest and return it"""
+        self.manifest["finished_at"] = datetime.now().isoformat()
+        self._write_manifest()
+        return self.manifest
+
+    def summary(self) -> List[str]:
+        """Compact one-line-per-step description of what was written"""
+        lines = []
+        for step_id, entry in self.manifest["steps"].items():
+            parts = [f"{field}={info['count']}" for field, info in entry["records"].items()]
+            parts += [
+                f"{field}={value}" for field, value in entry["values"].items()
+                if isinstance(value, (str, int, float, bool))
+            ]
+            lines.append(f"[{step_id}] " + (", ".join(parts) or "no records"))
+        budget = self.manifest.get("budget")
+        if budget:
+            parts = [f"{provider}={used['calls']} calls/{used['tokens']} tokens" for provider, used in budget["usage"].items()]
+            parts += [f"{d['step']}: {d['action']} x{d['count']} ({d['reason']})" for d in budget["degradations"]]
+            lines.append("[budget] " + (", ".join(parts) or "no usage"))
+        profile = self.manifest.get("profile")
+        if profile and profile["top_self"]:
+            hottest = profile["top_self"][0]
+            lines.append(f"[profile] {len(profile['nodes'])} steps sampled, hottest: {hottest['function']} "
+                         f"({hottest['pct']}%), sampler overhead {profile['overhead_pct']}%")
+        return lines
+
+    def _write_records(self, step_id: str, field: str, records: list) -> Dict[str, Any]:
+        """Stream records line by line, optionally mirrored to Parquet"""
+        filename = f"{step_id}.{field}.jsonl" + (".gz" if self.compress else "")
+        path = os.path.join(self.run_dir, filename)
+
+        with _open_text(path, "w") as f:
+            for record in records:
+                f.write(json.dumps(record, default=str))
+                f.write("\n")
+
+        info = {"file": filename, "count": len(records)}
+        if self.parquet and records:
+            info["parquet"] = self._write_parquet(step_id, field, records)
+        return info
+
+    def _write_parquet(self, step_id: str, field: str, records: list) -> Optional[str]:
+        """Write records to Parquet in batches; returns the file name or None"""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        filename = f"{step_id}.{field}.parquet"
+        path = os.path.join(self.run_dir, filename)
+        writer = None
+
+        try:
+            for start in range(0, len(records), self.batch_size):
+                batch = records[start:start + self.batch_size]
+                if writer is None:
+                    table = pa.Table.from_pylist(batch)
+                    writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+                else:
+                    table = pa.Table.from_pylist(batch, schema=writer.schema)
+                writer.write_table(table)
+            return filename
+        except Exception as e:
+            # Heterogeneous records can't always share one schema; JSONL still has them
+            logger.warning(f"Parquet export skipped for {step_id}.{field}: {str(e)}")
+            return None
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def _write_manifest(self):
+        """Atomically replace the manifest"""
+        path = os.path.join(self.run_dir, MANIFEST_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, default=str)
+        os.replace(tmp_path, path)
+
+
+def list_runs(root: str = "runs") -> List[str]:
+    """Run ids under root, newest first"""
+    if not os.path.isdir(root):
+        return []
+    runs = [
+        name for name in os.listdir(root)
+        if os.path.exists(os.path.join(root, name, MANIFEST_NAME))
+    ]
+    return sorted(runs, reverse=True)
+
+
+def load_manifest(run_dir: str) -> Dict[str, Any]:
+    """Read a run's manifest"""
+    with open(os.path.join(run_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_records(run_dir: str, step_id: str, field: str) -> Iterator[Dict[str, Any]]:
+    """Stream one step field's records without loading the whole file"""
+    manifest = load_manifest(run_dir)
+    info = manifest["steps"].get(step_id, {}).get("records", {}).get(field)
+    if not info:
+        return
+
+    with _open_text(os.path.join(run_dir, info["file"]), "r") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def query_records(run_dir: str, step_id: str, field: str, search: str = "", sort_by: str = None,
+                  descending: bool = False, offset: int = 0, limit: int = 50) -> Tuple[int, List[Dict[str, Any]]]:
+    """Filter, sort and page one field's records in a single streaming pass
+
+    Returns (matching_count, page). Memory is bounded by offset + limit: when
+    sorting, only the best offset + limit records are kept in a heap.
+    """
+    search = search.lower()
+    keep = offset + limit
+    total = 0
+    heap = []
+    page = []
+
+    for index, record in enumerate(iter_records(run_dir, step_id, field)):
+        if search and search not in json.dumps(record, default=str).lower():
+            continue
+        total += 1
+
+        if sort_by:
+            value = record.get(sort_by)
+            # Numbers and strings are ranked apart, so a mixed field never compares across types
+            numeric = isinstance(value, (int, float))
+            key = (value is not None, numeric, value if numeric else str(value))
+            # Index breaks ties so records themselves are never compared
+            item = (key if descending else _Reversed(key), -index, record)
+            if len(heap) < keep:
+                heapq.heappush(heap, item)
+            elif item > heap[0]:
+                heapq.heapreplace(heap, item)
+        elif offset <= total - 1 < keep:
+            page.append(record)
+
+    if sort_by:
+        page = [item[2] for item in sorted(heap, reverse=True)][offset:keep]
+
+    return total, page
+
+
+class _Reversed:
+    """Inverts ordering so one heap serves ascending and descending sorts"""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __gt__(self, other):
+        return self.value < other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
@@ -0,0 +1,63 @@
+import contextvars
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("RunContext")
+
+_current_run = contextvars.ContextVar("current_run", default=None)
+
+
+def new_run_id() -> str:
+    """Sortable, unique run identifier"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+class RunContext:
+    """Per-run state shared by every node of one workflow execution
+
+    Passed to the graph through `config["configurable"]["run_context"]` and
+    activated around each node, so concurrent runs on one compiled graph
+    never share sinks, listeners or counters.
+    """
+
+    def __init__(self, run_id: str = None, result_sink=None,
+                 on_event: Callable[[Dict[str, Any]], None] = None, budget=None, profiler=None):
+        self.run_id = run_id or getattr(result_sink, "run_id", None) or new_run_id()
+        self.result_sink = result_sink
+        self.on_event = on_event
+        # Optional utils.budget.RunBudget shared by all steps of the run
+        self.budget = budget
+        # Optional utils.profiler.SamplingProfiler sampling each node
+        self.profiler = profiler
+        # Id of the step currently executing (steps run one at a time)
+        self.step = None
+
+    def emit(self, event_type: str, **fields):
+        """Send a progress event to the listener, if any"""
+        if not self.on_event:
+            return
+        event = {"type": event_type, "run_id": self.run_id, "ts": time.time(), **fields}
+        try:
+            self.on_event(event)
+        except Exception as e:
+            # A broken listener must never fail the run
+            logger.warning(f"Event listener error: {str(e)}")
+
+
+def current_run() -> Optional[RunContext]:
+    """The RunContext of the node executing in this thread, if any"""
+    return _current_run.get()
+
+
+@contextmanager
+def activate(run_context: Optional[RunContext]):
+    """Make run_context current for the duration of the block"""
+    token = _current_run.set(run_context)
+    try:
+        yield run_context
+    finally:
+        _current_run.reset(token)
\ No newline at end of file
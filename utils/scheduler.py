@@ -0,0 +1,195 @@
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from .budget import current_budget
+from .run_context import current_run
+
+logger = logging.getLogger("Scheduler")
+
+
+class PriorityScheduler:
+    """Runs work items highest-priority first on a small thread pool
+
+    Items can be submitted while others run; a newly submitted high-priority
+    item jumps ahead of everything still queued. With `max_queued`, a full
+    queue preempts its lowest-priority item (or rejects the newcomer if that
+    is the lowest), so limited capacity always goes to the best items. Once
+    `budget` items have been started or `deadline` (epoch seconds) passes,
+    nothing new starts and the remaining queue is reported as deferred.
+    An item whose `work_fn` raises is reported under errors; with
+    `fallback_fn(item, error)` it also gets that function's result, so a
+    failed item is never silently missing from the results.
+
+    Two heaps over the same entries give O(log n) access to both the best
+    item (to run next) and the worst one (to preempt); removed entries are
+    flagged and skipped lazily.
+    """
+
+    def __init__(self, work_fn: Callable[[Any], Any], max_workers: int = 1, max_queued: int = None,
+                 budget: int = None, deadline: float = None, autostart: bool = True,
+                 fallback_fn: Callable[[Any, Exception], Any] = None):
+        self.work_fn = work_fn
+        self.fallback_fn = fallback_fn
+        self.max_workers = max(1, max_workers)
+        self.max_queued = max_queued
+        self.budget = budget
+        self.deadline = deadline
+        self.results: List[Tuple[float, Any, Any]] = []
+        self.errors: List[Tuple[Any, str]] = []
+        self.preempted: List[Any] = []
+        self._best = []
+        self._worst = []
+        self._queued = 0
+        self._started = 0
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        # Workers run in copies of the creating context, so the current run
+        # (and its budget) stays visible to work_fn
+        self._workers = [
+            threading.Thread(target=contextvars.copy_context().run, args=(self._run,), name=f"sched-{i}", daemon=True)
+            for i in range(self.max_workers)
+        ]
+        if autostart:
+            self.start()
+
+    def start(self):
+        """Start the workers (submit a whole batch first to have it ordered as one)"""
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, item: Any, priority: float) -> bool:
+        """Queue an item; returns False if it was rejected by a full queue"""
+        with self._cond:
+            if self.max_queued is not None and self._queued >= self.max_queued:
+                worst = self._peek(self._worst)
+                if worst is None or worst[0] >= priority:
+                    self.preempted.append(item)
+                    return False
+                worst[3] = False
+                self._queued -= 1
+                self.preempted.append(worst[2])
+
+            seq = next(self._seq)
+            entry = [priority, seq, item, True]
+            heapq.heappush(self._best, (-priority, seq, entry))
+            heapq.heappush(self._worst, (priority, -seq, entry))
+            self._queued += 1
+            self._cond.notify()
+            return True
+
+    def join(self) -> Dict[str, Any]:
+        """Wait for started work to finish; returns results best-first plus leftovers"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+        deferred = []
+        while True:
+            entry = self._pop(self._best)
+            if entry is None:
+                break
+            deferred.append(entry[2])
+
+        ranked = sorted(self.results, key=lambda r: (-r[0], r[1]))
+        return {
+            "results": [result for _, _, result in ranked],
+            "deferred": deferred,
+            "preempted": self.preempted,
+            "errors": self.errors
+        }
+
+    def _exhausted(self) -> bool:
+        if self.budget is not None and self._started >= self.budget:
+            return True
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queued or self._closed or self._exhausted())
+                if self._exhausted() or not self._queued:
+                    return
+                entry = self._pop(self._best)
+                self._started += 1
+
+            priority, seq, item, _ = entry
+            try:
+                result = self.work_fn(item)
+            except Exception as e:
+                logger.warning(f"Scheduled item failed: {str(e)}")
+                with self._cond:
+                    self.errors.append((item, str(e)))
+                if self.fallback_fn is None:
+                    continue
+                try:
+                    result = self.fallback_fn(item, e)
+                except Exception as fallback_error:
+                    logger.error(f"Fallback for failed item failed: {str(fallback_error)}")
+                    continue
+            with self._cond:
+                self.results.append((priority, seq, result))
+
+    def _peek(self, heap) -> Optional[list]:
+        while heap and not heap[0][2][3]:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def _pop(self, heap) -> Optional[list]:
+        entry = self._peek(heap)
+        if entry is None:
+            return None
+        heapq.heappop(heap)
+        entry[3] = False
+        self._queued -= 1
+        return entry
+
+
+def run_prioritized(items: List[Any], priority_fn: Callable[[Any], float], work_fn: Callable[[Any], Any],
+                    options: Optional[Dict[str, Any]] = None,
+                    fallback_fn: Callable[[Any, Exception], Any] = None) -> Dict[str, Any]:
+    """Process a stage's items best-first under the step's "scheduling" options
+
+    options: max_workers (default 1), budget (max items to process) and
+    deadline_s (seconds from now). Results come back best-first; items left
+    when the budget or deadline ran out are returned as "deferred". The run's
+    wall-time budget (see utils.budget) caps the deadline as well. Items whose
+    work_fn raised are listed under "errors" and, with `fallback_fn`, their
+    fallback result takes their place among the results.
+    """
+    options = options or {}
+    now = time.time()
+    deadline = now + options["deadline_s"] if options.get("deadline_s") else None
+    run_budget = current_budget()
+    remaining_s = run_budget.remaining_seconds() if run_budget else None
+    if remaining_s is not None and (deadline is None or now + remaining_s < deadline):
+        # A spent wall-time budget leaves the deadline in the past: nothing starts
+        deadline = now + remaining_s
+    scheduler = PriorityScheduler(
+        work_fn,
+        max_workers=options.get("max_workers", 1),
+        budget=options.get("budget"),
+        deadline=deadline,
+        autostart=False,
+        fallback_fn=fallback_fn
+    )
+    for item in items:
+        scheduler.submit(item, priority_fn(item))
+    scheduler.start()
+    outcome = scheduler.join()
+    if outcome["errors"]:
+        logger.warning(f"{len(outcome['errors'])} items failed"
+                       + (" and got their fallback result" if fallback_fn else " and were dropped"))
+    if outcome["deferred"]:
+        logger.info(f"{len(outcome['deferred'])} lower-priority items deferred (budget or deadline reached)")
+        if run_budget and run_budget.remaining_seconds() == 0:
+            run = current_run()
+            run_budget.degrade(run.step if run else None, f"deferred {len(outcome['deferred'])} items",
+                               "run wall time exhausted")
+    return outcome
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS searches (
+    icp_key TEXT PRIMARY KEY,
+    icp TEXT NOT NULL,
+    last_search_at REAL,
+    last_full_at REAL
+);
+CREATE TABLE IF NOT EXISTS seen_prospects (
+    icp_key TEXT NOT NULL,
+    prospect_id TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL,
+    PRIMARY KEY (icp_key, prospect_id)
+);
+"""
+
+# Fields whose change makes a known prospect worth processing again
+FINGERPRINT_FIELDS = ["company", "contact_name", "email", "title", "linkedin", "signal"]
+
+
+def icp_key(icp: Dict[str, Any], signals: List[str] = None) -> str:
+    """Stable hash of a search definition (key order does not matter)"""
+    canonical = json.dumps({"icp": icp or {}, "signals": sorted(signals or [])}, sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def prospect_id(lead: Dict[str, Any]) -> str:
+    """Provider id when there is one, else the most stable identifying field"""
+    for field in ("id", "email", "linkedin"):
+        if lead.get(field):
+            return str(lead[field]).lower()
+    return "name:" + f"{lead.get('contact_name', '')}|{lead.get('company', '')}".lower()
+
+
+def fingerprint(lead: Dict[str, Any]) -> str:
+    values = "|".join(str(lead.get(field, "")) for field in FINGERPRINT_FIELDS)
+    return hashlib.sha1(values.encode("utf-8")).hexdigest()
+
+
+class SearchState:
+    """Per-ICP memory of which prospects were already emitted
+
+    `delta` splits a search result into new and changed prospects (by id and
+    a fingerprint of the fields downstream steps use) and records them, so a
+    repeated daily search only sends what changed on to enrichment/scoring.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.getenv("SEARCH_STATE_PATH", "data/search_state.db")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_search_at, last_full_at FROM searches WHERE icp_key = ?", (key,)
+            ).fetchone()
+        return {"last_search_at": row[0], "last_full_at": row[1]} if row else None
+
+    def delta(self, key: str, icp: Dict[str, Any], leads: List[Dict[str, Any]], full_refresh: bool = False,
+              now: float = None) -> Dict[str, Any]:
+        """Record a search result and return {"leads": new or changed, "new": n, "changed": n}"""
+        now = time.time() if now is None else now
+        current = {}
+        for lead in leads:
+            current.setdefault(prospect_id(lead), lead)
+
+        with self._lock, self._conn:
+            known = {}
+            ids = list(current)
+            # Chunked IN lookups stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                known.update(self._conn.execute(
+                    "SELECT prospect_id, fingerprint FROM seen_prospects WHERE icp_key = ? "
+                    f"AND prospect_id IN ({', '.join('?' * len(chunk))})",
+                    [key] + chunk
+                ).fetchall())
+
+            emitted, new, changed = [], 0, 0
+            rows = []
+            for pid, lead in current.items():
+                lead_fingerprint = fingerprint(lead)
+                previous = known.get(pid)
+                if previous is None:
+                    new += 1
+                elif previous != lead_fingerprint:
+                    changed += 1
+                elif not full_refresh:
+                    rows.append((key, pid, lead_fingerprint, now, now))
+                    continue
+                emitted.append(lead)
+                rows.append((key, pid, lead_fingerprint, now, now))
+
+            self._conn.executemany(
+                "INSERT INTO seen_prospects VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(icp_key, prospect_id) DO UPDATE SET "
+                "fingerprint = excluded.fingerprint, last_seen_at = excluded.last_seen_at",
+                rows
+            )
+            self._conn.execute(
+                "INSERT INTO searches (icp_key, icp, last_search_at, last_full_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(icp_key) DO UPDATE SET last_search_at = excluded.last_search_at, "
+                "last_full_at = COALESCE(excluded.last_full_at, last_full_at)",
+                (key, json.dumps(icp, sort_keys=True, default=str), now, now if full_refresh else None)
+            )
+
+        return {"leads": emitted, "new": new, "changed": changed, "unchanged": len(current) - new - changed}
+
+    def reset(self, key: str):
+        """Forget everything seen for one ICP"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM seen_prospects WHERE icp_key = ?", (key,))
+            self._conn.execute("DELETE FROM searches WHERE icp_key = ?", (key,))
+
+
+_states: Dict[str, SearchState] = {}
+_states_lock = threading.Lock()
+
+
+def get_search_state(path: str = None) -> SearchState:
+    """Shared SearchState per database path"""
+    path = path or os.getenv("SEARCH_STATE_PATH", "data/search_state.db")
+    with _states_lock:
+        if path not in _states:
+            _states[path] = SearchState(path)
+        return _states[path]
@@ -0,0 +1,415 @@
+import hashlib
+import heapq
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Any, List, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+logger = logging.getLogger("SendSchedule")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scheduled_sends (
+    id TEXT PRIMARY KEY,
+    due_at REAL NOT NULL,
+    campaign_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    sequence_step INTEGER NOT NULL DEFAULT 0,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    claim_token TEXT,
+    claimed_at REAL,
+    sent_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_scheduled_due ON scheduled_sends (status, due_at);
+CREATE INDEX IF NOT EXISTS idx_scheduled_recipient ON scheduled_sends (campaign_id, email, status);
+"""
+
+# Flags that end a recipient's sequence (see utils.event_store.EVENT_FLAGS)
+STOP_FLAGS = {"replied", "meeting_booked"}
+
+DEFAULT_TIMEZONE = "America/New_York"
+
+
+def send_id(campaign_id: str, email: str, sequence_step: int = 0) -> str:
+    """Deterministic id per campaign, recipient and sequence step
+
+    Scheduling the same send twice is a no-op.
+    """
+    key = f"{campaign_id}|{email.lower()}|{sequence_step}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:24]
+
+
+def _zone(tz_name: str, default: str = DEFAULT_TIMEZONE) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or default)
+    except (ZoneInfoNotFoundError, ValueError):
+        logger.warning(f"Unknown time zone '{tz_name}', using {default}")
+        return ZoneInfo(default)
+
+
+def business_slot(after: float, tz_name: str = None, hours: Tuple[int, int] = (9, 17),
+                  weekdays: Tuple[int, ...] = (0, 1, 2, 3, 4), offset_s: float = 0,
+                  default_tz: str = DEFAULT_TIMEZONE) -> float:
+    """First moment at or after `after` inside the recipient's local business hours
+
+    `offset_s` shifts sends within the opening of the window (by recipient,
+    see `spread_offset`) so a time zone's sends don't all land at 9:00 sharp.
+    """
+    zone = _zone(tz_name, default_tz)
+    local = datetime.fromtimestamp(after, zone)
+    for _ in range(8):
+        if local.weekday() in weekdays:
+            start = local.replace(hour=hours[0], minute=0, second=0, microsecond=0)
+            end = local.replace(hour=hours[1], minute=0, second=0, microsecond=0)
+            candidate = max(local, start + timedelta(seconds=offset_s))
+            if candidate < end:
+                return candidate.timestamp()
+        local = (local + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"No business hours in {hours} on weekdays {weekdays}")
+
+
+def spread_offset(email: str, spread_s: float) -> float:
+    """Stable per-recipient offset in [0, spread_s)"""
+    if spread_s <= 0:
+        return 0.0
+    digest = hashlib.sha1(email.lower().encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % int(spread_s)
+
+
+class SendSchedule:
+    """Persistent scheduled sends, indexed by due time
+
+    The (status, due_at) index makes scheduling and finding the next due
+    sends O(log n), so millions of pending sends cost no more per dispatch
+    than a handful. Dispatch claims sends with a token before sending and
+    marks them sent afterwards; claims left behind by a crashed dispatcher
+    are released again by `recover`, and ids are deterministic, so nothing
+    is lost or scheduled twice across restarts.
+    """
+
+    def __init__(self, path: str = None, max_attempts: int = 3):
+        self.path = path or os.getenv("SEND_SCHEDULE_PATH", "data/send_schedule.db")
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[List[Tuple[float, str]]], None]] = []
+        self._attached = set()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def add_listener(self, listener: Callable[[List[Tuple[float, str]]], None]):
+        """Call listener([(due_at, id), ...]) with newly scheduled sends"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[List[Tuple[float, str]]], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def schedule(self, entries: List[Dict[str, Any]]) -> int:
+        """Insert sends ({id, due_at, campaign_id, email, sequence_step, payload}); existing ids are kept"""
+        rows = [
+            (e["id"], e["due_at"], e["campaign_id"], e["email"].lower(), e.get("sequence_step", 0),
+             json.dumps(e["payload"], default=str))
+            for e in entries
+        ]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO scheduled_sends (id, due_at, campaign_id, email, sequence_step, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            inserted = self._conn.total_changes - before
+            listeners = list(self._listeners)
+
+        if inserted:
+            for listener in listeners:
+                listener([(e["due_at"], e["id"]) for e in entries])
+        return inserted
+
+    def due(self, until: float, limit: int = 1000) -> List[Tuple[float, str]]:
+        """Earliest pending sends due by `until`, as (due_at, id)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT due_at, id FROM scheduled_sends WHERE status = 'pending' AND due_at <= ? "
+                "ORDER BY due_at LIMIT ?",
+                (until, limit)
+            ).fetchall()
+
+    def claim(self, ids: List[str], token: str) -> List[Dict[str, Any]]:
+        """Claim still-pending sends for one dispatch; cancelled or already claimed ones are skipped"""
+        if not ids:
+            return []
+        placeholders = ", ".join("?" * len(ids))
+        with self._lock, self._conn:
+            # "+status" keeps SQLite on the primary key: with a few ids in the
+            # list it would otherwise scan the whole pending range of the status index
+            self._conn.execute(
+                "UPDATE scheduled_sends SET status = 'claimed', claim_token = ?, claimed_at = ?, "
+                f"attempts = attempts + 1 WHERE id IN ({placeholders}) AND +status = 'pending'",
+                [token, time.time()] + ids
+            )
+            rows = self._conn.execute(
+                "SELECT id, due_at, campaign_id, email, sequence_step, payload, attempts FROM scheduled_sends "
+                f"WHERE id IN ({placeholders}) AND claim_token = ? AND +status = 'claimed' ORDER BY due_at",
+                ids + [token]
+            ).fetchall()
+        return [
+            {"id": r[0], "due_at": r[1], "campaign_id": r[2], "email": r[3], "sequence_step": r[4],
+             "payload": json.loads(r[5]), "attempts": r[6]}
+            for r in rows
+        ]
+
+    def complete(self, entry: Dict[str, Any], token: str, ok: bool, error: str = None,
+                 retry_at: float = None) -> bool:
+        """Mark a claimed send sent, or failed (rescheduled at retry_at while attempts remain)"""
+        with self._lock, self._conn:
+            if ok:
+                cursor = self._conn.execute(
+                    "UPDATE scheduled_sends SET status = 'sent', sent_at = ?, claim_token = NULL "
+                    "WHERE id = ? AND claim_token = ?",
+                    (time.time(), entry["id"], token)
+                )
+            elif retry_at is not None and entry["attempts"] < self.max_attempts:
+                cursor = self._conn.execute(
+                    "UPDATE scheduled_sends SET status = 'pending', due_at = ?, error = ?, claim_token = NULL "
+                    "WHERE id = ? AND claim_token = ?",
+                    (retry_at, error, entry["id"], token)
+                )
+            else:
+                cursor = self._conn.execute(
+                    "UPDATE scheduled_sends SET status = 'failed', error = ?, claim_token = NULL "
+                    "WHERE id = ? AND claim_token = ?",
+                    (error, entry["id"], token)
+                )
+        return cursor.rowcount == 1
+
+    def recover(self, claim_timeout_s: float = 300) -> int:
+        """Release claims older than claim_timeout_s (their dispatcher died mid-send)
+
+        Every claim counted as an attempt, so a send that keeps crashing its
+        dispatcher is marked failed after max_attempts instead of being
+        released forever. Returns the number of sends released for retry.
+        """
+        stale_before = time.time() - claim_timeout_s
+        with self._lock, self._conn:
+            failed = self._conn.execute(
+                "UPDATE scheduled_sends SET status = 'failed', claim_token = NULL, "
+                "error = 'claim expired on final attempt' "
+                "WHERE status = 'claimed' AND claimed_at < ? AND attempts >= ?",
+                (stale_before, self.max_attempts)
+            ).rowcount
+            released = self._conn.execute(
+                "UPDATE scheduled_sends SET status = 'pending', claim_token = NULL "
+                "WHERE status = 'claimed' AND claimed_at < ?",
+                (stale_before,)
+            ).rowcount
+        if failed:
+            logger.warning(f"{failed} sends failed after {self.max_attempts} abandoned claims")
+        return released
+
+    def cancel(self, campaign_id: str, email: str, from_step: int = 1) -> int:
+        """Cancel a recipient's pending sends from a sequence step on (default: follow-ups)"""
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "UPDATE scheduled_sends SET status = 'cancelled' "
+                "WHERE campaign_id = ? AND email = ? AND status = 'pending' AND sequence_step >= ?",
+                (campaign_id, email.lower(), from_step)
+            ).rowcount
+
+    def on_event(self, event: Dict[str, Any], flag: str):
+        """EventStore listener: a reply or booked meeting stops the recipient's follow-ups"""
+        if flag in STOP_FLAGS and event.get("campaign_id") and event.get("email"):
+            cancelled = self.cancel(event["campaign_id"], event["email"])
+            if cancelled:
+                logger.info(f"Cancelled {cancelled} follow-ups for {event['email']} ({flag})")
+
+    def attach(self, store):
+        """Listen to an EventStore (once per store)"""
+        if id(store) not in self._attached:
+            self._attached.add(id(store))
+            store.add_listener(self.on_event)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._conn.execute(
+                "SELECT status, COUNT(*) FROM scheduled_sends GROUP BY status"
+            ).fetchall())
+            next_due = self._conn.execute(
+                "SELECT MIN(due_at) FROM scheduled_sends WHERE status = 'pending'"
+            ).fetchone()[0]
+        return {"counts": counts, "next_due_at": next_due}
+
+
+class SendDispatcher:
+    """Releases due sends in rate-limited batches
+
+    A min-heap holds the next `window` pending sends within `horizon_s`
+    (read through the due-time index), so the dispatcher sleeps until the
+    earliest one is due instead of scanning the table. Sends scheduled in
+    this process are pushed in directly; sends scheduled elsewhere are picked
+    up on the next refill, at least every `refresh_s`. A token bucket caps
+    throughput at `rate_per_min`, in bursts of at most `batch_size`.
+    """
+
+    def __init__(self, schedule: SendSchedule, send_fn: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 rate_per_min: float = 60, batch_size: int = 20, window: int = 10000,
+                 horizon_s: float = 3600, refresh_s: float = 30, claim_timeout_s: float = 300,
+                 retry_delay_s: float = 300):
+        self.schedule = schedule
+        self.send_fn = send_fn
+        self.rate_per_s = max(rate_per_min, 1) / 60
+        self.batch_size = batch_size
+        self.window = window
+        self.horizon_s = horizon_s
+        self.refresh_s = refresh_s
+        self.claim_timeout_s = claim_timeout_s
+        self.retry_delay_s = retry_delay_s
+        self.token = uuid.uuid4().hex
+        self._heap: List[Tuple[float, str]] = []
+        self._queued = set()
+        self._horizon_end = 0.0
+        self._refreshed_at = 0.0
+        self._tokens = float(batch_size)
+        self._tokens_at = time.monotonic()
+        self._cond = threading.Condition()
+        schedule.add_listener(self._on_schedule)
+        # Sends claimed by a previous, crashed dispatcher go back to pending
+        recovered = schedule.recover(claim_timeout_s)
+        if recovered:
+            logger.info(f"Recovered {recovered} sends left claimed by an earlier dispatcher")
+
+    def close(self):
+        """Stop listening to the schedule; a dispatcher that is done must be closed"""
+        self.schedule.remove_listener(self._on_schedule)
+
+    def _on_schedule(self, entries: List[Tuple[float, str]]):
+        with self._cond:
+            for due_at, entry_id in entries:
+                if due_at <= self._horizon_end and entry_id not in self._queued and len(self._queued) < self.window:
+                    heapq.heappush(self._heap, (due_at, entry_id))
+                    self._queued.add(entry_id)
+            self._cond.notify()
+
+    def _refill(self, now: float):
+        with self._cond:
+            if self._heap and now - self._refreshed_at < self.refresh_s and now < self._horizon_end:
+                return
+            self._horizon_end = now + self.horizon_s
+            self._refreshed_at = now
+        # Also picks up sends released from dispatchers that died since the last refill
+        self.schedule.recover(self.claim_timeout_s)
+        for due_at, entry_id in self.schedule.due(self._horizon_end, self.window):
+            with self._cond:
+                if entry_id not in self._queued:
+                    heapq.heappush(self._heap, (due_at, entry_id))
+                    self._queued.add(entry_id)
+
+    def _available_tokens(self) -> int:
+        now = time.monotonic()
+        self._tokens = min(self.batch_size, self._tokens + (now - self._tokens_at) * self.rate_per_s)
+        self._tokens_at = now
+        return int(self._tokens)
+
+    def _dispatch_batch(self, now: float) -> Tuple[int, List[Tuple[Dict[str, Any], Dict[str, Any]]]]:
+        self._refill(now)
+        with self._cond:
+            limit = min(self.batch_size, self._available_tokens())
+            ids = []
+            while self._heap and self._heap[0][0] <= now and len(ids) < limit:
+                _, entry_id = heapq.heappop(self._heap)
+                self._queued.discard(entry_id)
+                ids.append(entry_id)
+            self._tokens -= len(ids)
+        return len(ids), self._send(ids)
+
+    def _send(self, ids: List[str]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        results = []
+        for entry in self.schedule.claim(ids, self.token):
+            try:
+                result = self.send_fn(entry)
+                ok, error = result.get("status") != "failed", result.get("error")
+            except Exception as e:
+                result, ok, error = {"email": entry["email"], "status": "failed", "error": str(e)}, False, str(e)
+            self.schedule.complete(entry, self.token, ok, error, retry_at=time.time() + self.retry_delay_s)
+            results.append((entry, result))
+        return results
+
+    def _due_waiting(self, now: float) -> bool:
+        with self._cond:
+            return bool(self._heap) and self._heap[0][0] <= now
+
+    def run_once(self, now: float = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Send one rate-limited batch of due sends; returns (entry, result) pairs"""
+        return self._dispatch_batch(time.time() if now is None else now)[1]
+
+    def dispatch_due(self, now: float = None) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Send everything due by `now`, waiting on the rate limit between batches"""
+        now = time.time() if now is None else now
+        sent = []
+        while True:
+            popped, results = self._dispatch_batch(now)
+            sent.extend(results)
+            if popped:
+                continue
+            if not self._due_waiting(now):
+                return sent
+            time.sleep(1 / self.rate_per_s)
+
+    def dispatch(self, ids: List[str]) -> List[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """Send just these sends (e.g. one campaign's due ones), waiting on the rate limit between batches
+
+        Unlike dispatch_due, other sends that are due stay with the dispatcher
+        process. Sends already claimed, sent or cancelled are skipped.
+        """
+        sent = []
+        remaining = list(ids)
+        while remaining:
+            with self._cond:
+                limit = min(self.batch_size, self._available_tokens())
+                batch, remaining = remaining[:limit], remaining[limit:]
+                self._tokens -= len(batch)
+            if batch:
+                sent.extend(self._send(batch))
+            else:
+                time.sleep(1 / self.rate_per_s)
+        return sent
+
+    def run_forever(self, stop_event: threading.Event):
+        logger.info(f"Send dispatcher running ({self.rate_per_s * 60:.0f}/min)")
+        while not stop_event.is_set():
+            now = time.time()
+            if self._dispatch_batch(now)[0]:
+                continue
+            with self._cond:
+                wait = self.refresh_s
+                if self._heap:
+                    # Next due send, or the next rate-limit token if one is already due
+                    wait = min(wait, max(self._heap[0][0] - now, 1 / self.rate_per_s))
+                self._cond.wait(max(wait, 0.01))
+
+
+_schedules: Dict[str, SendSchedule] = {}
+_schedules_lock = threading.Lock()
+
+
+def get_send_schedule(path: str = None) -> SendSchedule:
+    """Shared SendSchedule per database path"""
+    path = path or os.getenv("SEND_SCHEDULE_PATH", "data/send_schedule.db")
+    with _schedules_lock:
+        if path not in _schedules:
+            _schedules[path] = SendSchedule(path)
+        return _schedules[path]
@@ -0,0 +1,212 @@
+import atexit
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, List, Optional
+
+# Google client libraries are optional; they are only imported by the first flush
+SHEETS_AVAILABLE = (
+    importlib.util.find_spec("googleapiclient") is not None
+    and importlib.util.find_spec("google.oauth2") is not None
+)
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+
+logger = logging.getLogger("SheetsSink")
+
+
+class GoogleSheetsAppender:
+    """Appends rows to a sheet, authenticating and building the service once"""
+
+    def __init__(self, creds_path: str, sheet_id: str, range_name: str = "Sheet1!A:F"):
+        self.creds_path = creds_path
+        self.sheet_id = sheet_id
+        self.range_name = range_name
+        self._service = None
+
+    @property
+    def service(self):
+        if self._service is None:
+            from google.oauth2.service_account import Credentials
+            from googleapiclient.discovery import build
+
+            creds = Credentials.from_service_account_file(self.creds_path, scopes=SCOPES)
+            self._service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+        return self._service
+
+    def __call__(self, rows: List[list]):
+        self.service.spreadsheets().values().append(
+            spreadsheetId=self.sheet_id,
+            range=self.range_name,
+            valueInputOption="RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows}
+        ).execute()
+
+
+class LocalSheet:
+    """In-process stand-in for a sheet: keeps appended rows and can fail on demand"""
+
+    def __init__(self, fail_times: int = 0, latency: float = 0.0):
+        self.rows: List[list] = []
+        self.calls = 0
+        self.fail_times = fail_times
+        self.latency = latency
+
+    def __call__(self, rows: List[list]):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise ConnectionError("simulated Sheets outage")
+        self.rows.extend(rows)
+
+
+class SheetsExporter:
+    """Buffers rows across runs and appends them in batches from a background thread
+
+    `enqueue` only touches an in-memory buffer, so workflow steps never wait
+    on the Sheets API. A worker flushes when `batch_size` rows are pending or
+    `flush_interval` seconds have passed since the first pending row. Failed
+    appends are retried with exponential backoff; rows that still cannot be
+    delivered go to a JSONL spill file and are resent ahead of the next batch.
+    """
+
+    def __init__(self, append: Callable[[List[list]], None], batch_size: int = 200,
+                 flush_interval: float = 30, max_retries: int = 4, backoff: float = 1.0,
+                 spill_path: str = "data/sheets_spill.jsonl"):
+        self.append = append
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.spill_path = spill_path
+        self._buffer: List[list] = []
+        self._oldest: Optional[float] = None
+        self._changed = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="sheets-export", daemon=True)
+        self._worker.start()
+
+    def enqueue(self, rows: List[list]):
+        """Queue rows for the next batch (non-blocking)"""
+        if not rows:
+            return
+        with self._changed:
+            if self._oldest is None:
+                self._oldest = time.time()
+            self._buffer.extend(rows)
+            if len(self._buffer) >= self.batch_size:
+                self._changed.notify()
+
+    @property
+    def pending(self) -> int:
+        with self._changed:
+            return len(self._buffer)
+
+    def flush(self) -> int:
+        """Send buffered and spilled rows now; returns the number of rows delivered"""
+        with self._flush_lock:
+            with self._changed:
+                rows, self._buffer, self._oldest = self._buffer, [], None
+            spilled = self._read_spill()
+            batch = spilled + rows
+            if not batch:
+                return 0
+
+            if self._send(batch):
+                if spilled:
+                    os.remove(self.spill_path)
+                return len(batch)
+
+            self._write_spill(batch)
+            logger.warning(f"Sheets export failed, {len(batch)} rows kept in {self.spill_path}")
+            return 0
+
+    def close(self):
+        """Stop the worker and flush whatever is left"""
+        with self._changed:
+            if self._closed:
+                return
+            self._closed = True
+            self._changed.notify()
+        self._worker.join(timeout=self.flush_interval)
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._closed or self._due(), timeout=self._wait_time())
+                if self._closed:
+                    return
+                due = self._due()
+            if due:
+                self.flush()
+
+    def _due(self) -> bool:
+        if not self._buffer:
+            return False
+        return len(self._buffer) >= self.batch_size or time.time() - self._oldest >= self.flush_interval
+
+    def _wait_time(self) -> float:
+        if self._oldest is None:
+            return self.flush_interval
+        return max(0.0, self._oldest + self.flush_interval - time.time())
+
+    def _send(self, rows: List[list]) -> bool:
+        """Append in batch_size chunks, retrying each with exponential backoff"""
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.append(chunk)
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        logger.warning(f"Sheets append failed after {attempt + 1} attempts: {str(e)}")
+                        # Keep only what has not been delivered yet
+                        del rows[:start]
+                        return False
+                    time.sleep(self.backoff * (2 ** attempt))
+        logger.info(f"Exported {len(rows)} rows to Google Sheets")
+        return True
+
+    def _read_spill(self) -> List[list]:
+        if not os.path.exists(self.spill_path):
+            return []
+        with open(self.spill_path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _write_spill(self, rows: List[list]):
+        os.makedirs(os.path.dirname(self.spill_path) or ".", exist_ok=True)
+        tmp_path = self.spill_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, default=str) + "\n")
+        os.replace(tmp_path, self.spill_path)
+
+
+_exporter: Optional[SheetsExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_sheets_exporter() -> Optional[SheetsExporter]:
+    """Shared exporter for the configured sheet, or None if Sheets is not set up"""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            creds_path = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH")
+            sheet_id = os.getenv("GOOGLE_SHEET_ID")
+            if not SHEETS_AVAILABLE or not creds_path or not sheet_id or not os.path.exists(creds_path):
+                return None
+            _exporter = SheetsExporter(
+                GoogleSheetsAppender(creds_path, sheet_id),
+                spill_path=os.getenv("SHEETS_SPILL_PATH", "data/sheets_spill.jsonl")
+            )
+            atexit.register(_exporter.close)
+        return _exporter
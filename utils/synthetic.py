@@ -0,0 +1,220 @@
+import hashlib
+import random
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+# Weighted pools used to shape the synthetic distributions
+
+COMPANY_PREFIXES = [
+    "Tech", "Data", "Cloud", "Cyber", "Quantum", "Blue", "Bright", "Core", "Nova", "Peak",
+    "Signal", "Vertex", "Apex", "Stack", "Pixel", "Flow", "Insight", "Metric", "Orbit", "Pulse"
+]
+
+COMPANY_SUFFIXES = [
+    "Corp", "Labs", "Systems", "Analytics", "Solutions", "Works", "AI", "Software", "Group", "HQ"
+]
+
+LEGAL_SUFFIXES = [("", 6), (" Inc", 3), (" Ltd", 1), (" LLC", 1)]
+
+TLDS = [("com", 10), ("io", 4), ("ai", 2), ("co", 1)]
+
+INDUSTRIES = [("SaaS", 8), ("FinTech", 3), ("HealthTech", 2), ("E-commerce", 2), ("Cybersecurity", 2)]
+
+FIRST_NAMES = [
+    "John", "Sarah", "Michael", "Emily", "Robert", "Priya", "Wei", "Carlos", "Aisha", "David",
+    "Laura", "James", "Sofia", "Daniel", "Hannah", "Omar", "Grace", "Lucas", "Mei", "Ethan"
+]
+
+LAST_NAMES = [
+    "Smith", "Johnson", "Chen", "Davis", "Martinez", "Patel", "Kim", "Garcia", "Nguyen", "Brown",
+    "Wilson", "Singh", "Lopez", "Clark", "Lee", "Walker", "Young", "Khan", "Wright", "Hill"
+]
+
+TITLES = [
+    ("VP of Sales", 6), ("Director of Sales", 8), ("Head of Business Development", 5),
+    ("Chief Revenue Officer", 2), ("Sales Manager", 10), ("Account Executive", 12),
+    ("Sales Operations Analyst", 4), ("Marketing Manager", 5), ("Software Engineer", 3)
+]
+
+TECHNOLOGIES = [
+    ("Salesforce", 10), ("HubSpot", 8), ("Google Analytics", 9), ("Segment", 4), ("Snowflake", 5),
+    ("AWS", 9), ("Slack", 8), ("Zendesk", 4), ("Marketo", 3), ("Outreach", 3),
+    ("Stripe", 4), ("Intercom", 3), ("Looker", 2), ("Tableau", 3), ("Gong", 2)
+]
+
+SIGNALS = [
+    ("recent_funding", 3), ("hiring_for_sales", 4), ("new_executive", 2),
+    ("product_launch", 2), ("website_traffic_spike", 1), ("mock_data", 3)
+]
+
+EMAIL_PATTERNS = [("first.last", 5), ("firstlast", 2), ("f.last", 3), ("first", 1)]
+
+
+def stable_seed(value: Any) -> int:
+    """Derive a process-independent seed from any value (unlike hash())"""
+    digest = hashlib.sha256(str(value).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _pick(rng: random.Random, weighted: List[Tuple[str, int]]) -> str:
+    """Pick a value from a (value, weight) list"""
+    values, weights = zip(*weighted)
+    return rng.choices(values, weights=weights, k=1)[0]
+
+
+def _new_company(rng: random.Random, index: int, used_names: set) -> Dict[str, Any]:
+    """Create a synthetic company profile with a unique name"""
+    base = f"{rng.choice(COMPANY_PREFIXES)}{rng.choice(COMPANY_SUFFIXES)}"
+    if base in used_names:
+        base = f"{base}{index}"
+    used_names.add(base)
+    slug = base.lower()
+    name = f"{base}{_pick(rng, LEGAL_SUFFIXES)}"
+    tech_count = min(int(rng.expovariate(1 / 4)) + 1, 10)
+    technologies = []
+    while len(technologies) < tech_count:
+        tech = _pick(rng, TECHNOLOGIES)
+        if tech not in technologies:
+            technologies.append(tech)
+    return {
+        "company": name,
+        "domain": f"{slug}.{_pick(rng, TLDS)}",
+        "industry": _pick(rng, INDUSTRIES),
+        # Log-normal headcount clustered in the 50-2000 range
+        "employee_count": max(5, int(rng.lognormvariate(5.5, 1.0))),
+        "technologies": technologies
+    }
+
+
+def _email(rng: random.Random, first: str, last: str, domain: str) -> str:
+    """Build an email address following a common corporate pattern"""
+    pattern = _pick(rng, EMAIL_PATTERNS)
+    first, last = first.lower(), last.lower()
+    local = {
+        "first.last": f"{first}.{last}",
+        "firstlast": f"{first}{last}",
+        "f.last": f"{first[0]}.{last}",
+        "first": first
+    }[pattern]
+    return f"{local}@{domain}"
+
+
+def generate_leads(count: int, seed: int = 42, duplicate_rate: float = 0.05,
+                   missing_email_rate: float = 0.1, contacts_per_company: float = 2.5) -> Iterator[Dict[str, Any]]:
+    """Lazily yield `count` deterministic synthetic leads
+
+    The same seed always produces the same stream, so the generator can serve
+    both as the mock prospect source and as a repeatable benchmark input.
+    Several contacts share a company, a fraction of leads are re-emitted
+    duplicates and a fraction have no email address.
+    """
+    rng = random.Random(seed)
+    companies: List[Dict[str, Any]] = []
+    used_names: set = set()
+    recent: List[Dict[str, Any]] = []  # bounded pool to draw duplicates from
+    new_company_rate = 1 / max(contacts_per_company, 1.0)
+
+    for i in range(count):
+        if recent and rng.random() < duplicate_rate:
+            yield dict(rng.choice(recent))
+            continue
+
+        if not companies or rng.random() < new_company_rate:
+            companies.append(_new_company(rng, len(companies), used_names))
+            company = companies[-1]
+        else:
+            # Favour recent companies so accounts cluster like real search pages
+            company = companies[-1 - min(int(rng.expovariate(0.2)), len(companies) - 1)]
+
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        has_email = rng.random() >= missing_email_rate
+        lead = {
+            "id": f"syn-{seed}-{i}",
+            "company": company["company"],
+            "contact_name": f"{first} {last}",
+            "email": _email(rng, first, last, company["domain"]) if has_email else "",
+            "linkedin": f"linkedin.com/in/{first.lower()}{last.lower()}{i}",
+            "signal": _pick(rng, SIGNALS),
+            "title": _pick(rng, TITLES),
+            "domain": company["domain"],
+            "industry": company["industry"],
+            "employee_count": company["employee_count"],
+            "technologies": list(company["technologies"])
+        }
+
+        if len(recent) < 1000:
+            recent.append(lead)
+        else:
+            recent[rng.randrange(1000)] = lead
+
+        yield lead
+
+
+def generate_engagement(sent: Iterable[Dict[str, Any]], seed: int,
+                        rates: Dict[str, float] = None) -> Iterator[Dict[str, Any]]:
+    """Lazily yield deterministic engagement records for sent emails
+
+    Events follow a funnel: clicks and replies only happen after an open,
+    meetings only after a reply. Failed sends produce no record.
+    """
+    rates = {
+        "open": 0.45,
+        "click": 0.25,   # given opened
+        "reply": 0.12,   # given opened
+        "meeting": 0.35, # given replied
+        **(rates or {})
+    }
+    rng = random.Random(seed)
+
+    for status in sent:
+        if status.get("status") == "failed":
+            continue
+
+        opened = rng.random() < rates["open"]
+        clicked = opened and rng.random() < rates["click"]
+        replied = opened and rng.random() < rates["reply"]
+        meeting_booked = replied and rng.random() < rates["meeting"]
+
+        yield {
+            "email": status.get("email", ""),
+            "campaign_id": status.get("campaign_id", ""),
+            "opened": opened,
+            "clicked": clicked,
+            "replied": replied,
+            "meeting_booked": meeting_booked
+        }
+
+
+def generate_engagement_events(sent: Iterable[Dict[str, Any]], seed: int, start_ts: float,
+                               duplicate_rate: float = 0.05, reorder_window: int = 8) -> Iterator[Dict[str, Any]]:
+    """Lazily yield webhook-style events for the engagement of sent emails
+
+    Mimics provider delivery: events carry ids and timestamps, some are
+    redelivered, and nearby events arrive out of order.
+    """
+    rng = random.Random(seed + 1)
+    buffer: List[Dict[str, Any]] = []
+    offsets = {"open": 3600, "click": 5400, "reply": 14400, "meeting": 86400}
+
+    for record in generate_engagement(sent, seed):
+        base = start_ts + rng.expovariate(1 / 1800)
+        for event_type, flag in (("open", "opened"), ("click", "clicked"),
+                                 ("reply", "replied"), ("meeting", "meeting_booked")):
+            if not record[flag]:
+                continue
+            event = {
+                "event_id": f"{record['campaign_id']}:{record['email']}:{event_type}",
+                "campaign_id": record["campaign_id"],
+                "email": record["email"],
+                "type": event_type,
+                "occurred_at": base + rng.uniform(0, offsets[event_type])
+            }
+            buffer.append(event)
+            if rng.random() < duplicate_rate:
+                buffer.append(dict(event))
+
+        # Release a random event once the window is full to emulate late arrivals
+        while len(buffer) > reorder_window:
+            yield buffer.pop(rng.randrange(len(buffer)))
+
+    rng.shuffle(buffer)
+    yield from buffer
\ No newline at end of file
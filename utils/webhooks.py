@@ -0,0 +1,88 @@
+import json
+import logging
+import urllib.request
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List
+from .event_store import EventStore
+
+WEBHOOK_PATH = "/webhooks/events"
+
+logger = logging.getLogger("Webhooks")
+
+
+def _timestamp(value) -> float:
+    """Accept epoch seconds or ISO-8601 strings"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def normalize_event(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Map common provider field names onto the EventStore event shape"""
+    return {
+        "event_id": raw.get("event_id") or raw.get("id") or raw.get("sg_event_id"),
+        "campaign_id": raw.get("campaign_id") or raw.get("campaign"),
+        "email": (raw.get("email") or raw.get("recipient") or "").lower(),
+        "type": raw.get("type") or raw.get("event"),
+        "occurred_at": _timestamp(raw.get("occurred_at") or raw.get("timestamp"))
+    }
+
+
+def parse_payload(body: bytes) -> List[Dict[str, Any]]:
+    """Decode a webhook body: one event, a list, or {"events": [...]}"""
+    data = json.loads(body or b"[]")
+    if isinstance(data, dict):
+        data = data.get("events", [data])
+    return [normalize_event(item) for item in data if isinstance(item, dict)]
+
+
+def handle_webhook(store: EventStore, body: bytes) -> Dict[str, int]:
+    """Ingest a webhook body; safe to call again with the same body"""
+    events = parse_payload(body)
+    accepted = store.ingest_many(events)
+    return {"received": len(events), "accepted": accepted, "duplicates": len(events) - accepted}
+
+
+def make_webhook_server(store: EventStore, host: str = "127.0.0.1", port: int = 8766) -> ThreadingHTTPServer:
+    """Standalone ingestion server (also usable as a local stand-in in tests)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def do_POST(self):
+            if self.path.split("?")[0] != WEBHOOK_PATH:
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                result = handle_webhook(store, self.rfile.read(length))
+                status = 200
+            except (ValueError, TypeError) as e:
+                result, status = {"error": str(e)}, 400
+
+            body = json.dumps(result).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def post_events(url: str, events: List[Dict[str, Any]], timeout: float = 10) -> Dict[str, int]:
+    """Deliver events to a webhook endpoint the way a provider would"""
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({"events": events}, default=str).encode("utf-8"),
+        method="POST",
+        headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
\ No newline at end of file
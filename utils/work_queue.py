@@ -0,0 +1,475 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, List, Optional, Tuple
+from .budget import RunBudget, current_budget
+from .run_context import RunContext, activate
+
+logger = logging.getLogger("WorkQueue")
+
+# Payload key carrying a RunBudget grant to the worker (see map_tasks)
+BUDGET_GRANT = "_budget_grant"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    queue TEXT NOT NULL,
+    batch_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_ready ON tasks (queue, status, lease_until);
+CREATE INDEX IF NOT EXISTS idx_tasks_batch ON tasks (batch_id, status);
+"""
+
+
+class Task:
+    """One leased unit of work"""
+
+    def __init__(self, task_id, queue: str, batch_id: str, index: int, payload: Dict[str, Any], attempts: int):
+        self.id = task_id
+        self.queue = queue
+        self.batch_id = batch_id
+        self.index = index
+        self.payload = payload
+        self.attempts = attempts
+
+
+class SQLiteWorkQueue:
+    """Durable task queue with leases in a single SQLite file
+
+    A leased task is invisible to other workers until `visibility_timeout`
+    passes; a worker that dies mid-task simply lets its lease expire and the
+    task is handed out again (at-least-once). Completion and failure only
+    count when reported by the worker that currently holds the lease. Workers
+    on other machines need the file on shared storage; use Redis otherwise.
+    """
+
+    def __init__(self, path: str = "data/queue.db", visibility_timeout: float = 120, max_attempts: int = 3,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        # Source of lease deadlines (injectable so tests need not sleep)
+        self.clock = clock
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def publish(self, queue: str, payloads: List[Dict[str, Any]], batch_id: str = None) -> str:
+        """Enqueue one task per payload; returns the batch id used to collect results"""
+        batch_id = batch_id or uuid.uuid4().hex
+        now = self.clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.executemany(
+                "INSERT INTO tasks (queue, batch_id, idx, payload, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [(queue, batch_id, i, json.dumps(payload, default=str), now) for i, payload in enumerate(payloads)]
+            )
+            self._conn.execute("COMMIT")
+        return batch_id
+
+    def lease(self, queue: str, worker_id: str, limit: int = 1) -> List[Task]:
+        """Claim up to `limit` ready tasks (pending, or leased with an expired lease)"""
+        now = self.clock()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._expire_exhausted("queue = ?", queue, now)
+                rows = self._conn.execute(
+                    "SELECT id, batch_id, idx, payload, attempts FROM tasks WHERE queue = ? AND "
+                    "(status = 'pending' OR (status = 'leased' AND lease_until < ? AND attempts < ?)) ORDER BY id LIMIT ?",
+                    (queue, now, self.max_attempts, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE tasks SET status = 'leased', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    [(worker_id, now + self.visibility_timeout, now, row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [Task(row[0], queue, row[1], row[2], json.loads(row[3]), row[4] + 1) for row in rows]
+
+    def _expire_exhausted(self, scope: str, value: str, now: float):
+        """Fail tasks whose lease expired on their last attempt (caller holds the lock)
+
+        Such a task matches neither "pending" nor "re-leasable", so without this
+        it would stay leased forever and its batch would never finish.
+        """
+        self._conn.execute(
+            "UPDATE tasks SET status = 'failed', error = 'lease expired on final attempt', lease_until = NULL, "
+            f"updated_at = ? WHERE {scope} AND status = 'leased' AND lease_until < ? AND attempts >= ?",
+            (now, value, now, self.max_attempts)
+        )
+
+    def extend(self, task: Task, worker_id: str) -> bool:
+        """Push the lease deadline out for a long-running task"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET lease_until = ? WHERE id = ? AND status = 'leased' AND worker = ?",
+                (self.clock() + self.visibility_timeout, task.id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task: Task, worker_id: str, result: Any) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND worker = ?",
+                (json.dumps(result, default=str), self.clock(), task.id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        """Release a task for retry, or mark it failed after max_attempts"""
+        status = "failed" if task.attempts >= self.max_attempts else "pending"
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = ?, error = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND status = 'leased' AND worker = ?",
+                (status, error, self.clock(), task.id, worker_id)
+            )
+        return cursor.rowcount == 1
+
+    def collect(self, batch_id: str) -> Dict[str, Any]:
+        """Results so far: {"results": {index: result}, "failed": {index: error}, "open": n}"""
+        with self._lock:
+            self._expire_exhausted("batch_id = ?", batch_id, self.clock())
+            rows = self._conn.execute(
+                "SELECT idx, status, result, error FROM tasks WHERE batch_id = ?", (batch_id,)
+            ).fetchall()
+        collected = {"results": {}, "failed": {}, "open": 0}
+        for index, status, result, error in rows:
+            if status == "done":
+                collected["results"][index] = json.loads(result)
+            elif status == "failed":
+                collected["failed"][index] = error
+            else:
+                collected["open"] += 1
+        return collected
+
+    def cancel(self, batch_id: str) -> int:
+        """Drop a batch's unfinished tasks (e.g. after the coordinator gave up waiting)"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM tasks WHERE batch_id = ? AND status IN ('pending', 'leased')", (batch_id,)
+            )
+        return cursor.rowcount
+
+    def purge(self, batch_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM tasks WHERE batch_id = ?", (batch_id,))
+
+
+class RedisWorkQueue:
+    """The same queue contract on Redis, for workers spread over several machines
+
+    Ready tasks sit in a list per queue, leases in a sorted set scored by
+    deadline. Expired leases are moved back onto the ready list by whichever
+    worker leases next. `client` is a redis.Redis (or LocalRedis in tests).
+    """
+
+    def __init__(self, client, prefix: str = "leadgen", visibility_timeout: float = 120, max_attempts: int = 3,
+                 clock: Callable[[], float] = time.time):
+        self.client = client
+        self.clock = clock
+        self.prefix = prefix
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + tuple(str(p) for p in parts))
+
+    def publish(self, queue: str, payloads: List[Dict[str, Any]], batch_id: str = None) -> str:
+        batch_id = batch_id or uuid.uuid4().hex
+        task_ids = []
+        for i, payload in enumerate(payloads):
+            task_id = f"{batch_id}:{i}"
+            self.client.hset(self._key("task", task_id), mapping={
+                "queue": queue, "batch_id": batch_id, "idx": i, "attempts": 0,
+                "payload": json.dumps(payload, default=str)
+            })
+            task_ids.append(task_id)
+        self.client.hset(self._key("batch", batch_id), mapping={"total": len(payloads), "queue": queue})
+        if task_ids:
+            self.client.rpush(self._key("ready", queue), *task_ids)
+        return batch_id
+
+    def _requeue_expired(self, queue: str, now: float):
+        """Put expired leases back on the ready list, failing those out of attempts"""
+        leases = self._key("leases", queue)
+        for task_id in self.client.zrangebyscore(leases, 0, now):
+            # zrem succeeds for exactly one worker, so an expired task is requeued once
+            if not self.client.zrem(leases, task_id):
+                continue
+            task_id = task_id.decode() if isinstance(task_id, bytes) else task_id
+            data = _decode(self.client.hgetall(self._key("task", task_id)))
+            if not data:
+                continue
+            if int(data.get("attempts", 0)) >= self.max_attempts:
+                # Its worker died on every attempt (e.g. a poison task): give up like fail() does
+                self.client.hset(self._key("failed", data["batch_id"]), mapping={data["idx"]: "lease expired on final attempt"})
+                self.client.delete(self._key("task", task_id))
+            else:
+                self.client.rpush(self._key("ready", queue), task_id)
+
+    def lease(self, queue: str, worker_id: str, limit: int = 1) -> List[Task]:
+        now = self.clock()
+        leases = self._key("leases", queue)
+        self._requeue_expired(queue, now)
+
+        tasks = []
+        for _ in range(limit):
+            task_id = self.client.lpop(self._key("ready", queue))
+            if task_id is None:
+                break
+            task_id = task_id.decode() if isinstance(task_id, bytes) else task_id
+            key = self._key("task", task_id)
+            if not self.client.hgetall(key):
+                # Cancelled or purged while waiting
+                continue
+            self.client.zadd(leases, {task_id: now + self.visibility_timeout})
+            attempts = self.client.hincrby(key, "attempts", 1)
+            self.client.hset(key, mapping={"worker": worker_id})
+            data = _decode(self.client.hgetall(key))
+            tasks.append(Task(task_id, queue, data["batch_id"], int(data["idx"]), json.loads(data["payload"]), attempts))
+        return tasks
+
+    def _holds(self, task: Task, worker_id: str) -> bool:
+        worker = self.client.hget(self._key("task", task.id), "worker")
+        worker = worker.decode() if isinstance(worker, bytes) else worker
+        return worker == worker_id and self.client.zscore(self._key("leases", task.queue), task.id) is not None
+
+    def extend(self, task: Task, worker_id: str) -> bool:
+        if not self._holds(task, worker_id):
+            return False
+        self.client.zadd(self._key("leases", task.queue), {task.id: self.clock() + self.visibility_timeout})
+        return True
+
+    def complete(self, task: Task, worker_id: str, result: Any) -> bool:
+        if not self._holds(task, worker_id) or not self.client.zrem(self._key("leases", task.queue), task.id):
+            return False
+        self.client.hset(self._key("results", task.batch_id), mapping={task.index: json.dumps(result, default=str)})
+        self.client.delete(self._key("task", task.id))
+        return True
+
+    def fail(self, task: Task, worker_id: str, error: str) -> bool:
+        if not self._holds(task, worker_id) or not self.client.zrem(self._key("leases", task.queue), task.id):
+            return False
+        if task.attempts >= self.max_attempts:
+            self.client.hset(self._key("failed", task.batch_id), mapping={task.index: error})
+            self.client.delete(self._key("task", task.id))
+        else:
+            self.client.rpush(self._key("ready", task.queue), task.id)
+        return True
+
+    def collect(self, batch_id: str) -> Dict[str, Any]:
+        queue = _decode(self.client.hgetall(self._key("batch", batch_id))).get("queue")
+        if queue:
+            # Settle tasks whose last lease expired even if no worker leases again
+            self._requeue_expired(queue, self.clock())
+        results = {int(k): json.loads(v) for k, v in _decode(self.client.hgetall(self._key("results", batch_id))).items()}
+        failed = {int(k): v for k, v in _decode(self.client.hgetall(self._key("failed", batch_id))).items()}
+        total = int(_decode(self.client.hgetall(self._key("batch", batch_id))).get("total", 0))
+        return {"results": results, "failed": failed, "open": total - len(results) - len(failed)}
+
+    def cancel(self, batch_id: str) -> int:
+        """Mark the batch's unfinished tasks failed so workers drop them"""
+        collected = self.collect(batch_id)
+        total = int(_decode(self.client.hgetall(self._key("batch", batch_id))).get("total", 0))
+        cancelled = 0
+        for index in range(total):
+            if index not in collected["results"] and index not in collected["failed"]:
+                self.client.hset(self._key("failed", batch_id), mapping={index: "cancelled"})
+                self.client.delete(self._key("task", f"{batch_id}:{index}"))
+                cancelled += 1
+        return cancelled
+
+    def purge(self, batch_id: str):
+        for name in ("batch", "results", "failed"):
+            self.client.delete(self._key(name, batch_id))
+
+
+def _decode(mapping: Dict) -> Dict[str, str]:
+    return {
+        (k.decode() if isinstance(k, bytes) else str(k)): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in (mapping or {}).items()
+    }
+
+
+class LocalRedis:
+    """In-process stand-in for the handful of Redis commands RedisWorkQueue uses"""
+
+    def __init__(self):
+        self._data: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def hset(self, key, mapping):
+        with self._lock:
+            self._data.setdefault(key, {}).update({str(k): str(v) for k, v in mapping.items()})
+
+    def hget(self, key, field):
+        with self._lock:
+            return self._data.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        with self._lock:
+            return dict(self._data.get(key, {}))
+
+    def hincrby(self, key, field, amount=1):
+        with self._lock:
+            fields = self._data.setdefault(key, {})
+            fields[field] = str(int(fields.get(field, 0)) + amount)
+            return int(fields[field])
+
+    def rpush(self, key, *values):
+        with self._lock:
+            self._data.setdefault(key, []).extend(values)
+
+    def lpop(self, key):
+        with self._lock:
+            items = self._data.get(key)
+            return items.pop(0) if items else None
+
+    def zadd(self, key, mapping):
+        with self._lock:
+            self._data.setdefault(key, {}).update(mapping)
+
+    def zrem(self, key, member):
+        with self._lock:
+            return 1 if self._data.get(key, {}).pop(member, None) is not None else 0
+
+    def zscore(self, key, member):
+        with self._lock:
+            return self._data.get(key, {}).get(member)
+
+    def zrangebyscore(self, key, low, high):
+        with self._lock:
+            return [m for m, score in sorted(self._data.get(key, {}).items(), key=lambda i: i[1]) if low <= score <= high]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+_queues: Dict[str, Any] = {}
+_queues_lock = threading.Lock()
+
+
+def get_work_queue(url: str = None):
+    """Shared queue for a URL: sqlite:///path (default), redis://host:port/db or local-redis://"""
+    url = url or os.getenv("WORK_QUEUE_URL", "sqlite:///data/queue.db")
+    with _queues_lock:
+        if url not in _queues:
+            if url.startswith("sqlite:///"):
+                _queues[url] = SQLiteWorkQueue(url[len("sqlite:///"):])
+            elif url.startswith("redis://") or url.startswith("rediss://"):
+                import redis
+                _queues[url] = RedisWorkQueue(redis.Redis.from_url(url))
+            elif url.startswith("local-redis://"):
+                _queues[url] = RedisWorkQueue(LocalRedis())
+            else:
+                raise ValueError(f"Unsupported work queue URL: {url}")
+        return _queues[url]
+
+
+def run_task(fn: Callable[..., Any], task: Task) -> Any:
+    """Worker side of map_tasks: fn(**payload), under the task's budget grant if it has one
+
+    Granted tasks return {"value": result, "budget": report} so the
+    coordinator can settle the grant with what the task actually used.
+    """
+    payload = dict(task.payload)
+    grant = payload.pop(BUDGET_GRANT, None)
+    if grant is None:
+        return fn(**payload)
+    run_context = RunContext(budget=RunBudget.from_grant(grant))
+    run_context.step = task.queue
+    with activate(run_context):
+        value = fn(**payload)
+    return {"value": value, "budget": run_context.budget.report()}
+
+
+def map_tasks(queue_name: str, payloads: List[Dict[str, Any]], local_fn: Callable[[Dict[str, Any]], Any],
+              options: Optional[Dict[str, Any]] = None,
+              reserve: Optional[Callable[[Dict[str, Any]], Tuple[str, int]]] = None,
+              sleep: Callable[[float], None] = time.sleep) -> List[Any]:
+    """Run payloads through remote workers and return results in payload order
+
+    Without `options` (or with "enabled": false) everything runs locally. Tasks
+    that fail on every attempt, or are still open when `timeout` expires, are
+    cancelled and computed locally, so a step always gets a full result list.
+
+    When the run has a budget, `reserve(payload)` names the provider and the
+    most calls a task can make. Each task is granted those calls (at its
+    "priority") before it is published and settled with the worker's actual
+    usage afterwards; tasks refused a grant run locally, where they take the
+    same degraded path as an unqueued step. `sleep` waits between polls of
+    the batch's results.
+    """
+    if not options or not options.get("enabled", True) or not payloads:
+        return [local_fn(payload) for payload in payloads]
+
+    budget = current_budget()
+    grants: Dict[int, Dict[str, Any]] = {}
+    if budget and reserve:
+        for i, payload in enumerate(payloads):
+            provider, calls = reserve(payload)
+            grant = budget.grant(provider, payload.get("priority"), calls)
+            if grant:
+                grants[i] = grant
+        if not grants:
+            return [local_fn(payload) for payload in payloads]
+    remote = sorted(grants) if budget and reserve else list(range(len(payloads)))
+
+    queue = get_work_queue(options.get("url"))
+    batch_id = queue.publish(queue_name, [
+        {**payloads[i], BUDGET_GRANT: grants[i]} if i in grants else payloads[i] for i in remote
+    ])
+    deadline = time.time() + options.get("timeout", 300)
+    poll_interval = options.get("poll_interval", 0.2)
+
+    collected = queue.collect(batch_id)
+    while collected["open"] and time.time() < deadline:
+        sleep(poll_interval)
+        collected = queue.collect(batch_id)
+
+    if collected["open"]:
+        queue.cancel(batch_id)
+        collected = queue.collect(batch_id)
+        logger.warning(f"{queue_name}: workers did not finish in time, running the rest locally")
+    if collected["failed"]:
+        logger.warning(f"{queue_name}: {len(collected['failed'])} tasks failed remotely, running them locally")
+
+    done = {}
+    for position, i in enumerate(remote):
+        if position not in collected["results"]:
+            continue
+        result = collected["results"][position]
+        if i in grants:
+            budget.settle(grants.pop(i), result["budget"])
+            result = result["value"]
+        done[i] = result
+    for grant in grants.values():
+        # Reserved for a task that will now run locally under the run budget
+        budget.settle(grant)
+
+    results = [done[i] if i in done else local_fn(payload) for i, payload in enumerate(payloads)]
+    queue.purge(batch_id)
+    return results
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Queue worker: runs per-lead enrichment and content-generation tasks that a
+workflow published with a "work_queue" step input. Start as many as needed,
+on this machine or others sharing the queue:
+
+    python worker.py --queue-url sqlite:///data/queue.db --concurrency 4
+    python worker.py --queue-url redis://queue-host:6379/0 --steps outreach_content
+"""
+
+import argparse
+import json
+import socket
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, Any
+from dotenv import load_dotenv
+from agents.registry import AgentRegistry
+from utils.logger import setup_logger
+from utils.work_queue import Task, get_work_queue, run_task
+
+logger = setup_logger("Worker")
+
+# Per-item agent methods a worker may run; tasks name the agent, never a method
+TASK_METHODS = {
+    "DataEnrichmentAgent": "_enrich_lead",
+    "OutreachContentAgent": "_generate_message"
+}
+
+
+class Worker:
+    """Leases tasks from the queue and runs them through warm agent instances"""
+
+    def __init__(self, queue, config_path: str = "config/workflow.json", steps=None,
+                 worker_id: str = None, batch: int = 4, idle_sleep: float = 1.0):
+        self.queue = queue
+        self.worker_id = worker_id or f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}"
+        self.batch = batch
+        self.idle_sleep = idle_sleep
+        self.registry = AgentRegistry()
+        self.agents: Dict[str, Any] = {}
+
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        for agent_name, spec in config.get("agents", {}).items():
+            self.registry.register(agent_name, spec)
+        self.steps = {
+            step["id"]: step for step in config.get("steps", [])
+            if step["agent"] in TASK_METHODS and (not steps or step["id"] in steps)
+        }
+
+    def _agent(self, step_id: str):
+        if step_id not in self.agents:
+            step = self.steps[step_id]
+            agent = self.registry.get(step["agent"])(
+                agent_id=step_id,
+                instructions=step.get("instructions", ""),
+                tools=step.get("tools", [])
+            )
+            agent.warm_up()
+            self.agents[step_id] = agent
+        return self.agents[step_id]
+
+    def run_task(self, task: Task):
+        agent = self._agent(task.queue)
+        method = getattr(agent, TASK_METHODS[self.steps[task.queue]["agent"]])
+        return run_task(method, task)
+
+    def run_once(self) -> int:
+        """Lease and process one round of tasks from every step queue"""
+        processed = 0
+        for step_id in self.steps:
+            for task in self.queue.lease(step_id, self.worker_id, limit=self.batch):
+                # The batch shares one lease deadline; renew it per task so later
+                # tasks are not handed to another worker while earlier ones run
+                if not self.queue.extend(task, self.worker_id):
+                    logger.info(f"Task {task.id} lease was lost before it started; skipped")
+                    continue
+                try:
+                    result = self.run_task(task)
+                except Exception as e:
+                    logger.warning(f"Task {task.id} on {step_id} failed (attempt {task.attempts}): {str(e)}")
+                    self.queue.fail(task, self.worker_id, str(e))
+                else:
+                    if not self.queue.complete(task, self.worker_id, result):
+                        logger.info(f"Task {task.id} lease was lost; result discarded")
+                processed += 1
+        return processed
+
+    def run_forever(self, stop_event: threading.Event):
+        logger.info(f"Worker {self.worker_id} consuming {', '.join(self.steps)}")
+        while not stop_event.is_set():
+            if not self.run_once():
+                stop_event.wait(self.idle_sleep)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LangGraph Lead Generation queue worker")
+    parser.add_argument("--config", default="config/workflow.json", help="Path to workflow config")
+    parser.add_argument("--queue-url", help="sqlite:///path or redis://host:port/db (default: WORK_QUEUE_URL)")
+    parser.add_argument("--steps", help="Comma-separated step ids to consume (default: all queue-capable steps)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Worker threads in this process")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    queue = get_work_queue(args.queue_url)
+    steps = args.steps.split(",") if args.steps else None
+    stop = threading.Event()
+    workers = [Worker(queue, args.config, steps) for _ in range(args.concurrency)]
+    threads = [threading.Thread(target=w.run_forever, args=(stop,), daemon=True) for w in workers]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+        stop.set()
+        for thread in threads:
+            thread.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())